@@ -0,0 +1,120 @@
+"""
+Compare NUMERIC(30, 20) and BIGINT micro-units storage of amounts, see placements_io.fields
+
+    DATABASE_URL=postgresql://... python3 benchmarks/amount_storage.py --rows 1000000
+
+Two temporary tables of the same random amounts (6 decimal places) are created in the configured DB,
+    then size, SUM ... GROUP BY campaign_id and Python conversion of fetched rows are timed.
+Nothing is written to the tables of the app.
+"""
+
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+
+from placements_io.fast_serializers import _amount_string  # noqa: E402
+from placements_io.fields import MICRO_DECIMAL_PLACES, MICRO_UNITS  # noqa: E402
+
+
+TABLES = {
+    'numeric': 'NUMERIC(30, 20)',
+    'micro': 'BIGINT',
+}
+
+
+def create_tables(cursor, rows: int, campaigns: int):
+    cursor.execute(
+        'CREATE TEMPORARY TABLE bench_amount_source AS '
+        f'SELECT (random() * {campaigns})::INT AS campaign_id, '
+        f'ROUND((random() * 1000000)::NUMERIC, {MICRO_DECIMAL_PLACES}) AS booked_amount, '
+        f'ROUND((random() * 1000000)::NUMERIC, {MICRO_DECIMAL_PLACES}) AS actual_amount, '
+        f'ROUND((random() * 2000 - 1000)::NUMERIC, {MICRO_DECIMAL_PLACES}) AS adjustment_amount '
+        f'FROM generate_series(1, {rows})'
+    )
+    for storage, column_type in TABLES.items():
+        scale = f' * {MICRO_UNITS}' if storage == 'micro' else ''
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE bench_amount_{storage} ('
+            f'campaign_id INT, booked_amount {column_type}, actual_amount {column_type}, adjustment_amount {column_type})'
+        )
+        cursor.execute(
+            f'INSERT INTO bench_amount_{storage} SELECT campaign_id, '
+            f'(booked_amount{scale})::{column_type}, (actual_amount{scale})::{column_type}, '
+            f'(adjustment_amount{scale})::{column_type} FROM bench_amount_source'
+        )
+        cursor.execute(
+            f'CREATE INDEX ON bench_amount_{storage} (campaign_id) '
+            'INCLUDE (booked_amount, actual_amount, adjustment_amount)'
+        )
+        cursor.execute(f'ANALYZE bench_amount_{storage}')
+
+
+def best_of(repeat: int, function) -> float:
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--campaigns', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"storage":<10}{"size MB":>10}{"SUM ms":>10}{"fetch ms":>12}{"serialize ms":>14}')
+    with connection.cursor() as cursor:
+        create_tables(cursor, args.rows, args.campaigns)
+
+        for storage in TABLES:
+            table = f'bench_amount_{storage}'
+            cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+            size = cursor.fetchone()[0] / 1024 / 1024
+
+            def aggregate():
+                cursor.execute(
+                    f'SELECT campaign_id, SUM(booked_amount), SUM(actual_amount), SUM(adjustment_amount) '
+                    f'FROM {table} GROUP BY campaign_id'
+                )
+                cursor.fetchall()
+
+            # psycopg creates Decimal of NUMERIC while fetching, AmountField creates it from int afterwards
+            def fetch():
+                cursor.execute(f'SELECT booked_amount, actual_amount, adjustment_amount FROM {table} LIMIT 100000')
+                rows = cursor.fetchall()
+                if storage == 'micro':
+                    return [
+                        tuple(Decimal(value).scaleb(-MICRO_DECIMAL_PLACES) for value in row)
+                        for row in rows
+                    ]
+                return rows
+            decoded = fetch()
+
+            def serialize():
+                for row in decoded:
+                    for value in row:
+                        _amount_string(value)
+
+            print(
+                f'{storage:<10}{size:>10.1f}{best_of(args.repeat, aggregate) * 1000:>10.1f}'
+                f'{best_of(args.repeat, fetch) * 1000:>12.1f}{best_of(args.repeat, serialize) * 1000:>14.1f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
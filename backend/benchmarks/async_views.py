@@ -0,0 +1,117 @@
+"""
+Compare latency of sync (DRF) and async views under uvicorn with many concurrent keep-alive connections
+
+    python3 -m uvicorn mysite.asgi:application --host 127.0.0.1 --port 8000
+    python3 benchmarks/async_views.py --url http://127.0.0.1:8000 --username admin --password password
+
+Only the standard library is used, each connection sends GET requests one after another for --duration seconds.
+Conditional GET and response cache of sync views are bypassed by ?_=<nonce>, so both paths hit DB.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+PATHS = {
+    'sync list': '/api/campaign/?page_size=100',
+    'async list': '/api/async/campaign/?page_size=100',
+    'sync detail': '/api/campaign/1/',
+    'async detail': '/api/async/campaign/1/',
+}
+
+
+async def request(reader, writer, host: str, method: str, path: str, headers: dict, body: bytes = b''):
+    lines = [f'{method} {path} HTTP/1.1', f'Host: {host}', f'Content-Length: {len(body)}']
+    lines += [f'{key}: {value}' for key, value in headers.items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    response_headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        key, _, value = line.decode('latin-1').partition(':')
+        response_headers.setdefault(key.strip().lower(), []).append(value.strip())
+    content_length = int(response_headers.get('content-length', ['0'])[0])
+    content = await reader.readexactly(content_length)
+    return int(status_line.split()[1]), response_headers, content
+
+
+async def login(host: str, port: int, username: str, password: str) -> str:
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps({'username': username, 'password': password}).encode()
+    status, headers, content = await request(
+        reader, writer, host, 'POST', '/api/login/', {'Content-Type': 'application/json'}, body,
+    )
+    writer.close()
+    if status != 200:
+        raise SystemExit(f'Login failed: {status} {content!r}')
+    cookies = [cookie.split(';', 1)[0] for cookie in headers.get('set-cookie', [])]
+    return '; '.join(cookies)
+
+
+async def connection(host: str, port: int, path: str, cookie: str, deadline: float, latencies: list, errors: list):
+    reader, writer = await asyncio.open_connection(host, port)
+    separator = '&' if '?' in path else '?'
+    nonce = 0
+    try:
+        while time.monotonic() < deadline:
+            nonce += 1
+            started_at = time.perf_counter()
+            status, _, _ = await request(reader, writer, host, 'GET', f'{path}{separator}_={nonce}', {'Cookie': cookie})
+            latencies.append(time.perf_counter() - started_at)
+            if status != 200:
+                errors.append(status)
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        errors.append(repr(e))
+    finally:
+        writer.close()
+
+
+async def run(host: str, port: int, path: str, cookie: str, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(
+        connection(host, port, path, cookie, deadline, latencies, errors)
+        for _ in range(concurrency)
+    ))
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000  # noqa: E731
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / duration,
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99),
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds of each scenario')
+    parser.add_argument('--only', choices=PATHS, nargs='*', help='Scenarios to run, default all')
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    cookie = await login(host, port, args.username, args.password)
+
+    print(f'{"scenario":<14}{"requests":>10}{"errors":>8}{"rps":>10}{"p50 ms":>10}{"p99 ms":>10}{"mean ms":>10}')
+    for name in args.only or PATHS:
+        result = await run(host, port, PATHS[name], cookie, args.concurrency, args.duration)
+        print(
+            f'{name:<14}{result["requests"]:>10}{result["errors"]:>8}{result["rps"]:>10.1f}'
+            f'{result["p50_ms"]:>10.1f}{result["p99_ms"]:>10.1f}{result["mean_ms"]:>10.1f}'
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
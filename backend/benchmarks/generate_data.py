@@ -0,0 +1,133 @@
+"""
+Generate synthetic campaigns and line items for benchmarks/suite.py
+
+    DATABASE_URL=postgresql://... python3 benchmarks/generate_data.py --campaigns 100000 --line-items 100
+
+Rows are generated by INSERT ... SELECT FROM generate_series in PostgreSQL, nothing goes through Python,
+    so 10M line items take minutes instead of hours. Same --seed gives same data in an empty DB.
+Campaigns have 1 to 2 * --line-items line items (--line-items on average), amounts have 6 decimal places,
+    so the data fits both amount storages, see placements_io.fields.
+CampaignTotals is rebuilt afterwards, and data version is bumped to drop cached responses.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+
+from placements_io.caching import bump_data_version  # noqa: E402
+from placements_io.fields import MICRO_UNITS, is_micro_storage  # noqa: E402
+from placements_io.models import Campaign, CampaignTotals, LineItem  # noqa: E402
+
+
+CAMPAIGN_TABLE = Campaign._meta.db_table
+LINE_ITEM_TABLE = LineItem._meta.db_table
+
+
+def to_storage(numeric: str) -> str:
+    """
+    SQL of a NUMERIC amount in the storage of the columns
+    """
+    if is_micro_storage():
+        return f'({numeric} * {MICRO_UNITS})::BIGINT'
+    return numeric
+
+
+def amount(expression: str) -> str:
+    return to_storage(f'ROUND(({expression})::NUMERIC, 6)')
+
+
+def insert_campaigns(cursor, first: int, count: int) -> tuple[int, int]:
+    """
+    Insert campaigns numbered first .. first + count - 1, return the range of their ids
+    """
+    cursor.execute(
+        f'INSERT INTO {CAMPAIGN_TABLE} (name, created_at) '
+        "SELECT 'Campaign ' || n || ' ' || md5(random()::TEXT), "
+        "TIMESTAMPTZ '2020-01-01 00:00:00+00' + random() * INTERVAL '5 years' "
+        'FROM generate_series(%s, %s) AS n '
+        'RETURNING id',
+        [first, first + count - 1],
+    )
+    ids = [row[0] for row in cursor.fetchall()]
+    return min(ids), max(ids)
+
+
+def insert_line_items(cursor, first_campaign_id: int, last_campaign_id: int, line_items: int) -> int:
+    """
+    Campaign id decides the number of its line items, so the total doesn't depend on random()
+    Actual amount is 70% to 130% of booked amount, 1 of 10 line items has an adjustment.
+    """
+    cursor.execute(
+        f'INSERT INTO {LINE_ITEM_TABLE} '
+        '(campaign_id, name, booked_amount, actual_amount, adjustment_amount, created_at, updated_at) '
+        f"SELECT campaign_id, 'Line Item ' || n, {to_storage('booked_amount')}, "
+        f"{amount('booked_amount * (0.7 + random() * 0.6)')}, "
+        f"CASE WHEN random() < 0.1 THEN {amount('random() * 2000 - 1000')} ELSE 0 END, "
+        'created_at, created_at '
+        'FROM ('
+        "    SELECT campaign.id AS campaign_id, n, ROUND((1000 + random() * 99000)::NUMERIC, 6) AS booked_amount, "
+        "    campaign.created_at + random() * INTERVAL '30 days' AS created_at "
+        f'    FROM {CAMPAIGN_TABLE} AS campaign, '
+        '    LATERAL generate_series(1, 1 + (campaign.id * 7919) %% (2 * %s)) AS n '
+        '    WHERE campaign.id BETWEEN %s AND %s'
+        ') AS generated',
+        [line_items, first_campaign_id, last_campaign_id],
+    )
+    return cursor.rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--campaigns', type=int, default=10_000)
+    parser.add_argument('--line-items', type=int, default=100, help='Average line items per campaign')
+    parser.add_argument('--seed', type=float, default=0.42, help='Seed of random() in PostgreSQL, -1 to 1')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Campaigns per transaction')
+    parser.add_argument(
+        '--truncate',
+        action='store_true',
+        help='Delete ALL campaigns, line items and their totals / export jobs first',
+    )
+    args = parser.parse_args()
+
+    started_at = time.perf_counter()
+    with connection.cursor() as cursor:
+        if args.truncate:
+            cursor.execute(f'TRUNCATE {CAMPAIGN_TABLE} RESTART IDENTITY CASCADE')
+        cursor.execute('SELECT setseed(%s)', [args.seed])
+
+        campaigns_created = line_items_created = 0
+        while campaigns_created < args.campaigns:
+            count = min(args.batch_size, args.campaigns - campaigns_created)
+            with transaction.atomic():
+                first_id, last_id = insert_campaigns(cursor, campaigns_created + 1, count)
+                line_items_created += insert_line_items(cursor, first_id, last_id, args.line_items)
+            campaigns_created += count
+            elapsed = time.perf_counter() - started_at
+            print(
+                f'{campaigns_created} campaigns, {line_items_created} line items, '
+                f'{line_items_created / elapsed:.0f} line items/sec',
+                flush=True,
+            )
+
+        print('Rebuilding campaign totals', flush=True)
+        with transaction.atomic():
+            CampaignTotals.objects.rebuild(batch_size=args.batch_size)
+            bump_data_version()
+        cursor.execute(f'ANALYZE {CAMPAIGN_TABLE}, {LINE_ITEM_TABLE}, {CampaignTotals._meta.db_table}')
+
+    print(f'Done in {time.perf_counter() - started_at:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
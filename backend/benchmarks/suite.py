@@ -0,0 +1,349 @@
+"""
+Benchmark suite of placements_io: micro-benchmarks of serializers / model properties and end-to-end requests
+
+    DATABASE_URL=postgresql://... python3 benchmarks/generate_data.py --campaigns 100000 --line-items 100
+    DATABASE_URL=postgresql://... python3 benchmarks/suite.py --output results.json
+    DATABASE_URL=postgresql://... python3 benchmarks/suite.py --output new.json --compare results.json
+
+End-to-end requests go through the whole Django stack (middleware, session auth, DRF) by the test client
+    in this process, network and web server are not included, see benchmarks/async_views.py for those.
+Responses of list / detail are not cached between requests (?_=<nonce>), so every request reads DB.
+PATCH writes the current adjustment amount back, data is not changed but data version is bumped.
+
+Settings come from environment as usual, e.g. CAMPAIGN_TOTALS_SOURCE=materialized or FAST_READ_SERIALIZERS=true,
+    they are recorded in the output with the git commit, so results of two runs can be compared.
+--compare exits with 1 if any benchmark is slower than --threshold or runs more queries than the baseline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+# DEBUG keeps every query in memory and renders errors as HTML, neither is what production runs
+os.environ.setdefault('DEBUG', 'False')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Prefetch  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from placements_io.exports import LINE_ITEM_COLUMNS, CSVEncoder  # noqa: E402
+from placements_io.fast_serializers import (  # noqa: E402
+    CAMPAIGN_FIELDS, LINE_ITEM_FIELDS,
+    campaign_data, campaign_detail_data, line_item_data,
+)
+from placements_io.interfaces import (  # noqa: E402
+    CampaignDetailSerializer, CampaignSerializer, LineItemSerializer,
+)
+from placements_io.models import Campaign, LineItem  # noqa: E402
+
+
+RECORDED_SETTINGS = [
+    'CAMPAIGN_TOTALS_SOURCE',
+    'FAST_READ_SERIALIZERS',
+    'AMOUNT_STORAGE',
+    'CSV_EXPORT_STREAMING',
+    'CSV_EXPORT_CHUNK_SIZE',
+    'CAMPAIGN_LIST_COUNT_CACHE_TIMEOUT',
+]
+
+BENCHMARK_USERNAME = 'benchmark'
+
+
+def micro(name: str, function, repeat: int, number: int) -> dict:
+    """
+    Best and median of repeat runs, each run calls function number times
+    Queries are counted on one extra call.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        function()
+
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - started_at) / number)
+    return {
+        'name': name,
+        'kind': 'micro',
+        'repeat': repeat,
+        'number': number,
+        'min_ms': min(timings) * 1000,
+        'median_ms': statistics.median(timings) * 1000,
+        'queries': len(queries),
+    }
+
+
+def micro_benchmarks(repeat: int, page_size: int) -> list[dict]:
+    # Budget fullfillment rate of a campaign without line items raises ZeroDivisionError, skip them
+    campaign_ids = list(
+        Campaign.objects.filter(lineitem__isnull=False)
+        .distinct()
+        .order_by('id')
+        .values_list('id', flat=True)[:page_size]
+    )
+    campaigns = list(Campaign.objects.with_totals().filter(id__in=campaign_ids).order_by('id'))
+    prefetched_campaigns = list(
+        Campaign.objects.filter(id__in=campaign_ids).order_by('id').prefetch_related('lineitem_set')
+    )
+    campaign_rows = list(
+        Campaign.objects.with_totals().filter(id__in=campaign_ids).order_by('id').values_list(*CAMPAIGN_FIELDS)
+    )
+
+    # The campaign of most line items among the first ones, detail serializers are dominated by its line items
+    detail_campaign_id = max(prefetched_campaigns, key=lambda campaign: len(campaign.lineitem_set.all())).id
+    detail_campaign = Campaign.objects.prefetch_related(
+        Prefetch('lineitem_set', queryset=LineItem.objects.order_by(*LineItem.DEFAULT_ORDERING)),
+    ).get(id=detail_campaign_id)
+    line_items = list(detail_campaign.lineitem_set.all())
+    detail_campaign_row = Campaign.objects.filter(id=detail_campaign_id).values_list('id', 'name', 'created_at').get()
+    line_item_rows = list(
+        LineItem.objects.filter(campaign_id=detail_campaign_id)
+        .order_by(*LineItem.DEFAULT_ORDERING)
+        .values_list(*LINE_ITEM_FIELDS)
+    )
+    export_rows = [
+        (row[0], row[1], row[2], row[3], row[4], row[3] + row[4], detail_campaign_id, detail_campaign_row[1])
+        for row in LineItem.objects.filter(campaign_id=detail_campaign_id).values_list(
+            'id', 'name', 'booked_amount', 'actual_amount', 'adjustment_amount',
+        )
+    ]
+
+    benchmarks = {
+        f'serializer.CampaignSerializer[{len(campaigns)}]': lambda: CampaignSerializer(campaigns, many=True).data,
+        f'fast.campaign_data[{len(campaign_rows)}]': lambda: campaign_data(campaign_rows),
+        f'serializer.LineItemSerializer[{len(line_items)}]': lambda: LineItemSerializer(line_items, many=True).data,
+        f'fast.line_item_data[{len(line_item_rows)}]': lambda: line_item_data(line_item_rows),
+        f'serializer.CampaignDetailSerializer[{len(line_items)}]': lambda: CampaignDetailSerializer(
+            detail_campaign,
+        ).data,
+        f'fast.campaign_detail_data[{len(line_item_rows)}]': lambda: campaign_detail_data(
+            detail_campaign_row, line_item_rows,
+        ),
+        f'property.Campaign.potential_invoice_amount.totals[{len(campaigns)}]': lambda: [
+            campaign.potential_invoice_amount for campaign in campaigns
+        ],
+        f'property.Campaign.potential_invoice_amount.prefetched[{len(prefetched_campaigns)}]': lambda: [
+            campaign.potential_invoice_amount for campaign in prefetched_campaigns
+        ],
+        f'property.Campaign.budget_fullfillment_rate.totals[{len(campaigns)}]': lambda: [
+            campaign.budget_fullfillment_rate for campaign in campaigns
+        ],
+        f'property.Campaign.budget_fullfillment_rate.prefetched[{len(prefetched_campaigns)}]': lambda: [
+            campaign.budget_fullfillment_rate for campaign in prefetched_campaigns
+        ],
+        f'export.CSVEncoder[{len(export_rows)}]': lambda: CSVEncoder(LINE_ITEM_COLUMNS).encode(export_rows),
+    }
+    results = []
+    for name, function in benchmarks.items():
+        # Roughly 0.2 second per run, at least one call
+        started_at = time.perf_counter()
+        function()
+        number = max(1, int(0.2 / max(time.perf_counter() - started_at, 1e-6)))
+        results.append(micro(name, function, repeat, number))
+        print_result(results[-1])
+    return results
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def end_to_end(name: str, client: Client, method: str, urls: list[str], data: list[dict] | None = None) -> dict:
+    latencies, query_counts, sizes = [], [], []
+    for i, url in enumerate(urls):
+        with CaptureQueriesContext(connection) as queries:
+            started_at = time.perf_counter()
+            if method == 'PATCH':
+                response = client.patch(url, data[i], content_type='application/json')
+            else:
+                response = client.generic(method, url)
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            latencies.append(time.perf_counter() - started_at)
+        if response.status_code != 200:
+            raise SystemExit(f'{method} {url} responded {response.status_code}: {content[:200]!r}')
+        query_counts.append(len(queries))
+        sizes.append(len(content))
+
+    latencies.sort()
+    return {
+        'name': name,
+        'kind': 'e2e',
+        'requests': len(urls),
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000,
+        'rps': len(latencies) / sum(latencies),
+        'queries': max(query_counts),
+        'bytes': int(statistics.median(sizes)),
+    }
+
+
+def end_to_end_benchmarks(requests: int, export_requests: int, page_size: int, seed: int) -> list[dict]:
+    user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+    client = Client()
+    client.force_login(user)
+
+    rng = random.Random(seed)
+    campaign_ids = list(Campaign.objects.filter(lineitem__isnull=False).distinct().values_list('id', flat=True))
+    pages = max(1, Campaign.objects.count() // page_size)
+    sample = [rng.choice(campaign_ids) for _ in range(requests)]
+    line_items = [
+        LineItem.objects.filter(campaign_id=campaign_id).values('id', 'adjustment_amount').first()
+        for campaign_id in sample
+    ]
+
+    scenarios = [
+        ('GET', 'list', [
+            f'{reverse("list_campaign")}?page={rng.randint(1, pages)}&page_size={page_size}&_={i}'
+            for i in range(requests)
+        ], None),
+        ('GET', 'list.cursor', [
+            f'{reverse("list_campaign")}?pagination=cursor&page_size={page_size}&_={i}'
+            for i in range(requests)
+        ], None),
+        ('GET', 'detail', [
+            f'{reverse("detail_campaign", args=[campaign_id])}?_={i}'
+            for i, campaign_id in enumerate(sample)
+        ], None),
+        ('GET', 'line_item.list', [
+            f'{reverse("list_line_item", args=[campaign_id])}?page_size={page_size}&_={i}'
+            for i, campaign_id in enumerate(sample)
+        ], None),
+        ('PATCH', 'line_item.patch', [
+            reverse('patch_line_item', args=[line_item['id']]) for line_item in line_items
+        ], [
+            {'adjustment_amount': str(line_item['adjustment_amount'])} for line_item in line_items
+        ]),
+        ('POST', 'csv.campaign', [reverse('csv_download_campaign')] * export_requests, None),
+        ('POST', 'csv.line_item', [
+            reverse('csv_download_line_item', args=[campaign_id]) for campaign_id in sample[:export_requests]
+        ], None),
+    ]
+
+    results = []
+    for method, name, urls, data in scenarios:
+        # One request ahead to warm up connection, session and code paths
+        end_to_end(name, client, method, urls[:1], data[:1] if data else None)
+        results.append(end_to_end(f'e2e.{name}', client, method, urls, data))
+        print_result(results[-1])
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata() -> dict:
+    with connection.cursor() as cursor:
+        cursor.execute('SHOW server_version')
+        (server_version,) = cursor.fetchone()
+    return {
+        'created_at': datetime.now(tz=timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'postgresql': server_version,
+        'settings': {name: getattr(settings, name) for name in RECORDED_SETTINGS},
+        'data': {
+            'campaigns': Campaign.objects.count(),
+            'line_items': LineItem.objects.count(),
+        },
+    }
+
+
+def print_result(result: dict):
+    if result['kind'] == 'micro':
+        print(f'{result["name"]:<70}{result["median_ms"]:>12.3f} ms{result["queries"]:>6} queries')
+    else:
+        print(
+            f'{result["name"]:<70}{result["p50_ms"]:>12.3f} ms  p95 {result["p95_ms"]:.3f} ms'
+            f'{result["queries"]:>6} queries'
+        )
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[str]:
+    """
+    Return regressions of results against baseline, benchmarks only in one of them are ignored
+    """
+    baseline_results = {result['name']: result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        old = baseline_results.get(result['name'])
+        if old is None or old['kind'] != result['kind']:
+            continue
+        metric = 'median_ms' if result['kind'] == 'micro' else 'p50_ms'
+        if result[metric] > old[metric] * (1 + threshold):
+            regressions.append(
+                f'{result["name"]}: {metric} {old[metric]:.3f} -> {result[metric]:.3f} '
+                f'(+{(result[metric] / old[metric] - 1) * 100:.0f}%)'
+            )
+        if result['queries'] > old['queries']:
+            regressions.append(f'{result["name"]}: queries {old["queries"]} -> {result["queries"]}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', type=Path, help='Write results as JSON')
+    parser.add_argument('--compare', type=Path, help='JSON output of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown of --compare, 0.2 is 20%%')
+    parser.add_argument('--only', choices=['micro', 'e2e'], help='Run only one kind of benchmarks')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs of each micro-benchmark')
+    parser.add_argument('--requests', type=int, default=100, help='Requests of each end-to-end benchmark')
+    parser.add_argument('--export-requests', type=int, default=3, help='Requests of each CSV export benchmark')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42, help='Seed of sampled campaigns and pages')
+    args = parser.parse_args()
+
+    if not Campaign.objects.exists():
+        raise SystemExit('No campaign in DB, run benchmarks/generate_data.py first')
+    # The test client sends requests to host "testserver"
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+
+    output = {'metadata': metadata(), 'results': []}
+    print(json.dumps(output['metadata'], indent=2))
+    if args.only in (None, 'micro'):
+        output['results'] += micro_benchmarks(args.repeat, args.page_size)
+    if args.only in (None, 'e2e'):
+        output['results'] += end_to_end_benchmarks(args.requests, args.export_requests, args.page_size, args.seed)
+
+    if args.output:
+        args.output.write_text(json.dumps(output, indent=2, default=str) + '\n')
+        print(f'Results are written to {args.output}')
+
+    if args.compare:
+        regressions = compare(output['results'], json.loads(args.compare.read_text()), args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            raise SystemExit(1)
+        print(f'No regression against {args.compare}')
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,7 @@ from pathlib import Path
 import os
 import dj_database_url
 
+from django.core.exceptions import ImproperlyConfigured
 from django.urls import reverse_lazy
 
 
@@ -55,6 +56,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'placements_io.metrics.MetricsMiddleware',  # First, to measure the others
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -100,6 +102,73 @@ DATABASES = {
     )
 }
 
+# Connection pool of psycopg 3, enabled if DB_POOL_MAX_SIZE > 0
+#   Each uvicorn worker process has its own pool, DB sees up to WEB_CONCURRENCY * DB_POOL_MAX_SIZE connections
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '0'))
+if DB_POOL_MAX_SIZE:
+    DATABASES['default']['CONN_MAX_AGE'] = 0  # Django requires persistent connections off with pool
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': min(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
+        'max_size': DB_POOL_MAX_SIZE,
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),  # Seconds to wait for a free connection
+        'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', '1800')),
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Response cache of read APIs, see placements_io.caching
+    #   Local memory (LRU) is per process, set REDIS_URL (see docker-compose.yml) when running multiple workers,
+    #   otherwise a worker may serve stale data until API_CACHE_TIMEOUT, /start.sh refuses to start more than one
+    'api': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api',
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('API_CACHE_MAX_ENTRIES', '1000'))},
+    },
+}
+
+API_CACHE_ALIAS = 'api'
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', '60'))
+
+# Session storage of logged in users
+#   - django.contrib.sessions.backends.db: a django_session query on every request
+#   - placements_io.sessions: cached_db with a per-process LRU in front, no query while cached, default with REDIS_URL
+#   - django.contrib.sessions.backends.signed_cookies: no storage at all, but logout can't revoke a copied cookie
+SESSION_ENGINE = os.environ.get(
+    'SESSION_ENGINE',
+    'placements_io.sessions' if REDIS_URL else 'django.contrib.sessions.backends.db',
+)
+# Shared cache of cached_db sessions, must be Redis when running multiple workers
+SESSION_CACHE_ALIAS = 'api'
+if SESSION_ENGINE == 'placements_io.sessions' and not REDIS_URL:
+    # Sessions cached by local memory of a worker, a logout in one worker would never reach the others
+    raise ImproperlyConfigured('SESSION_ENGINE placements_io.sessions requires REDIS_URL, a cache shared by workers')
+# Sessions kept in memory of each process, and seconds before a logout in another process is seen
+SESSION_LOCAL_CACHE_SIZE = int(os.environ.get('SESSION_LOCAL_CACHE_SIZE', '10000'))
+SESSION_LOCAL_CACHE_TTL = float(os.environ.get('SESSION_LOCAL_CACHE_TTL', '5'))
+
+# request.user from memory of each process instead of an auth_user query, see placements_io.auth
+#   A session keeps the path of the backend it logged in by, ModelBackend still loads users of sessions
+#   created before CachedModelBackend (without cache) so nobody is logged out on deploy
+AUTHENTICATION_BACKENDS = [
+    'placements_io.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+# Seconds before a password / is_active change in another process is seen, 0 to disable
+AUTH_USER_CACHE_SIZE = int(os.environ.get('AUTH_USER_CACHE_SIZE', '10000'))
+AUTH_USER_CACHE_TTL = float(os.environ.get('AUTH_USER_CACHE_TTL', '5'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -155,6 +224,62 @@ REST_FRAMEWORK = {
 }
 
 
+# Where the LineItem totals of campaign come from, see CampaignQuerySet.with_totals
+#   - aggregate: SUM over LineItem by DB on every request
+#   - materialized: read from CampaignTotals, which is kept current on LineItem writes
+CAMPAIGN_TOTALS_SOURCE = os.environ.get('CAMPAIGN_TOTALS_SOURCE', 'aggregate')
+
+# Seconds to cache COUNT(*) of the page number pagination on campaign list, 0 means always count exactly
+#   Cursor pagination (?pagination=cursor) never counts
+CAMPAIGN_LIST_COUNT_CACHE_TIMEOUT = int(os.environ.get('CAMPAIGN_LIST_COUNT_CACHE_TIMEOUT', '0'))
+
+# Storage of LineItem amounts, 'numeric' (NUMERIC(30, 20)) or 'micro' (BIGINT micro-units, at most 6 decimal places)
+#   Must match columns in DB, switch by `manage.py convert_amount_storage`, see placements_io.fields
+AMOUNT_STORAGE = os.environ.get('AMOUNT_STORAGE', 'numeric')
+
+# Serialize campaign list / detail and line item list from values_list() tuples instead of ModelSerializer,
+#   output is byte-identical, see placements_io.fast_serializers
+FAST_READ_SERIALIZERS = os.environ.get('FAST_READ_SERIALIZERS', 'False').lower() == 'true'
+
+# Max number of line items in one bulk PATCH request
+LINE_ITEM_BULK_PATCH_MAX_SIZE = int(os.environ.get('LINE_ITEM_BULK_PATCH_MAX_SIZE', '5000'))
+
+# Rows per transaction of import (import_placements command and API)
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '5000'))
+
+# Stream CSV exports chunk by chunk instead of building the whole file in memory
+#   Other formats (?format=gzip / ndjson / parquet / arrow, see placements_io.exports) are always streamed
+CSV_EXPORT_STREAMING = os.environ.get('CSV_EXPORT_STREAMING', 'False').lower() == 'true'
+CSV_EXPORT_CHUNK_SIZE = int(os.environ.get('CSV_EXPORT_CHUNK_SIZE', '1000'))
+
+# Background CSV exports (POST export/), written by `manage.py run_export_workers`, see placements_io.export_jobs
+EXPORT_ROOT = Path(os.environ.get('EXPORT_ROOT', BASE_DIR / 'exports'))
+# Worker processes of run_export_workers and seconds between polls of the queue when it is empty
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', '2'))
+EXPORT_POLL_INTERVAL = float(os.environ.get('EXPORT_POLL_INTERVAL', '1'))
+# Seconds without heartbeat (sent once per chunk) before a running job is considered abandoned by its worker,
+#   and times a job is tried before failing
+EXPORT_JOB_TIMEOUT = int(os.environ.get('EXPORT_JOB_TIMEOUT', '300'))
+EXPORT_JOB_MAX_ATTEMPTS = int(os.environ.get('EXPORT_JOB_MAX_ATTEMPTS', '3'))
+# Seconds finished jobs and their files are kept under EXPORT_ROOT before workers delete them, 0 keeps them forever
+EXPORT_RETENTION = int(os.environ.get('EXPORT_RETENTION', '86400'))
+# Internal nginx location aliased to EXPORT_ROOT, e.g. /protected_exports/
+#   Downloads are sent by nginx through X-Accel-Redirect if set, otherwise Django serves the file itself
+EXPORT_X_ACCEL_REDIRECT_PREFIX = os.environ.get('EXPORT_X_ACCEL_REDIRECT_PREFIX', '')
+
+# Query count, DB / serialization / render time and bytes of every request, see placements_io.metrics
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+# Send them back in the Server-Timing header
+METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', 'True').lower() == 'true'
+# Directory shared by worker processes, api/metrics/ merges the metrics of all of them, only this process if empty
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+# Bearer token of Prometheus for api/metrics/, staff users are always allowed
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+# Log queries of the same SQL repeated this many times within a request with their stack (N+1), 0 to disable
+#   Needs METRICS_ENABLED, see placements_io.query_guard
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', '0'))
+
+
 SWAGGER_SETTINGS = {
     "USE_SESSION_AUTH": True,
     "SECURITY_DEFINITIONS": {},  # No Basic / Token / OAuth2 definitions
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class PlacementsIoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'placements_io'
+
+    def ready(self):
+        # Connect signal receivers which invalidate response cache
+        from placements_io import caching  # noqa: F401
+        # and install the query recorder of request metrics on every DB connection
+        from placements_io import metrics  # noqa: F401
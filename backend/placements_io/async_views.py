@@ -0,0 +1,225 @@
+"""
+Native async views of the read / patch / export APIs, served by the event loop under uvicorn (ASGI)
+
+DRF APIView is sync only, under ASGI every request of views.py is run in the thread pool by sync_to_async,
+    so concurrency is capped by the size of the pool. Views here are Django async views,
+    they use async session auth (request.auser) and async ORM (aget, acount, async for),
+    and reuse fast_serializers for byte-identical JSON output.
+
+Response cache and conditional GET of views.py are not applied here.
+"""
+
+import json
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from asgiref.sync import sync_to_async
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from django.db import transaction
+from django.http import HttpResponse
+from django.conf import settings
+from django.views import View
+
+from placements_io.models import Campaign, LineItem
+from placements_io.fast_serializers import (
+    CAMPAIGN_FIELDS, LINE_ITEM_FIELDS, FastJSONRenderer,
+    campaign_data, campaign_detail_data,
+)
+from placements_io.exports import (
+    aiter_campaign_export, iter_campaign_export,
+    aiter_line_item_export, iter_line_item_export,
+    get_export_format, streaming_export_response,
+)
+from placements_io.interfaces import CampaignPagination, LineItemPatchSerializer, positive_int
+from placements_io.metrics import timed
+
+
+# orjson only if opted in, same as FastRendererMixin of the sync views
+_fast_renderer = FastJSONRenderer()
+_renderer = JSONRenderer()
+
+
+def json_response(data, status: int = 200) -> HttpResponse:
+    renderer = _fast_renderer if settings.FAST_READ_SERIALIZERS else _renderer
+    with timed('render'):
+        content = renderer.render(data)
+    return HttpResponse(content, content_type='application/json', status=status)
+
+
+class AsyncLoginRequiredView(View):
+    """
+    Same as SessionAuthentication + IsAuthenticated of DRF, anonymous user gets 403
+    CSRF of unsafe methods is checked by CsrfViewMiddleware
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return json_response({"detail": "Authentication credentials were not provided."}, status=403)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncCampaignListView(AsyncLoginRequiredView):
+    """
+    Async version of CampaignListView, page number pagination only
+    """
+
+    async def get(self, request, *args, **kwargs):
+        pagination = CampaignPagination
+        try:
+            page_size = min(
+                positive_int(request.GET[pagination.page_size_query_param], strict=True),
+                pagination.max_page_size,
+            )
+        except (KeyError, ValueError):
+            page_size = pagination.page_size
+        try:
+            page_number = positive_int(request.GET.get(pagination.page_query_param, 1), strict=True)
+        except ValueError:
+            return json_response({"detail": "Invalid page."}, status=404)
+
+        count = await Campaign.objects.acount()
+        offset = (page_number - 1) * page_size
+        if offset and offset >= count:
+            return json_response({"detail": "Invalid page."}, status=404)
+
+        queryset = Campaign.objects.with_totals().order_by('id').values_list(*CAMPAIGN_FIELDS)
+        rows = [row async for row in queryset[offset:offset + page_size]]
+
+        url = request.build_absolute_uri()
+        page_query_param = pagination.page_query_param
+        next_url = replace_query_param(url, page_query_param, page_number + 1) if offset + page_size < count else None
+        if page_number == 1:
+            previous_url = None
+        elif page_number == 2:
+            previous_url = remove_query_param(url, page_query_param)
+        else:
+            previous_url = replace_query_param(url, page_query_param, page_number - 1)
+
+        with timed('serialize'):
+            results = campaign_data(rows)
+        return json_response({
+            'count': count,
+            'next': next_url,
+            'previous': previous_url,
+            'results': results,
+        })
+
+
+class AsyncCampaignDetailView(AsyncLoginRequiredView):
+    """
+    Async version of CampaignDetailView
+    """
+
+    async def get(self, request, *args, **kwargs):
+        campaign_id = kwargs['pk']
+        campaign_row = await Campaign.objects.filter(pk=campaign_id).values_list('id', 'name', 'created_at').afirst()
+        if campaign_row is None:
+            return json_response({"detail": "Not found."}, status=404)
+
+        line_item_rows = [
+            row async for row in (
+                LineItem.objects.filter(campaign_id=campaign_id)
+                .order_by(*LineItem.DEFAULT_ORDERING)
+                .values_list(*LINE_ITEM_FIELDS)
+            )
+        ]
+        with timed('serialize'):
+            data = campaign_detail_data(campaign_row, line_item_rows)
+        return json_response(data)
+
+
+class AsyncLineItemPatchView(AsyncLoginRequiredView):
+    """
+    Async version of LineItemPatchView
+    """
+
+    async def patch(self, request, *args, **kwargs):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return json_response({"detail": "JSON parse error"}, status=400)
+
+        serializer = LineItemPatchSerializer(data=data, partial=True)  # Validation of a DecimalField, no DB access
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+
+        line_item = await self.update(kwargs['pk'], serializer.validated_data)
+        if line_item is None:
+            return json_response({"detail": "Not found."}, status=404)
+        return json_response(LineItemPatchSerializer(line_item).data)
+
+    @staticmethod
+    @sync_to_async
+    def update(line_item_id: int, validated_data: dict) -> LineItem | None:
+        """
+        Async ORM doesn't support transactions yet, the locked read-modify-write runs in one thread
+        """
+        with transaction.atomic():
+            try:
+                line_item = LineItem.objects.select_for_update().get(pk=line_item_id)
+            except LineItem.DoesNotExist:
+                return None
+
+            for field, value in validated_data.items():
+                setattr(line_item, field, value)
+            line_item.save()
+        return line_item
+
+
+class AsyncCampaignListCSVDownloadView(AsyncLoginRequiredView):
+    """
+    Async version of CampaignListCSVDownloadView, always streaming, ?format= is same as the sync one
+    """
+
+    async def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        try:
+            get_export_format(export_format)
+        except ValueError as e:
+            return json_response({"format": [str(e)]}, status=400)
+
+        timestamp = datetime.now(tz=ZoneInfo('UTC')).strftime('%Y-%m-%d_%H-%M-%S')
+        chunk_size = settings.CSV_EXPORT_CHUNK_SIZE
+        return streaming_export_response(
+            request,
+            f'campaigns_export_{timestamp}',
+            export_format,
+            iter_campaign_export(export_format, chunk_size),
+            aiter_campaign_export(export_format, chunk_size),
+        )
+
+    post = get
+
+
+class AsyncLineItemListCSVDownloadView(AsyncLoginRequiredView):
+    """
+    Async version of LineItemListCSVDownloadView, always streaming, ?format= is same as the sync one
+    """
+
+    async def get(self, request, *args, **kwargs):
+        campaign_id = kwargs['pk']
+        export_format = request.GET.get('format', 'csv')
+        try:
+            get_export_format(export_format)
+        except ValueError as e:
+            return json_response({"format": [str(e)]}, status=400)
+
+        try:
+            campaign_name = await Campaign.objects.values_list('name', flat=True).aget(id=campaign_id)
+        except Campaign.DoesNotExist:
+            return json_response({"message": "Campaign not found"}, status=400)
+
+        timestamp = datetime.now(tz=ZoneInfo('UTC')).strftime('%Y-%m-%d_%H-%M-%S')
+        chunk_size = settings.CSV_EXPORT_CHUNK_SIZE
+        return streaming_export_response(
+            request,
+            f'line_items_export_{campaign_id}_{timestamp}',
+            export_format,
+            iter_line_item_export(export_format, campaign_id, campaign_name, chunk_size),
+            aiter_line_item_export(export_format, campaign_id, campaign_name, chunk_size),
+        )
+
+    post = get
@@ -0,0 +1,46 @@
+"""
+Users of authenticated requests from memory instead of an auth_user query per request
+
+AuthenticationMiddleware loads request.user by the backend saved in session, i.e. CachedModelBackend.get_user,
+    which keeps users for settings.AUTH_USER_CACHE_TTL seconds in this process.
+A user is dropped on logout and on save / delete in this process, other processes see the change within the TTL.
+"""
+
+import copy
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, user_logged_out
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from placements_io.caching import LocalTTLCache
+
+
+user_cache = LocalTTLCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL)
+
+
+class CachedModelBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(user_id)  # None for inactive users, not cached
+            if user is None:
+                return None
+            user_cache.set(user_id, user)
+        # A copy per request, views may set attributes of request.user
+        return copy.copy(user)
+
+
+@receiver(user_logged_out)
+def drop_logged_out_user(sender, user, **kwargs):
+    if user is not None:
+        user_cache.pop(user.pk)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def drop_changed_user(sender, instance, **kwargs):
+    # Password / is_active / is_staff may have changed
+    user_cache.pop(instance.pk)
@@ -0,0 +1,204 @@
+"""
+Response cache of read APIs, invalidated by a data version bumped on every write of Campaign / LineItem,
+    and conditional GET (ETag / Last-Modified)
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from rest_framework.response import Response
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from placements_io.models import Campaign, LineItem
+
+
+DATA_VERSION_KEY = 'data_version'
+
+
+def get_api_cache():
+    """
+    Local memory LRU by default, Redis if settings.REDIS_URL is set, see settings.CACHES
+    """
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def get_data_version() -> int:
+    """
+    Data version is the nanosecond timestamp of the last write, so it's also used as Last-Modified.
+    If the key is evicted, start from now, a new version never collides with versions of cached responses.
+    """
+    api_cache = get_api_cache()
+    version = api_cache.get(DATA_VERSION_KEY)
+    if version is None:
+        api_cache.add(DATA_VERSION_KEY, time.time_ns(), timeout=None)
+        version = api_cache.get(DATA_VERSION_KEY)
+    return version
+
+
+def _bump():
+    api_cache = get_api_cache()
+    version = api_cache.get(DATA_VERSION_KEY) or 0
+    api_cache.set(DATA_VERSION_KEY, max(time.time_ns(), version + 1), timeout=None)
+
+
+def bump_data_version():
+    """
+    Invalidate all cached responses, call it on writes which don't send post_save (bulk_update, bulk_create, update)
+    Bump again after commit, a request reading DB before commit may have cached stale data with the first bump.
+    """
+    _bump()
+    transaction.on_commit(_bump)
+
+
+@receiver(post_save, sender=Campaign)
+@receiver(post_delete, sender=Campaign)
+@receiver(post_save, sender=LineItem)
+@receiver(post_delete, sender=LineItem)
+def bump_data_version_on_write(sender, **kwargs):
+    bump_data_version()
+
+
+def campaign_validators(campaign_id: int) -> tuple[str, int] | None:
+    """
+    ETag and Last-Modified of a campaign and its line items by one aggregate query,
+        any write of LineItem updates updated_at, and count changes if one is moved or deleted.
+    None if campaign doesn't exist.
+    """
+    try:
+        state = (
+            Campaign.objects.filter(pk=campaign_id)
+            .values('name', 'created_at')
+            .annotate(last_updated_at=Max('lineitem__updated_at'), line_items_count=Count('lineitem'))
+            .get()
+        )
+    except Campaign.DoesNotExist:
+        return None
+    return _validators(state, state['last_updated_at'] or state['created_at'])
+
+
+def data_version_validators() -> tuple[str, int]:
+    """
+    ETag and Last-Modified by data version, no query. Any write of Campaign / LineItem changes them,
+        including a rename of campaign, same as the keys of cached responses.
+    """
+    version = get_data_version()
+    return f'"{version}"', version // 1_000_000_000
+
+
+def _validators(state: dict, last_modified: datetime | None) -> tuple[str, int | None]:
+    etag = f'"{hashlib.md5(repr(sorted(state.items())).encode()).hexdigest()}"'
+    return etag, int(last_modified.timestamp()) if last_modified else None
+
+
+class ConditionalGetMixin:
+    """
+    Respond 304 to GET if client's copy is still valid (If-None-Match / If-Modified-Since),
+        validators are checked before the view, so a 304 costs no serialization.
+    Validators come from data version by default, override get_validators with a more precise one.
+    """
+
+    def get_validators(self, request) -> tuple[str | None, int | None]:
+        return data_version_validators()
+
+    def get(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().get, *args, **kwargs)
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code != 200 or etag is None:
+            return response
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        # Browser always revalidates with ETag instead of using its copy blindly
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class CachedResponseMixin:
+    """
+    Cache response data of GET by URL name, URL kwargs (campaign id) and query params (page, page_size, ...)
+    Cached data is dropped once data version is bumped.
+    """
+
+    def get(self, request, *args, **kwargs):
+        api_cache = get_api_cache()
+        key = self.get_cache_key(request, get_data_version())
+        data = api_cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            api_cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        return response
+
+    def get_cache_key(self, request, version: int) -> str:
+        url_name = request.resolver_match.url_name
+        url_kwargs = ','.join(f'{key}={value}' for key, value in sorted(self.kwargs.items()))
+        query_string = '&'.join(
+            f'{key}={value}' for key in sorted(request.GET) for value in request.GET.getlist(key)
+        )
+        # Hash user input to keep key short and safe for any cache backend
+        digest = hashlib.md5(f'{url_kwargs}?{query_string}'.encode()).hexdigest()
+        return f'response:{version}:{url_name}:{digest}'
+
+
+class LocalTTLCache:
+    """
+    LRU in memory of this process, entries expire after ttl seconds
+    Faster than a locmem cache (no pickling), values are shared, callers must not mutate them.
+    Other processes don't see pop() / clear(), so ttl bounds how long they may serve a stale value.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries: OrderedDict = OrderedDict()  # key: (expires_at, value)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def pop(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
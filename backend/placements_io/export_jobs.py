@@ -0,0 +1,253 @@
+"""
+Background exports, in any of placements_io.exports.EXPORT_FORMATS
+
+POST export/ creates a pending ExportJob, `manage.py run_export_workers` starts a pool of processes,
+    each of them claims jobs from the table (see ExportJobManager.claim) and writes the file to settings.EXPORT_ROOT.
+Clients poll export/<id>/ until the job is done, then download the file from export/<id>/download/,
+    by nginx X-Accel-Redirect in production, or by Django with Range support otherwise.
+
+Files are on the local disk, workers and web server must share settings.EXPORT_ROOT.
+Workers delete finished jobs and their files after settings.EXPORT_RETENTION seconds.
+"""
+
+import contextlib
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import socket
+import time
+from collections.abc import Iterator
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.http import FileResponse, HttpRequest, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from placements_io.exports import EXPORT_FORMATS, iter_campaign_export, iter_line_item_export
+from placements_io.models import ExportJob
+
+
+logger = logging.getLogger(__name__)
+
+RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def job_file_name(job: ExportJob) -> str:
+    timestamp = job.created_at.strftime('%Y-%m-%d_%H-%M-%S')
+    extension = EXPORT_FORMATS[job.format].extension
+    if job.kind == ExportJob.Kind.LINE_ITEMS:
+        return f'line_items_export_{job.campaign_id}_{timestamp}_{job.id}.{extension}'
+    return f'campaigns_export_{timestamp}_{job.id}.{extension}'
+
+
+def job_path(job: ExportJob) -> Path:
+    return Path(settings.EXPORT_ROOT) / job.file_name
+
+
+def _job_content(job: ExportJob) -> Iterator[str | bytes]:
+    chunk_size = settings.CSV_EXPORT_CHUNK_SIZE
+    if job.kind == ExportJob.Kind.LINE_ITEMS:
+        return iter_line_item_export(job.format, job.campaign_id, job.campaign.name, chunk_size)
+    return iter_campaign_export(job.format, chunk_size)
+
+
+class JobRequeued(Exception):
+    """
+    The job was requeued by ExportJobManager.requeue_stale() while the worker was still writing it
+    """
+
+
+def run_job(job: ExportJob):
+    """
+    Write the export to a temporary file and rename it when complete,
+        a file under its final name is never partial, even if the worker is killed halfway.
+    Heartbeat is sent once per chunk, so a long export is not requeued as long as it makes progress.
+    """
+    file_name = job_file_name(job)
+    path = Path(settings.EXPORT_ROOT) / file_name
+    part_path = path.with_name(f'.{file_name}.part')
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(part_path, 'wb') as file:
+            for chunk in _job_content(job):
+                file.write(chunk.encode() if isinstance(chunk, str) else chunk)
+                if not ExportJob.objects.heartbeat(job):
+                    raise JobRequeued(job.id)
+        os.replace(part_path, path)
+    except JobRequeued:
+        # Another worker may be running the job now, leave the job to it
+        logger.warning('Export job %s was requeued, stop writing it', job.id)
+        part_path.unlink(missing_ok=True)
+        return
+    except Exception as e:
+        logger.exception('Export job %s failed', job.id)
+        part_path.unlink(missing_ok=True)
+        job.status = ExportJob.Status.FAILED
+        job.error = repr(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return
+
+    job.status = ExportJob.Status.DONE
+    job.file_name = file_name
+    job.file_size = path.stat().st_size
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'file_name', 'file_size', 'finished_at'])
+
+
+def delete_expired_jobs(retention: timedelta) -> int:
+    """
+    Delete jobs finished before retention with their files,
+        and partial files not written for retention, which are left by killed workers.
+    Return the number of jobs deleted.
+    """
+    export_root = Path(settings.EXPORT_ROOT)
+    cutoff = timezone.now() - retention
+    expired = ExportJob.objects.filter(
+        status__in=[ExportJob.Status.DONE, ExportJob.Status.FAILED],
+        finished_at__lt=cutoff,
+    )
+    file_names = list(expired.exclude(file_name='').values_list('file_name', flat=True))
+    # Rows first, so the files are never downloaded after they are deleted
+    count, _ = expired.delete()
+    for file_name in file_names:
+        (export_root / file_name).unlink(missing_ok=True)
+
+    for part_path in export_root.glob('.*.part'):
+        # Removed by its worker meanwhile
+        with contextlib.suppress(FileNotFoundError):
+            if part_path.stat().st_mtime < cutoff.timestamp():
+                part_path.unlink()
+    return count
+
+
+def run_pending_jobs(worker: str) -> int:
+    """
+    Run jobs until the queue is empty, return the number of jobs run
+    """
+    ExportJob.objects.requeue_stale(
+        timedelta(seconds=settings.EXPORT_JOB_TIMEOUT),
+        settings.EXPORT_JOB_MAX_ATTEMPTS,
+    )
+    if settings.EXPORT_RETENTION:
+        delete_expired_jobs(timedelta(seconds=settings.EXPORT_RETENTION))
+    count = 0
+    while job := ExportJob.objects.claim(worker):
+        run_job(job)
+        count += 1
+    return count
+
+
+def work(poll_interval: float):
+    """
+    Main loop of a worker process, exit on SIGTERM / SIGINT after the current job
+    """
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    logger.info('Export worker %s started', worker)
+    while not stopping:
+        close_old_connections()
+        if not run_pending_jobs(worker):
+            time.sleep(poll_interval)
+
+
+def run_workers(processes: int, poll_interval: float):
+    """
+    Fork worker processes and wait for them, SIGTERM / SIGINT is passed to the workers
+    """
+    # Forked children must not share the DB connection of parent
+    connections.close_all()
+    workers = [
+        multiprocessing.Process(target=work, args=(poll_interval,), name=f'export-worker-{i}')
+        for i in range(processes)
+    ]
+    for process in workers:
+        process.start()
+
+    def terminate(signum, frame):
+        for process in workers:
+            process.terminate()
+
+    signal.signal(signal.SIGTERM, terminate)
+    signal.signal(signal.SIGINT, terminate)
+    for process in workers:
+        process.join()
+
+
+def _iter_file_range(path: Path, start: int, length: int) -> Iterator[bytes]:
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0 and (chunk := file.read(min(FILE_CHUNK_SIZE, length))):
+            length -= len(chunk)
+            yield chunk
+
+
+def _content_disposition(file_name: str) -> str:
+    return f'attachment; filename="{file_name}"'
+
+
+def file_response(request: HttpRequest, path: Path, file_name: str, content_type: str) -> HttpResponse:
+    """
+    Serve the file with a single byte range (RFC 9110), so an interrupted download can be resumed
+    Multiple ranges are not supported, the whole file is sent instead, which is allowed by RFC.
+    """
+    size = path.stat().st_size
+    match = RANGE_RE.fullmatch(request.headers.get('Range', '').strip())
+    if match is None or match.groups() == ('', ''):
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Disposition'] = _content_disposition(file_name)
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range, the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    response = StreamingHttpResponse(
+        _iter_file_range(path, start, end - start + 1),
+        status=206,
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = _content_disposition(file_name)
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1)
+    return response
+
+
+def download_response(request: HttpRequest, job: ExportJob) -> HttpResponse:
+    """
+    With settings.EXPORT_X_ACCEL_REDIRECT_PREFIX nginx sends the file (including Range) after Django checked the user,
+        so no worker of uvicorn is occupied by a large download.
+    """
+    content_type = EXPORT_FORMATS[job.format].content_type
+    prefix = settings.EXPORT_X_ACCEL_REDIRECT_PREFIX
+    if prefix:
+        response = HttpResponse(content_type=content_type)
+        response['Content-Disposition'] = _content_disposition(job.file_name)
+        response['X-Accel-Redirect'] = f'{prefix.rstrip("/")}/{quote(job.file_name)}'
+        return response
+    return file_response(request, job_path(job), job.file_name, content_type)
@@ -0,0 +1,450 @@
+"""
+Exports of Campaign and LineItem
+
+Formats (EXPORT_FORMATS), all of them are produced chunk by chunk:
+    csv: the original format
+    gzip: same CSV compressed on the fly, file name ends with .csv.gz
+    ndjson: one JSON object per line, amounts are JSON numbers of the exact decimal value
+    parquet / arrow: columnar, typed columns (timestamp, decimal), need pyarrow (`pip install pyarrow`)
+"""
+
+import csv
+import io
+import zlib
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import islice
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+
+from placements_io.metrics import allow_duplicate_queries
+from placements_io.models import Campaign, LineItem
+
+
+@dataclass(frozen=True)
+class Column:
+    header: str  # Header of CSV
+    name: str  # Key of NDJSON, column name of Parquet / Arrow
+    type: str = 'str'  # 'int', 'str', 'datetime' or 'decimal'
+    max_digits: int = 0  # Only for decimal, decimal places are always 20 (see LineItem)
+
+
+CAMPAIGN_COLUMNS = [
+    Column('ID', 'id', 'int'),
+    Column('Name', 'name'),
+    Column('Created At', 'created_at', 'datetime'),
+    Column('Potential Invoice Amount', 'potential_invoice_amount', 'decimal', 41),
+    Column('Line Items Count', 'line_items_count', 'int'),
+    Column('Total Booked Amount', 'total_booked_amount', 'decimal', 40),
+    Column('Total Actual Amount', 'total_actual_amount', 'decimal', 40),
+    Column('Total Adjustment Amount', 'total_adjustment_amount', 'decimal', 40),
+]
+
+LINE_ITEM_COLUMNS = [
+    Column('ID', 'id', 'int'),
+    Column('Name', 'name'),
+    Column('Booked Amount', 'booked_amount', 'decimal', 30),
+    Column('Actual Amount', 'actual_amount', 'decimal', 30),
+    Column('Adjustment Amount', 'adjustment_amount', 'decimal', 30),
+    Column('Final Amount', 'final_amount', 'decimal', 31),
+    Column('Campaign ID', 'campaign_id', 'int'),
+    Column('Campaign Name', 'campaign_name'),
+]
+
+CAMPAIGN_CSV_HEADER = [column.header for column in CAMPAIGN_COLUMNS]
+LINE_ITEM_CSV_HEADER = [column.header for column in LINE_ITEM_COLUMNS]
+
+DECIMAL_PLACES = 20
+# Rows of a Parquet row group, rows are read by smaller chunks and buffered until a group is full
+PARQUET_ROW_GROUP_SIZE = 64 * 1024
+
+
+class Echo:
+    """
+    A file-like object which only returns what is written,
+        so csv.writer.writerow returns the CSV line instead of buffering it.
+    Please look https://docs.djangoproject.com/en/5.2/howto/outputting-csv/#streaming-large-csv-files
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class CSVEncoder:
+    """
+    Encoders turn chunks of rows into chunks of the file: start(), encode(rows) for each chunk, then finish()
+    """
+
+    def __init__(self, columns: list[Column]):
+        self.columns = columns
+        self.writer = csv.writer(Echo())
+        self.datetime_indexes = [i for i, column in enumerate(columns) if column.type == 'datetime']
+
+    def start(self) -> str:
+        return self.writer.writerow([column.header for column in self.columns])
+
+    def encode(self, rows: list[tuple]) -> str:
+        writerow = self.writer.writerow
+        if not self.datetime_indexes:
+            return ''.join(writerow(row) for row in rows)
+        return ''.join(writerow(self._format(row)) for row in rows)
+
+    def finish(self) -> str:
+        return ''
+
+    def _format(self, row: tuple) -> list:
+        row = list(row)
+        for i in self.datetime_indexes:
+            row[i] = row[i].isoformat()
+        return row
+
+
+class GzipEncoder(CSVEncoder):
+    """
+    gzip stream of CSV, compressed chunk by chunk instead of the whole file
+    """
+
+    def __init__(self, columns: list[Column]):
+        super().__init__(columns)
+        # wbits 31: gzip header and trailer instead of raw zlib stream
+        self.compressor = zlib.compressobj(wbits=31)
+
+    def start(self) -> bytes:
+        return self.compressor.compress(super().start().encode())
+
+    def encode(self, rows: list[tuple]) -> bytes:
+        return self.compressor.compress(super().encode(rows).encode())
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+
+def _ndjson_default(value):
+    # Exact decimal text as JSON number, float would lose digits
+    if isinstance(value, Decimal):
+        return orjson.Fragment(str(value))
+    raise TypeError
+
+
+class NDJSONEncoder:
+
+    def __init__(self, columns: list[Column]):
+        self.names = [column.name for column in columns]
+
+    def start(self) -> bytes:
+        return b''
+
+    def encode(self, rows: list[tuple]) -> bytes:
+        names = self.names
+        return b''.join(
+            orjson.dumps(dict(zip(names, row)), default=_ndjson_default, option=orjson.OPT_APPEND_NEWLINE)
+            for row in rows
+        )
+
+    def finish(self) -> bytes:
+        return b''
+
+
+class ArrowEncoder:
+    """
+    Parquet file or Arrow IPC stream, chunks of rows are converted to columns (RecordBatch) by pyarrow,
+        bytes written by pyarrow are taken out of the buffer after every chunk.
+    """
+
+    def __init__(self, columns: list[Column], file_format: str):
+        import pyarrow
+        import pyarrow.parquet
+
+        self.pa = pyarrow
+        self.schema = pyarrow.schema([pyarrow.field(column.name, self._arrow_type(column)) for column in columns])
+        self.sink = io.BytesIO()
+        self.buffered_batches = []
+        self.buffered_rows = 0
+        if file_format == 'parquet':
+            self.writer = pyarrow.parquet.ParquetWriter(self.sink, self.schema, compression='zstd')
+            self.row_group_size = PARQUET_ROW_GROUP_SIZE
+        else:
+            options = pyarrow.ipc.IpcWriteOptions(compression='zstd')
+            self.writer = pyarrow.ipc.new_stream(self.sink, self.schema, options=options)
+            self.row_group_size = 0
+
+    def _arrow_type(self, column: Column):
+        pa = self.pa
+        if column.type == 'int':
+            return pa.int64()
+        if column.type == 'datetime':
+            return pa.timestamp('us', tz='UTC')
+        if column.type == 'decimal':
+            decimal = pa.decimal128 if column.max_digits <= 38 else pa.decimal256
+            return decimal(column.max_digits, DECIMAL_PLACES)
+        return pa.string()
+
+    def start(self) -> bytes:
+        return self._drain()
+
+    def encode(self, rows: list[tuple]) -> bytes:
+        arrays = [
+            self.pa.array(values, type=field.type)
+            for values, field in zip(zip(*rows), self.schema)
+        ]
+        self.buffered_batches.append(self.pa.record_batch(arrays, schema=self.schema))
+        self.buffered_rows += len(rows)
+        if self.buffered_rows >= self.row_group_size:
+            self._flush()
+        return self._drain()
+
+    def finish(self) -> bytes:
+        self._flush()
+        self.writer.close()
+        return self._drain()
+
+    def _flush(self):
+        if self.buffered_batches:
+            self.writer.write_table(self.pa.Table.from_batches(self.buffered_batches, schema=self.schema))
+        self.buffered_batches = []
+        self.buffered_rows = 0
+
+    def _drain(self) -> bytes:
+        data = self.sink.getvalue()
+        self.sink.seek(0)
+        self.sink.truncate()
+        return data
+
+
+@dataclass(frozen=True)
+class ExportFormat:
+    content_type: str
+    extension: str
+    encoder: Callable[[list[Column]], CSVEncoder | NDJSONEncoder | ArrowEncoder]
+    requires: str | None = None  # Optional package the format depends on
+
+
+EXPORT_FORMATS = {
+    'csv': ExportFormat('text/csv', 'csv', CSVEncoder),
+    'gzip': ExportFormat('application/gzip', 'csv.gz', GzipEncoder),
+    'ndjson': ExportFormat('application/x-ndjson', 'ndjson', NDJSONEncoder),
+    'parquet': ExportFormat(
+        'application/vnd.apache.parquet', 'parquet',
+        lambda columns: ArrowEncoder(columns, 'parquet'), requires='pyarrow',
+    ),
+    'arrow': ExportFormat(
+        'application/vnd.apache.arrow.stream', 'arrow',
+        lambda columns: ArrowEncoder(columns, 'arrow'), requires='pyarrow',
+    ),
+}
+
+
+def get_export_format(name: str) -> ExportFormat:
+    """
+    Raise ValueError if the format is unknown or its optional package is not installed
+    """
+    try:
+        export_format = EXPORT_FORMATS[name]
+    except KeyError:
+        raise ValueError(f'Unknown export format {name!r}, expect one of {", ".join(EXPORT_FORMATS)}')
+    if export_format.requires:
+        try:
+            __import__(export_format.requires)
+        except ImportError:
+            raise ValueError(f'Export format {name!r} requires {export_format.requires}, which is not installed')
+    return export_format
+
+
+def iter_encoded(export_format: str, columns: list[Column], chunks: Iterable[list[tuple]]) -> Iterator[str | bytes]:
+    encoder = EXPORT_FORMATS[export_format].encoder(columns)
+    yield encoder.start()
+    for rows in chunks:
+        if data := encoder.encode(rows):
+            yield data
+    yield encoder.finish()
+
+
+async def aiter_encoded(
+    export_format: str,
+    columns: list[Column],
+    chunks: AsyncIterator[list[tuple]],
+) -> AsyncIterator[str | bytes]:
+    encoder = EXPORT_FORMATS[export_format].encoder(columns)
+    yield encoder.start()
+    async for rows in chunks:
+        if data := encoder.encode(rows):
+            yield data
+    yield encoder.finish()
+
+
+def campaign_row(campaign: Campaign) -> tuple:
+    """
+    Campaign must be loaded by Campaign.objects.with_totals()
+    """
+    return (
+        campaign.id,
+        campaign.name,
+        campaign.created_at,
+        campaign.potential_invoice_amount,
+        campaign.line_items_count,
+        campaign.total_booked_amount,
+        campaign.total_actual_amount,
+        campaign.total_adjustment_amount,
+    )
+
+
+def _campaign_chunk(last_id: int, chunk_size: int):
+    """
+    Keyset pagination on id, the cost of every chunk is bounded by chunk_size no matter how deep it is,
+        ids are picked by subquery first, so only LineItem of these campaigns are aggregated.
+    """
+    ids = Campaign.objects.filter(id__gt=last_id).order_by('id').values('id')[:chunk_size]
+    return Campaign.objects.with_totals().filter(id__in=ids).order_by('id')
+
+
+def iter_campaign_rows(chunk_size: int) -> Iterator[list[tuple]]:
+    last_id = 0
+    with allow_duplicate_queries():  # One query per chunk
+        while campaigns := list(_campaign_chunk(last_id, chunk_size)):
+            yield [campaign_row(campaign) for campaign in campaigns]
+            last_id = campaigns[-1].id
+
+
+async def aiter_campaign_rows(chunk_size: int) -> AsyncIterator[list[tuple]]:
+    """
+    Same as iter_campaign_rows but use async ORM,
+        ASGI server has to buffer the whole sync iterator before sending, but not async one.
+    """
+    last_id = 0
+    with allow_duplicate_queries():
+        while campaigns := [campaign async for campaign in _campaign_chunk(last_id, chunk_size)]:
+            yield [campaign_row(campaign) for campaign in campaigns]
+            last_id = campaigns[-1].id
+
+
+def iter_campaign_export(export_format: str, chunk_size: int) -> Iterator[str | bytes]:
+    return iter_encoded(export_format, CAMPAIGN_COLUMNS, iter_campaign_rows(chunk_size))
+
+
+def aiter_campaign_export(export_format: str, chunk_size: int) -> AsyncIterator[str | bytes]:
+    return aiter_encoded(export_format, CAMPAIGN_COLUMNS, aiter_campaign_rows(chunk_size))
+
+
+def _line_item_rows(campaign_id: int):
+    """
+    Only select columns needed by export, values_list returns tuples so no LineItem instance is created
+    """
+    return (
+        LineItem.objects.filter(campaign_id=campaign_id)
+        .order_by('id')
+        .values_list('id', 'name', 'booked_amount', 'actual_amount', 'adjustment_amount')
+    )
+
+
+def _line_item_row(row: tuple, campaign_id: int, campaign_name: str) -> tuple:
+    line_item_id, name, booked_amount, actual_amount, adjustment_amount = row
+    return (
+        line_item_id,
+        name,
+        booked_amount,
+        actual_amount,
+        adjustment_amount,
+        actual_amount + adjustment_amount,  # Please look LineItem.final_amount for more details
+        campaign_id,
+        campaign_name,
+    )
+
+
+def batched(rows: Iterable, size: int) -> Iterator[list]:
+    """
+    Same as itertools.batched of Python 3.12, but yields lists
+    """
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def iter_line_item_rows(campaign_id: int, campaign_name: str, chunk_size: int) -> Iterator[list[tuple]]:
+    """
+    iterator() reads rows by PostgreSQL server-side cursor, chunk_size rows per fetch,
+        so the whole result set is never held in memory.
+    """
+    rows = _line_item_rows(campaign_id).iterator(chunk_size=chunk_size)
+    for batch in batched(rows, chunk_size):
+        yield [_line_item_row(row, campaign_id, campaign_name) for row in batch]
+
+
+async def aiter_line_item_rows(campaign_id: int, campaign_name: str, chunk_size: int) -> AsyncIterator[list[tuple]]:
+    """
+    QuerySet.aiterator() is not used, ValuesListIterable executes the query in event loop and raises
+        SynchronousOnlyOperation, so drive the same server-side cursor chunk by chunk in sync thread instead.
+    """
+    rows = _line_item_rows(campaign_id).iterator(chunk_size=chunk_size)
+    next_batch = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    while batch := await next_batch():
+        yield [_line_item_row(row, campaign_id, campaign_name) for row in batch]
+
+
+def iter_line_item_export(
+    export_format: str,
+    campaign_id: int,
+    campaign_name: str,
+    chunk_size: int,
+) -> Iterator[str | bytes]:
+    return iter_encoded(export_format, LINE_ITEM_COLUMNS, iter_line_item_rows(campaign_id, campaign_name, chunk_size))
+
+
+def aiter_line_item_export(
+    export_format: str,
+    campaign_id: int,
+    campaign_name: str,
+    chunk_size: int,
+) -> AsyncIterator[str | bytes]:
+    return aiter_encoded(export_format, LINE_ITEM_COLUMNS, aiter_line_item_rows(campaign_id, campaign_name, chunk_size))
+
+
+def streaming_export_response(
+    request: HttpRequest,
+    filename: str,
+    export_format: str,
+    content: Iterator[str | bytes],
+    async_content: AsyncIterator[str | bytes],
+) -> StreamingHttpResponse:
+    """
+    Pick async iterator if request is served by ASGI (uvicorn), otherwise the sync one (WSGI, test client)
+    Only one of them is consumed, generator body is not executed until the first iteration.
+    filename is without extension, which comes from the format.
+    """
+    streaming_content = async_content if isinstance(request, ASGIRequest) else content
+    export = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(streaming_content, content_type=export.content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export.extension}"'
+    return response
+
+
+class ExportFormatMixin:
+    """
+    ?format= of export views selects one of EXPORT_FORMATS, instead of a renderer of DRF (URL_FORMAT_OVERRIDE)
+    """
+
+    def perform_content_negotiation(self, request, force=False):
+        # No renderer matches ?format=parquet, fall back to the first one for error responses
+        return super().perform_content_negotiation(request, force=True)
+
+    def get_export_format(self, request) -> str:
+        name = request.query_params.get('format', 'csv')
+        try:
+            get_export_format(name)
+        except ValueError as e:
+            raise ValidationError({'format': str(e)})
+        return name
+
+    def export_validators(self, request, validators: tuple[str | None, int | None]) -> tuple[str | None, int | None]:
+        """
+        Each format is a different representation of the same data, so it has its own ETag
+        """
+        etag, last_modified = validators
+        name = request.query_params.get('format', 'csv')
+        if etag is not None and name != 'csv' and name in EXPORT_FORMATS:
+            etag = f'{etag[:-1]}-{name}"'
+        return etag, last_modified
@@ -0,0 +1,154 @@
+"""
+Read-only fast path of CampaignSerializer, LineItemSerializer and CampaignDetailSerializer
+
+Output is built from values_list() tuples instead of model instances and ModelSerializer fields,
+    then rendered by orjson. It must be byte-identical to the DRF serializers + JSONRenderer,
+    test_fast_serializers.py enforces that.
+"""
+
+import decimal
+import math
+from decimal import Decimal
+
+import orjson
+from django.conf import settings
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from placements_io.models import LineItem
+
+
+# Same quantize as rest_framework.fields.DecimalField.to_representation does for LineItem amounts
+_AMOUNT_FIELD = LineItem._meta.get_field('booked_amount')
+_AMOUNT_QUANTUM = Decimal('.1') ** _AMOUNT_FIELD.decimal_places
+_AMOUNT_CONTEXT = decimal.Context(prec=_AMOUNT_FIELD.max_digits)
+
+CAMPAIGN_FIELDS = (
+    'id',
+    'name',
+    'created_at',
+    'total_booked_amount',
+    'total_actual_amount',
+    'total_adjustment_amount',
+)
+
+LINE_ITEM_FIELDS = (
+    'id',
+    'name',
+    'booked_amount',
+    'actual_amount',
+    'adjustment_amount',
+    'created_at',
+    'updated_at',
+)
+
+
+def _amount_string(value: Decimal) -> str:
+    return '{:f}'.format(value.quantize(_AMOUNT_QUANTUM, context=_AMOUNT_CONTEXT))
+
+
+def campaign_data(rows) -> list[dict]:
+    """
+    rows: values_list(*CAMPAIGN_FIELDS) of Campaign.objects.with_totals(), same output as CampaignSerializer
+    """
+    data = []
+    for campaign_id, name, created_at, total_booked_amount, total_actual_amount, total_adjustment_amount in rows:
+        potential_invoice_amount = total_actual_amount + total_adjustment_amount
+        data.append({
+            'id': campaign_id,
+            'name': name,
+            'created_at': created_at.isoformat(),
+            'potential_invoice_amount': potential_invoice_amount,
+            # None if nothing is booked, see Campaign.budget_fullfillment_rate
+            'budget_fullfillment_rate': (
+                int(potential_invoice_amount / total_booked_amount * 100) if total_booked_amount else None
+            ),
+        })
+    return data
+
+
+def line_item_data(rows) -> list[dict]:
+    """
+    rows: values_list(*LINE_ITEM_FIELDS) of LineItem, same output as LineItemSerializer
+    """
+    data = []
+    for line_item_id, name, booked_amount, actual_amount, adjustment_amount, created_at, updated_at in rows:
+        final_amount = actual_amount + adjustment_amount  # Please look LineItem.final_amount for more details
+        data.append({
+            'id': line_item_id,
+            'name': name,
+            'booked_amount': _amount_string(booked_amount),
+            'actual_amount': _amount_string(actual_amount),
+            'adjustment_amount': _amount_string(adjustment_amount),
+            'final_amount': final_amount,
+            # NULL in DB if nothing is booked, see LineItem.budget_fullfillment_rate
+            'budget_fullfillment_rate': int(final_amount / booked_amount * 100) if booked_amount else None,
+            'created_at': created_at.isoformat(),
+            'updated_at': updated_at.isoformat(),
+        })
+    return data
+
+
+def campaign_detail_data(campaign_row: tuple, line_item_rows) -> dict:
+    """
+    campaign_row: values_list('id', 'name', 'created_at') of Campaign, same output as CampaignDetailSerializer
+    """
+    campaign_id, name, created_at = campaign_row
+    line_items = line_item_data(line_item_rows)
+    return {
+        'id': campaign_id,
+        'name': name,
+        'created_at': created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'potential_invoice_amount': sum(line_item['final_amount'] for line_item in line_items),
+        'line_items': line_items,
+    }
+
+
+_drf_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # rest_framework.utils.encoders.JSONEncoder dumps Decimal as float, json dumps float by float.__repr__
+    if isinstance(obj, Decimal):
+        value = float(obj)
+        if not math.isfinite(value):
+            raise ValueError('Out of range float values are not JSON compliant')  # Fallback to JSONRenderer
+        return orjson.Fragment(repr(value))
+    # datetime, lazy string and others are converted by DRF, orjson formats datetime differently
+    return _drf_encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer by orjson, same bytes as JSONRenderer with the default settings
+        (compact, UTF-8 without escaping except U+2028 / U+2029, no NaN) for data of the fast path,
+        which has no float, only Decimal (see _default)
+    Fallback to JSONRenderer if indent is requested, e.g. by the browsable API,
+        or orjson can't encode the data, e.g. integers wider than 64 bits or NaN
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if not (api_settings.UNICODE_JSON and api_settings.COMPACT_JSON and api_settings.STRICT_JSON):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same as JSONRenderer, they are valid JSON but not valid JavaScript
+        return content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastRendererMixin:
+    """
+    Render JSON by FastJSONRenderer only if settings.FAST_READ_SERIALIZERS, by renderers of DRF settings otherwise
+    """
+
+    def get_renderers(self):
+        if settings.FAST_READ_SERIALIZERS:
+            return [FastJSONRenderer(), BrowsableAPIRenderer()]
+        return super().get_renderers()
@@ -0,0 +1,214 @@
+"""
+Storage of LineItem amounts
+
+settings.AMOUNT_STORAGE:
+    'numeric': NUMERIC(30, 20), the original storage
+    'micro': BIGINT of micro-units (amount * 10^6), narrower rows / indexes and integer SUM in DB.
+        Amounts with more than 6 decimal places can't be stored, they are rejected instead of rounded.
+
+AmountField converts to / from Decimal at the edges, Python code and API always see Decimal of same precision.
+The setting must match the columns in DB, switch it together with `manage.py convert_amount_storage`,
+    check_amount_storage() fails the database system checks otherwise.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.apps import apps
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ValidationError
+from django.db import connections, models
+
+
+MICRO_DECIMAL_PLACES = 6
+MICRO_UNITS = 10 ** MICRO_DECIMAL_PLACES
+
+AMOUNT_STORAGES = ('numeric', 'micro')
+
+BIGINT_TYPE_CODE = 20  # OID of int8 in PostgreSQL
+
+# Storage of the columns being created by convert_amount_storage, instead of settings.AMOUNT_STORAGE
+_converting_to: ContextVar[str | None] = ContextVar('converting_to', default=None)
+
+
+def is_micro_storage() -> bool:
+    return (_converting_to.get() or settings.AMOUNT_STORAGE) == 'micro'
+
+
+@contextmanager
+def _storage(to: str):
+    token = _converting_to.set(to)
+    try:
+        yield
+    finally:
+        _converting_to.reset(token)
+
+
+def to_micro_units(value: Decimal) -> int:
+    """
+    Raise ValueError if value has more than 6 decimal places, precision is never lost silently
+    """
+    units = Decimal(value).scaleb(MICRO_DECIMAL_PLACES)
+    if units != units.to_integral_value():
+        raise ValueError(f'{value} has more than {MICRO_DECIMAL_PLACES} decimal places')
+    return int(units)
+
+
+def validate_micro_amount(value: Decimal):
+    """
+    Serializers copy validators of model field, too precise input is 400 instead of an error on save
+    """
+    if value is None or not is_micro_storage():
+        return
+    try:
+        to_micro_units(value)
+    except ValueError:
+        raise ValidationError(
+            f'Ensure that there are no more than {MICRO_DECIMAL_PLACES} decimal places.',
+            code='max_decimal_places',
+        )
+
+
+class AmountField(models.DecimalField):
+    """
+    DecimalField stored as NUMERIC or BIGINT micro-units by settings.AMOUNT_STORAGE
+    max_digits / decimal_places still describe the Decimal seen by Python and serializers,
+        so migrations and API output are same in both storages.
+    """
+    default_validators = [validate_micro_amount]
+
+    def db_type(self, connection):
+        if is_micro_storage():
+            return 'bigint'
+        return super().db_type(connection)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not is_micro_storage():
+            return super().get_db_prep_value(value, connection, prepared)
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None or hasattr(value, 'as_sql'):
+            return value
+        return to_micro_units(value)
+
+    def from_db_value(self, value, expression, connection):
+        # SUM of BIGINT is NUMERIC in PostgreSQL, both are micro-units
+        if value is None or not is_micro_storage():
+            return value
+        return Decimal(value).scaleb(-MICRO_DECIMAL_PLACES)
+
+
+def amount_fields(model: type[models.Model]) -> list[AmountField]:
+    return [field for field in model._meta.concrete_fields if isinstance(field, AmountField)]
+
+
+def column_storages(connection, model: type[models.Model]) -> dict[str, str]:
+    """
+    Storage of amount columns of model in DB (PostgreSQL) by column name, empty if the table doesn't exist yet
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return {}
+        type_codes = {
+            column.name: column.type_code
+            for column in connection.introspection.get_table_description(cursor, table)
+        }
+    return {
+        field.column: 'micro' if type_codes[field.column] == BIGINT_TYPE_CODE else 'numeric'
+        for field in amount_fields(model)
+    }
+
+
+@checks.register(checks.Tags.database)
+def check_amount_storage(app_configs=None, databases=None, **kwargs) -> list[checks.CheckMessage]:
+    """
+    Amounts are scaled by 10^6 silently if settings.AMOUNT_STORAGE doesn't match the columns in DB
+    Database checks run by `manage.py migrate` and `manage.py check --database default` (/start.sh)
+    """
+    errors = []
+    models_with_amounts = [model for model in apps.get_models() if amount_fields(model)]
+    for alias in databases or []:
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            continue
+        for model in models_with_amounts:
+            columns = [
+                column for column, storage in column_storages(connection, model).items()
+                if storage != settings.AMOUNT_STORAGE
+            ]
+            if columns:
+                errors.append(checks.Error(
+                    f'AMOUNT_STORAGE is {settings.AMOUNT_STORAGE!r}, '
+                    f'but columns {columns} of {model._meta.db_table} are not stored that way',
+                    hint='Set AMOUNT_STORAGE to the storage in DB, or run `manage.py convert_amount_storage`',
+                    obj=model,
+                    id='placements_io.E001',
+                ))
+    return errors
+
+
+def _check_lossless(schema_editor, table: str, fields: list[AmountField]):
+    """
+    Raise ValueError if an amount has more than 6 decimal places, before any column is converted to micro-units
+    """
+    quote_name = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        for field in fields:
+            column = quote_name(field.column)
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {quote_name(table)} '
+                f'WHERE {column} <> ROUND({column}, {MICRO_DECIMAL_PLACES})'
+            )
+            (lossy,) = cursor.fetchone()
+            if lossy:
+                raise ValueError(
+                    f'{lossy} rows of {table}.{field.column} have more than '
+                    f'{MICRO_DECIMAL_PLACES} decimal places, they can not be stored as micro-units'
+                )
+
+
+def _column_type(schema_editor, field: AmountField, to: str) -> str:
+    column = schema_editor.quote_name(field.column)
+    if to == 'micro':
+        return f'BIGINT USING ({column} * {MICRO_UNITS})::BIGINT'
+    return f'NUMERIC({field.max_digits}, {field.decimal_places}) USING ({column}::NUMERIC / {MICRO_UNITS})'
+
+
+def convert_amount_storage(schema_editor, model: type[models.Model], to: str):
+    """
+    ALTER amount columns of model to the given storage (PostgreSQL), nothing happens if they are already there
+    Raise ValueError before any change if an amount can't be converted without loss
+    """
+    if to not in AMOUNT_STORAGES:
+        raise ValueError(f'Unknown amount storage {to!r}, expect one of {AMOUNT_STORAGES}')
+
+    quote_name = schema_editor.quote_name
+    table = model._meta.db_table
+    storages = column_storages(schema_editor.connection, model)
+    fields = [field for field in amount_fields(model) if storages[field.column] != to]
+    if to == 'micro':
+        _check_lossless(schema_editor, table, fields)
+    if not fields:
+        return
+
+    # PostgreSQL can't alter type of columns used by generated columns, drop and add them back with their indexes
+    generated_fields = [field for field in model._meta.concrete_fields if isinstance(field, models.GeneratedField)]
+    generated_names = {field.name for field in generated_fields}
+    generated_indexes = [index for index in model._meta.indexes if generated_names & set(index.fields)]
+    for field in generated_fields:
+        schema_editor.remove_field(model, field)
+
+    for field in fields:
+        schema_editor.execute(
+            f'ALTER TABLE {quote_name(table)} ALTER COLUMN {quote_name(field.column)} '
+            f'TYPE {_column_type(schema_editor, field, to)}'
+        )
+
+    with _storage(to):
+        for field in generated_fields:
+            schema_editor.add_field(model, field)
+        for index in generated_indexes:
+            schema_editor.add_index(model, index)
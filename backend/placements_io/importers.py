@@ -0,0 +1,248 @@
+"""
+Import campaigns and line items from JSON / CSV files,
+    the row format is the same as placements_io/migrations/data/placements_teaser_data.json
+"""
+
+import csv
+import json
+import re
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import TextIO
+
+from django.core.management.color import no_style
+from django.db import DataError, connection, transaction
+
+from placements_io.caching import bump_data_version
+from placements_io.exports import batched
+from placements_io.fields import is_micro_storage, to_micro_units
+from placements_io.metrics import allow_duplicate_queries
+from placements_io.models import Campaign, LineItem
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+LINE_ITEM_IMPORT_FIELDS = ['campaign', 'name', 'booked_amount', 'actual_amount', 'adjustment_amount', 'updated_at']
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    campaigns: int = 0
+    line_items_created: int = 0
+    line_items_updated: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _scan(
+    decoder: json.JSONDecoder,
+    buffer: str,
+    pos: int,
+    state: str,
+    eof: bool,
+) -> tuple[str, int, dict | None] | None:
+    """
+    Scan the next token of the array from pos, return (state, pos after it, row if it's a row)
+    None if the buffer ends before the token is complete
+    """
+    pos = _WHITESPACE.match(buffer, pos).end()
+    if pos >= len(buffer):
+        return None
+    char = buffer[pos]
+    if state in ('first', 'row') and char == '{':
+        try:
+            row, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            return None
+        return 'next', pos, row
+    if state == 'start' and char == '[':
+        return 'first', pos + 1, None
+    if state in ('first', 'next') and char == ']':
+        return 'end', pos + 1, None
+    if state == 'next' and char == ',':
+        return 'row', pos + 1, None
+    raise ValueError(f'Unexpected character {char!r} in JSON array of objects')
+
+
+def iter_json_rows(file: TextIO, buffer_size: int = 64 * 1024) -> Iterator[dict]:
+    """
+    Stream parse a JSON array of objects, only a buffer of the file is held in memory instead of the whole array.
+    Floats are parsed as Decimal directly to avoid precision loss.
+    """
+    decoder = json.JSONDecoder(parse_float=Decimal)
+    buffer, pos, eof = '', 0, False
+    state = 'start'  # start -> first (row or ]) -> next (, or ]) -> row -> next ... -> end
+
+    while state != 'end':
+        scanned = _scan(decoder, buffer, pos, state, eof)
+        if scanned is None:
+            # The token is not complete in buffer, drop the parsed part and read more
+            if eof:
+                raise ValueError('Unexpected end of JSON array')
+            chunk = file.read(buffer_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+
+        state, pos, row = scanned
+        if row is not None:
+            yield row
+
+
+def iter_csv_rows(file: TextIO) -> Iterator[dict]:
+    """
+    Header of CSV must be the same as keys of JSON row
+    """
+    return csv.DictReader(file)
+
+
+def _row_error(row: dict, message: str) -> ValueError:
+    return ValueError(f'{message} of line item {row.get("id")!r}')
+
+
+def _id(row: dict, key: str) -> int:
+    """
+    Raise ValueError of the row if the id is out of range of AutoField
+    """
+    try:
+        value = int(row[key])
+    except (TypeError, ValueError):
+        raise _row_error(row, f'Invalid {key} {row[key]!r}')
+    _, high = connection.ops.integer_field_range('AutoField')
+    if not 0 < value <= high:
+        raise _row_error(row, f'{key} {value} out of range')
+    return value
+
+
+def _name(row: dict, key: str, model: type[Campaign | LineItem]) -> str:
+    value = row[key]
+    if not isinstance(value, str):
+        raise _row_error(row, f'Invalid {key} {value!r}')
+    max_length = model._meta.get_field('name').max_length
+    if len(value) > max_length:
+        raise _row_error(row, f'{key} longer than {max_length} characters')
+    return value
+
+
+def _amount(row: dict, key: str, field_name: str) -> Decimal:
+    """
+    Raise ValueError of the row if the amount is not a finite number, or it can't be stored in the column
+    """
+    try:
+        # Convert to string then to Decimal to avoid precision loss, same as 0003_seed_sample_data
+        amount = Decimal(str(row[key]))
+    except InvalidOperation:
+        amount = None
+    if amount is None or not amount.is_finite():
+        raise _row_error(row, f'Invalid {key} {row[key]!r}')
+    field = LineItem._meta.get_field(field_name)
+    if amount and amount.adjusted() >= field.max_digits - field.decimal_places:
+        raise _row_error(row, f'{key} {row[key]!r} out of range')
+    if is_micro_storage():
+        try:
+            to_micro_units(amount)
+        except ValueError as e:
+            raise _row_error(row, f'Invalid {key}, {e}')
+    return amount
+
+
+def _parse_batch(rows: list[dict]) -> tuple[dict[int, Campaign], dict[int, LineItem]]:
+    """
+    Rows are validated one by one, so an invalid row is reported by its id instead of a DataError of the batch
+    """
+    campaigns, line_items = {}, {}
+    for row in rows:
+        campaign_id = _id(row, 'campaign_id')
+        campaigns[campaign_id] = Campaign(id=campaign_id, name=_name(row, 'campaign_name', Campaign))
+
+        line_item_id = _id(row, 'id')
+        # Later row of same id wins, one row can not be upserted twice in one statement
+        line_items[line_item_id] = LineItem(
+            id=line_item_id,
+            campaign_id=campaign_id,
+            name=_name(row, 'line_item_name', LineItem),
+            booked_amount=_amount(row, 'booked_amount', 'booked_amount'),
+            actual_amount=_amount(row, 'actual_amount', 'actual_amount'),
+            adjustment_amount=_amount(row, 'adjustments', 'adjustment_amount'),
+        )
+    return campaigns, line_items
+
+
+def _import_batch(rows: list[dict], result: ImportResult):
+    campaigns, line_items = _parse_batch(rows)
+
+    try:
+        _upsert_batch(campaigns, line_items, result)
+    except DataError as e:
+        # Rows are validated by _parse_batch() already, e.g. an amount rounded up by NUMERIC may still overflow
+        raise ValueError(f'Invalid row of line items {min(line_items)} - {max(line_items)}: {e}') from e
+    result.rows += len(rows)
+
+
+def _upsert_batch(campaigns: dict[int, Campaign], line_items: dict[int, LineItem], result: ImportResult):
+    with transaction.atomic():
+        Campaign.objects.bulk_create(
+            campaigns.values(),
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=['name'],
+        )
+
+        # Only for counts of created / updated, CampaignTotals is kept by triggers (see placements_io.totals_triggers)
+        existing = set(LineItem.objects.filter(id__in=line_items.keys()).values_list('id', flat=True))
+        LineItem.objects.bulk_create(
+            line_items.values(),
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=LINE_ITEM_IMPORT_FIELDS,
+        )
+        bump_data_version()  # bulk_create() doesn't send post_save
+
+    result.campaigns += len(campaigns)
+    result.line_items_created += len(line_items) - len(existing)
+    result.line_items_updated += len(existing)
+
+
+def _reset_auto_increment():
+    """
+    Rows are inserted with given id, reset sequences to avoid duplicate id be generated,
+        same as 0003_seed_sample_data
+    """
+    sql = connection.ops.sequence_reset_sql(no_style(), [Campaign, LineItem])
+    with connection.cursor() as cursor:
+        for line in sql:
+            cursor.execute(line)
+
+
+def iter_rows(file: TextIO, file_format: str) -> Iterator[dict]:
+    if file_format == 'json':
+        return iter_json_rows(file)
+    if file_format == 'csv':
+        return iter_csv_rows(file)
+    raise ValueError(f'Unsupported format {file_format!r}, expect json or csv')
+
+
+def import_rows(rows: Iterable[dict], batch_size: int = 5000) -> ImportResult:
+    """
+    Upsert campaigns and line items batch by batch, each batch is a transaction,
+        so memory usage is bounded by batch_size and re-running the same file is safe.
+    """
+    result = ImportResult()
+    started_at = time.monotonic()
+
+    try:
+        with allow_duplicate_queries():  # Same queries for each batch
+            for batch in batched(rows, batch_size):
+                _import_batch(batch, result)
+    finally:
+        # Batches committed before a failure have inserted ids as well
+        _reset_auto_increment()
+    result.seconds = time.monotonic() - started_at
+    return result
@@ -2,14 +2,45 @@
 Serializer and Pagination
 """
 
-from decimal import Decimal
+import base64
+import binascii
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, time
+from decimal import ROUND_CEILING, ROUND_FLOOR, Context, Decimal, InvalidOperation
 
 from rest_framework import serializers
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
-from django.db.models import QuerySet
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db.models import Q, QuerySet
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.functional import cached_property
 
-from placements_io.models import Campaign, LineItem
+from placements_io.exports import EXPORT_FORMATS, get_export_format
+from placements_io.fields import MICRO_DECIMAL_PLACES, is_micro_storage, to_micro_units
+from placements_io.metrics import TimedListSerializer, TimedSerializerMixin
+from placements_io.models import Campaign, ExportJob, LineItem
+
+
+def positive_int(integer_string: str | int, strict: bool = False, cutoff: int | None = None) -> int:
+    """
+    Same as private rest_framework.pagination._positive_int, raise ValueError if negative, or 0 when strict
+    """
+    value = int(integer_string)
+    if value < 0 or (value == 0 and strict):
+        raise ValueError(f'Expect a positive integer, got {integer_string!r}')
+    if cutoff:
+        return min(value, cutoff)
+    return value
 
 
 def get_drf_pagination_schema_serializer(
@@ -32,13 +63,268 @@ def get_drf_pagination_schema_serializer(
     )
 
 
+class CachedCountPaginator(DjangoPaginator):
+    """
+    COUNT(*) is issued on every page request, cache it for settings.CAMPAIGN_LIST_COUNT_CACHE_TIMEOUT seconds
+        0 means always count exactly
+    """
+
+    @cached_property
+    def count(self) -> int:
+        timeout = settings.CAMPAIGN_LIST_COUNT_CACHE_TIMEOUT
+        if not timeout:
+            return super().count
+
+        # Same SQL, same count. Filters are part of SQL so they are cached separately
+        sql = str(self.object_list.query)
+        key = f'placements_io:count:{hashlib.md5(sql.encode()).hexdigest()}'
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, timeout)
+        return count
+
+
 class CampaignPagination(PageNumberPagination):
+    django_paginator_class = CachedCountPaginator
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
 
 
-class CampaignSerializer(serializers.ModelSerializer):
+class LineItemPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class StableOrderingFilter(OrderingFilter):
+    """
+    Append id to ordering if it's not there, rows with same sorting value keep same order among pages
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view) or [])
+        if not {'id', '-id'} & set(ordering):
+            ordering.append('id')
+        return ordering
+
+
+class LineItemAmountFilter(BaseFilterBackend):
+    """
+    Filter line items by generated columns in DB, see LineItem.final_amount and LineItem.budget_fullfillment_rate
+        ?over_delivered=true: budget_fullfillment_rate > 100
+        ?min_budget_fullfillment_rate= / ?max_budget_fullfillment_rate=
+        ?min_final_amount= / ?max_final_amount=
+    """
+    range_params = {
+        'min_budget_fullfillment_rate': 'budget_fullfillment_rate__gte',
+        'max_budget_fullfillment_rate': 'budget_fullfillment_rate__lte',
+        'min_final_amount': 'final_amount__gte',
+        'max_final_amount': 'final_amount__lte',
+    }
+    # Rounding of amount bounds in micro storage, toward the inclusive side so no amount in DB is left out
+    amount_roundings = {
+        'min_final_amount': ROUND_CEILING,
+        'max_final_amount': ROUND_FLOOR,
+    }
+
+    def micro_bound(self, param: str, value: Decimal) -> Decimal:
+        """
+        Micro-units can't hold more than 6 decimal places or exceed BIGINT, see placements_io.fields
+        """
+        try:
+            value = value.quantize(
+                Decimal(1).scaleb(-MICRO_DECIMAL_PLACES),
+                rounding=self.amount_roundings[param],
+                context=Context(prec=40),
+            )
+        except InvalidOperation:
+            value = None
+        if value is None or abs(to_micro_units(value)) >= 2 ** 63:
+            raise ValidationError({param: ['Ensure this value is within the range of amounts.']})
+        return value
+
+    def filter_queryset(self, request, queryset, view):
+        over_delivered = request.query_params.get('over_delivered', '').lower()
+        if over_delivered in ('true', '1'):
+            queryset = queryset.filter(budget_fullfillment_rate__gt=100)
+        elif over_delivered in ('false', '0'):
+            queryset = queryset.filter(budget_fullfillment_rate__lte=100)
+
+        for param, lookup in self.range_params.items():
+            value = request.query_params.get(param)
+            if value is None:
+                continue
+            try:
+                value = Decimal(value)
+            except InvalidOperation:
+                raise ValidationError({param: ['A valid number is required.']})
+            if not value.is_finite():
+                raise ValidationError({param: ['A valid number is required.']})
+            if param in self.amount_roundings and is_micro_storage():
+                value = self.micro_bound(param, value)
+            queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+
+class CampaignFilter(BaseFilterBackend):
+    """
+    Filter campaigns in DB, combined with any pagination
+        ?search=: name contains, case insensitive, served by trigram index campaign_name_trgm_idx if pg_trgm is available
+        ?created_after= / ?created_before=: ISO 8601 date or datetime, inclusive, served by campaign_created_idx
+        ?budget_band=: same bands as highlighting of frontend (frontend/src/utils/budgetStyles.ts),
+            served by totals_rate_idx if settings.CAMPAIGN_TOTALS_SOURCE is materialized
+    Queryset must be annotated by Campaign.objects.with_totals()
+    """
+    # Inclusive (min, max) of integer budget fullfillment rate
+    budget_bands = {
+        'under': (None, 90),
+        'normal': (91, 104),
+        'over': (105, 119),
+        'critical': (120, None),
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        if search := params.get('search', '').strip():
+            queryset = queryset.filter(name__icontains=search)
+
+        if created_after := params.get('created_after'):
+            queryset = queryset.filter(created_at__gte=self.parse_datetime('created_after', created_after))
+        if created_before := params.get('created_before'):
+            queryset = queryset.filter(created_at__lte=self.parse_datetime('created_before', created_before, end=True))
+
+        if budget_band := params.get('budget_band'):
+            if budget_band not in self.budget_bands:
+                raise ValidationError({'budget_band': [f'Expect one of {", ".join(self.budget_bands)}.']})
+            min_rate, max_rate = self.budget_bands[budget_band]
+            if min_rate is not None:
+                queryset = queryset.filter(total_budget_fullfillment_rate__gte=min_rate)
+            if max_rate is not None:
+                queryset = queryset.filter(total_budget_fullfillment_rate__lte=max_rate)
+
+        return queryset
+
+    @staticmethod
+    def parse_datetime(param: str, value: str, end: bool = False) -> datetime:
+        """
+        A date covers the whole day, 2024-01-31 as created_before means until the end of that day
+        """
+        try:
+            # parse_datetime accepts a date as midnight, try date first
+            if (day := parse_date(value)) is not None:
+                parsed = datetime.combine(day, time.max if end else time.min)
+            else:
+                parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValidationError({param: ['Expect ISO 8601 date or datetime.']})
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+
+class CampaignCursorPagination(BasePagination):
+    """
+    Keyset (seek) pagination ordered by (created_at, id)
+    Unlike OFFSET, a page is located by WHERE on the last seen row, so the cost is same for every page,
+        and COUNT(*) is never issued.
+    Cursor is opaque for client, just follow the next / previous link.
+    """
+    page_size = CampaignPagination.page_size
+    page_size_query_param = CampaignPagination.page_size_query_param
+    max_page_size = CampaignPagination.max_page_size
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        reverse = False
+        if cursor is None:
+            queryset = queryset.order_by('created_at', 'id')
+        else:
+            created_at, pk, reverse = cursor
+            if reverse:
+                # created_at__lte lets DB range scan the index, OR condition only breaks ties
+                queryset = (
+                    queryset.filter(created_at__lte=created_at)
+                    .filter(Q(created_at__lt=created_at) | Q(id__lt=pk))
+                    .order_by('-created_at', '-id')
+                )
+            else:
+                queryset = (
+                    queryset.filter(created_at__gte=created_at)
+                    .filter(Q(created_at__gt=created_at) | Q(id__gt=pk))
+                    .order_by('created_at', 'id')
+                )
+
+        # Fetch one more row to know if there is more page
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.results = results
+        return results
+
+    def get_page_size(self, request) -> int:
+        try:
+            return positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request) -> tuple[datetime, int, bool] | None:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            created_at, pk, reverse = base64.urlsafe_b64decode(encoded.encode()).decode().split('|')
+            return datetime.fromisoformat(created_at), int(pk), reverse == 'r'
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse: bool) -> str:
+        # obj may be a model instance or a named row of values_list()
+        cursor = f'{obj.created_at.isoformat()}|{obj.id}|{"r" if reverse else "f"}'
+        encoded = base64.urlsafe_b64encode(cursor.encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next or not self.results:
+            return None
+        return self.encode_cursor(self.results[-1], reverse=False)
+
+    def get_previous_link(self) -> str | None:
+        if not self.has_previous or not self.results:
+            return None
+        return self.encode_cursor(self.results[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class CampaignSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     created_at = serializers.SerializerMethodField()
     potential_invoice_amount = serializers.SerializerMethodField()
 
@@ -51,22 +337,22 @@ class CampaignSerializer(serializers.ModelSerializer):
             'potential_invoice_amount',
             'budget_fullfillment_rate',
         ]
+        list_serializer_class = TimedListSerializer
 
     def get_potential_invoice_amount(self, obj) -> Decimal:
-        line_items: QuerySet[LineItem] = obj.lineitem_set.all()
-
-        actual_amount = sum(line_item.actual_amount for line_item in line_items)
-        adjustment_amount = sum(line_item.adjustment_amount for line_item in line_items)
-
-        return actual_amount + adjustment_amount
+        # Read totals annotated by Campaign.objects.with_totals() if any, otherwise sum up prefetched LineItem
+        return obj.potential_invoice_amount
 
     def get_created_at(self, obj) -> str:
         return obj.created_at.isoformat()
 
 
-class LineItemSerializer(serializers.ModelSerializer):
+class LineItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     created_at = serializers.SerializerMethodField()
     updated_at = serializers.SerializerMethodField()
+    # Generated columns, keep the output of the former Python properties (number instead of decimal string)
+    final_amount = serializers.ReadOnlyField()
+    budget_fullfillment_rate = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = LineItem
@@ -81,6 +367,7 @@ class LineItemSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
         ]
+        list_serializer_class = TimedListSerializer
 
     def get_created_at(self, obj) -> str:
         return obj.created_at.isoformat()
@@ -103,7 +390,21 @@ class LineItemPatchSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'campaign', 'name', 'booked_amount', 'actual_amount', 'created_at', 'updated_at']
 
 
-class CampaignDetailSerializer(serializers.ModelSerializer):
+class LineItemBulkPatchSerializer(LineItemPatchSerializer):
+    """
+    One item of bulk PATCH, same validation as LineItemPatchSerializer plus the id of LineItem to patch
+    """
+    id = serializers.IntegerField()
+
+    class Meta(LineItemPatchSerializer.Meta):
+        fields = ['id'] + LineItemPatchSerializer.Meta.fields
+        read_only_fields = [
+            field for field in LineItemPatchSerializer.Meta.read_only_fields
+            if field != 'id'
+        ]
+
+
+class CampaignDetailSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     potential_invoice_amount = serializers.SerializerMethodField()
     line_items = serializers.SerializerMethodField()
     created_at = serializers.SerializerMethodField()
@@ -128,5 +429,87 @@ class CampaignDetailSerializer(serializers.ModelSerializer):
         return obj.created_at.strftime('%Y-%m-%d %H:%M:%S')
 
     def get_line_items(self, obj) -> list[dict]:
-        line_items = obj.lineitem_set.order_by('-updated_at', '-created_at', 'id')
+        # Already ordered by the Prefetch in CampaignDetailView, order_by() here would issue another query
+        line_items = obj.lineitem_set.all()
         return LineItemSerializer(line_items, many=True).data
+
+
+class BudgetBandsSerializer(serializers.Serializer):
+    under = serializers.IntegerField()
+    normal = serializers.IntegerField()
+    over = serializers.IntegerField()
+    critical = serializers.IntegerField()
+    unbooked = serializers.IntegerField(help_text='Campaigns without booked amount, which have no rate')
+
+
+class RateBucketSerializer(serializers.Serializer):
+    min = serializers.IntegerField(allow_null=True, help_text='Inclusive, null for no lower bound')
+    max = serializers.IntegerField(allow_null=True, help_text='Exclusive, null for no upper bound')
+    count = serializers.IntegerField()
+
+
+class CampaignSummarySerializer(serializers.Serializer):
+    """
+    Output of CampaignQuerySet.summary(), amounts are decimal strings like amounts of LineItemSerializer,
+        float would lose precision of totals over millions of line items
+    """
+    campaigns_count = serializers.IntegerField()
+    line_items_count = serializers.IntegerField()
+    total_booked_amount = serializers.DecimalField(max_digits=None, decimal_places=None)
+    total_actual_amount = serializers.DecimalField(max_digits=None, decimal_places=None)
+    total_adjustment_amount = serializers.DecimalField(max_digits=None, decimal_places=None)
+    potential_invoice_amount = serializers.DecimalField(max_digits=None, decimal_places=None)
+    budget_fullfillment_rate = serializers.IntegerField(allow_null=True, help_text='Of all campaigns together')
+    budget_bands = BudgetBandsSerializer(help_text='Campaigns per band, see ?budget_band= of campaign list')
+    budget_fullfillment_rate_histogram = RateBucketSerializer(many=True)
+
+
+class ExportJobCreateSerializer(serializers.Serializer):
+    kind = serializers.ChoiceField(choices=ExportJob.Kind.choices)
+    campaign_id = serializers.IntegerField(required=False, help_text='Required if kind is line_items')
+    format = serializers.ChoiceField(choices=[*EXPORT_FORMATS], default='csv')
+
+    def validate_format(self, value: str) -> str:
+        try:
+            get_export_format(value)
+        except ValueError as e:
+            raise ValidationError(str(e))
+        return value
+
+    def validate(self, attrs):
+        if attrs['kind'] != ExportJob.Kind.LINE_ITEMS:
+            attrs.pop('campaign_id', None)
+            return attrs
+        if 'campaign_id' not in attrs:
+            raise ValidationError({'campaign_id': 'This field is required to export line items.'})
+        if not Campaign.objects.filter(id=attrs['campaign_id']).exists():
+            raise ValidationError({'campaign_id': 'Campaign not found.'})
+        return attrs
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id',
+            'kind',
+            'campaign',
+            'format',
+            'status',
+            'file_name',
+            'file_size',
+            'error',
+            'created_at',
+            'started_at',
+            'finished_at',
+            'download_url',
+        ]
+
+    def get_download_url(self, obj) -> str | None:
+        if obj.status != ExportJob.Status.DONE:
+            return None
+        url = reverse('download_export_job', kwargs={'pk': obj.id})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
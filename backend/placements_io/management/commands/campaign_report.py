@@ -0,0 +1,49 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from placements_io.exports import EXPORT_FORMATS, get_export_format, iter_encoded
+from placements_io.reporting import REPORT_COLUMNS, build_campaign_report, verify_campaign_report
+
+
+class Command(BaseCommand):
+    help = (
+        'Write totals, budget fullfillment rate and budget band of all campaigns computed by NumPy, '
+        'compare them with the Decimal path of Campaign with --verify'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path)
+        parser.add_argument('--format', choices=[*EXPORT_FORMATS], default='csv')
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Compute every campaign again in Decimal, exit with error if any campaign differs from the report',
+        )
+
+    def handle(self, *args, **options):
+        path: Path = options['path']
+        chunk_size = options['chunk_size']
+
+        try:
+            get_export_format(options['format'])
+            report = build_campaign_report(chunk_size)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        with path.open('wb') as file:
+            for chunk in iter_encoded(options['format'], REPORT_COLUMNS, report.iter_rows(chunk_size)):
+                file.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        self.stdout.write(self.style.SUCCESS(f'Reported {len(report)} campaigns to {path}'))
+        if report.rounded_line_items:
+            self.stdout.write(f'Amounts of {report.rounded_line_items} line items are rounded to micro-units')
+
+        if options['verify']:
+            mismatched_campaign_ids = verify_campaign_report(report, chunk_size)
+            if mismatched_campaign_ids:
+                raise CommandError(
+                    f'{len(mismatched_campaign_ids)} campaigns differ from the Decimal path, '
+                    f'campaign ids: {mismatched_campaign_ids}'
+                )
+            self.stdout.write(self.style.SUCCESS('Report is consistent with the Decimal path'))
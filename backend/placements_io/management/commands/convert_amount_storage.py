@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from placements_io.fields import AMOUNT_STORAGES, convert_amount_storage
+from placements_io.models import LineItem
+from placements_io.totals_triggers import install_campaign_totals_triggers
+
+
+class Command(BaseCommand):
+    help = (
+        'Convert amount columns of LineItem to NUMERIC or BIGINT micro-units, '
+        'set AMOUNT_STORAGE to the same value before serving traffic'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('storage', choices=AMOUNT_STORAGES)
+
+    def handle(self, *args, **options):
+        storage = options['storage']
+        try:
+            # Table is locked by ALTER TABLE until commit, readers never see half converted columns
+            with transaction.atomic(), connection.schema_editor() as schema_editor:
+                convert_amount_storage(schema_editor, LineItem, storage)
+                # Triggers of CampaignTotals read the amounts in storage of the columns
+                install_campaign_totals_triggers(schema_editor, micro=storage == 'micro')
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'Amounts of line items are stored as {storage}'))
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from placements_io.importers import import_rows, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream import campaigns and line items from a JSON or CSV file, existing rows are updated'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path)
+        parser.add_argument(
+            '--format',
+            choices=['json', 'csv'],
+            help='Format of the file, default to the file extension',
+        )
+        parser.add_argument('--batch-size', type=int, default=settings.IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path: Path = options['path']
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+
+        try:
+            with path.open('r', encoding='utf-8', newline='') as file:
+                result = import_rows(iter_rows(file, file_format), batch_size=options['batch_size'])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Failed to import {path}: {e!r}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.rows} rows in {result.seconds:.2f}s ({result.rows_per_second:.0f} rows/sec), '
+            f'{result.line_items_created} line items created, {result.line_items_updated} updated'
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from placements_io.models import CampaignTotals
+
+
+class Command(BaseCommand):
+    help = 'Rebuild CampaignTotals from LineItem, or verify it for drift detection with --verify'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only compare CampaignTotals with LineItem, exit with error if any campaign drifts',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            drifted_campaign_ids = CampaignTotals.objects.find_drift()
+            if drifted_campaign_ids:
+                raise CommandError(
+                    f'{len(drifted_campaign_ids)} campaign totals drifted, campaign ids: {drifted_campaign_ids}'
+                )
+            self.stdout.write(self.style.SUCCESS('Campaign totals are consistent with line items'))
+            return
+
+        # Readers never see a half rebuilt table
+        with transaction.atomic():
+            created = CampaignTotals.objects.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt totals of {created} campaigns'))
@@ -0,0 +1,31 @@
+import socket
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from placements_io.export_jobs import run_pending_jobs, run_workers
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of worker processes which write pending CSV export jobs to settings.EXPORT_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None, help='Default settings.EXPORT_WORKERS')
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=None,
+            help='Seconds between polls of an empty queue, default settings.EXPORT_POLL_INTERVAL',
+        )
+        parser.add_argument('--once', action='store_true', help='Run pending jobs in this process and exit')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            count = run_pending_jobs(socket.gethostname())
+            self.stdout.write(self.style.SUCCESS(f'{count} export jobs are run'))
+            return
+
+        processes = options['processes'] or settings.EXPORT_WORKERS
+        poll_interval = options['poll_interval'] or settings.EXPORT_POLL_INTERVAL
+        self.stdout.write(f'Starting {processes} export workers')
+        run_workers(processes, poll_interval)
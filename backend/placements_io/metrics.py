@@ -0,0 +1,417 @@
+"""
+Per-request metrics: SQL query count, DB time, serialization time, render time and response bytes
+
+MetricsMiddleware measures every request and sends the result back in a Server-Timing header
+    (visible in the Network panel of browsers), and adds it to histograms per URL name,
+    which GET api/metrics/ serves in Prometheus text format.
+Queries are counted by an execute wrapper installed on every DB connection (no DEBUG needed),
+    serialization is timed by TimedSerializerMixin and timed('serialize') around fast_serializers.
+The same wrapper reports N+1 queries with settings.N_PLUS_ONE_THRESHOLD, see placements_io.query_guard.
+
+Each uvicorn worker process has its own histograms, with settings.METRICS_DIR they are written there
+    as JSON every METRICS_FLUSH_INTERVAL seconds, and api/metrics/ merges the files of all workers.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from rest_framework import serializers
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpRequest, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from placements_io.query_guard import QueryShapeCounter, log_duplicates
+
+
+METRIC_PREFIX = 'placements_io'
+METRICS_FLUSH_INTERVAL = 1.0
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# name: (help, buckets)
+HISTOGRAMS = {
+    'request_duration_seconds': ('Time from the first middleware to the last byte of response', SECONDS_BUCKETS),
+    'db_queries': ('SQL queries per request', QUERIES_BUCKETS),
+    'db_duration_seconds': ('Time spent in SQL queries per request', SECONDS_BUCKETS),
+    'serialize_duration_seconds': ('Time spent in serializers per request, SQL excluded', SECONDS_BUCKETS),
+    'render_duration_seconds': ('Time spent in renderers per request, SQL excluded', SECONDS_BUCKETS),
+    'response_size_bytes': ('Bytes of response body', BYTES_BUCKETS),
+}
+
+
+@dataclass
+class RequestMetrics:
+    started_at: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db_time: float = 0.0
+    # 'serialize' / 'render': seconds
+    timings: dict[str, float] = field(default_factory=dict)
+    active: set[str] = field(default_factory=set)
+    # With settings.N_PLUS_ONE_THRESHOLD only, see placements_io.query_guard
+    query_shapes: QueryShapeCounter | None = None
+
+    @classmethod
+    def start(cls) -> 'RequestMetrics':
+        threshold = settings.N_PLUS_ONE_THRESHOLD
+        return cls(query_shapes=QueryShapeCounter(threshold) if threshold else None)
+
+    def server_timing(self, duration: float) -> str:
+        entries = [f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"']
+        entries += [f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.timings.items()]
+        entries.append(f'total;dur={duration * 1000:.2f}')
+        return ', '.join(entries)
+
+
+_current: ContextVar[RequestMetrics | None] = ContextVar('placements_io_request_metrics', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started_at
+        if metrics.query_shapes is not None:
+            metrics.query_shapes.record(sql)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Sent on every (re)connect of the same DatabaseWrapper, so install only once
+    Inserted at the bottom of the stack, connection.execute_wrapper() of others pops their own wrapper from the top.
+    """
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+@contextmanager
+def timed(name: str):
+    """
+    Add the time of the block to timing `name` of the current request, SQL queries inside excluded
+    Nested blocks of the same name are counted once, no-op outside of a request.
+    """
+    metrics = _current.get()
+    if metrics is None or name in metrics.active:
+        yield
+        return
+
+    metrics.active.add(name)
+    started_at = time.perf_counter()
+    db_time = metrics.db_time
+    try:
+        yield
+    finally:
+        metrics.active.discard(name)
+        elapsed = time.perf_counter() - started_at - (metrics.db_time - db_time)
+        metrics.timings[name] = metrics.timings.get(name, 0.0) + elapsed
+
+
+@contextmanager
+def allow_duplicate_queries():
+    """
+    Queries of the block are repeated by design (e.g. one per chunk), don't report them as N+1
+    """
+    metrics = _current.get()
+    query_shapes = metrics.query_shapes if metrics is not None else None
+    if query_shapes is None:
+        yield
+        return
+
+    query_shapes.paused += 1
+    try:
+        yield
+    finally:
+        query_shapes.paused -= 1
+
+
+class TimedSerializerMixin:
+    """
+    Time serializer.data as 'serialize', including nested serializers of SerializerMethodField
+    """
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class Registry:
+    """
+    Histograms and request counter per (url_name, method), in memory of this process
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            # (histogram, url_name, method): [count of each bucket..., count of +Inf bucket, sum, count]
+            self.histograms: dict[tuple[str, str, str], list[float]] = {}
+            # (url_name, method, status): count
+            self.requests: dict[tuple[str, str, str], int] = defaultdict(int)
+            self.flushed_at = 0.0
+
+    def observe(self, url_name: str, method: str, status: int, duration: float, metrics: RequestMetrics, size: int):
+        values = {
+            'request_duration_seconds': duration,
+            'db_queries': metrics.queries,
+            'db_duration_seconds': metrics.db_time,
+            'serialize_duration_seconds': metrics.timings.get('serialize', 0.0),
+            'render_duration_seconds': metrics.timings.get('render', 0.0),
+            'response_size_bytes': size,
+        }
+        with self.lock:
+            for name, value in values.items():
+                buckets = HISTOGRAMS[name][1]
+                key = (name, url_name, method)
+                counts = self.histograms.get(key)
+                if counts is None:
+                    counts = self.histograms[key] = [0] * (len(buckets) + 3)
+                for i, bound in enumerate(buckets):
+                    if value <= bound:
+                        counts[i] += 1
+                        break
+                else:
+                    counts[len(buckets)] += 1  # +Inf
+                counts[-2] += value
+                counts[-1] += 1
+            self.requests[(url_name, method, str(status))] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                'histograms': [[*key, counts.copy()] for key, counts in self.histograms.items()],
+                'requests': [[*key, count] for key, count in self.requests.items()],
+            }
+
+    def flush(self, force: bool = False):
+        """
+        Write the snapshot to settings.METRICS_DIR, at most once per METRICS_FLUSH_INTERVAL
+        """
+        now = time.monotonic()
+        if not settings.METRICS_DIR or (not force and now - self.flushed_at < METRICS_FLUSH_INTERVAL):
+            return
+        self.flushed_at = now
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'metrics-{os.getpid()}.json'
+        part_path = path.with_name(f'.{path.name}.{threading.get_ident()}.part')
+        part_path.write_text(json.dumps(self.snapshot()))
+        os.replace(part_path, path)
+
+
+registry = Registry()
+
+
+def collect_snapshots() -> list[dict]:
+    """
+    Snapshot of this process, and files of other processes in settings.METRICS_DIR
+    """
+    snapshots = [registry.snapshot()]
+    if settings.METRICS_DIR:
+        own_name = f'metrics-{os.getpid()}.json'
+        for path in Path(settings.METRICS_DIR).glob('metrics-*.json'):
+            if path.name == own_name:
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # Removed or being replaced
+    return snapshots
+
+
+def _labels(**labels) -> str:
+    escaped = (
+        name + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus(snapshots: list[dict]) -> str:
+    histograms: dict[tuple[str, str, str], list[float]] = {}
+    requests: dict[tuple[str, str, str], int] = defaultdict(int)
+    for snapshot in snapshots:
+        for name, url_name, method, counts in snapshot['histograms']:
+            merged = histograms.setdefault((name, url_name, method), [0] * len(counts))
+            for i, count in enumerate(counts):
+                merged[i] += count
+        for url_name, method, status, count in snapshot['requests']:
+            requests[(url_name, method, status)] += count
+
+    lines = [
+        f'# HELP {METRIC_PREFIX}_requests_total Requests by URL name, method and status',
+        f'# TYPE {METRIC_PREFIX}_requests_total counter',
+    ]
+    for (url_name, method, status), count in sorted(requests.items()):
+        lines.append(f'{METRIC_PREFIX}_requests_total{_labels(url_name=url_name, method=method, status=status)} {count}')
+
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        metric = f'{METRIC_PREFIX}_{name}'
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+        for (histogram, url_name, method), counts in sorted(histograms.items()):
+            if histogram != name:
+                continue
+            cumulative = 0
+            for bound, count in zip([*buckets, '+Inf'], counts[:-2]):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(bound)
+                lines.append(f'{metric}_bucket{_labels(url_name=url_name, method=method, le=le)} {_number(cumulative)}')
+            lines.append(f'{metric}_sum{_labels(url_name=url_name, method=method)} {_number(counts[-2])}')
+            lines.append(f'{metric}_count{_labels(url_name=url_name, method=method)} {_number(counts[-1])}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Prometheus scrape endpoint, for staff users or `Authorization: Bearer <settings.METRICS_TOKEN>`
+    """
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if not (token and constant_time_compare(authorization, f'Bearer {token}')) and not request.user.is_staff:
+        raise PermissionDenied
+    return HttpResponse(
+        render_prometheus(collect_snapshots()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+class MetricsMiddleware:
+    """
+    Must be the first of settings.MIDDLEWARE to measure the others
+    Responses streamed by StreamingHttpResponse are measured when the last chunk is sent.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics.start()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        # Context of the request task, sync_to_async() copies it into the thread of sync code
+        metrics = RequestMetrics.start()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def process_template_response(self, request, response):
+        # DRF Response is rendered after all middlewares, time it by a callback
+        metrics = _current.get()
+        if metrics is not None:
+            started_at = time.perf_counter()
+            db_time = metrics.db_time
+
+            def rendered(response):
+                metrics.timings['render'] = (
+                    metrics.timings.get('render', 0.0) + time.perf_counter() - started_at - (metrics.db_time - db_time)
+                )
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request: HttpRequest, response: HttpResponse, metrics: RequestMetrics) -> HttpResponse:
+        resolver_match = getattr(request, 'resolver_match', None)
+        url_name = resolver_match.view_name if resolver_match else 'unmatched'
+        method = request.method if request.method in METHODS else 'other'
+
+        def observe(size: int):
+            duration = time.perf_counter() - metrics.started_at
+            registry.observe(url_name, method, response.status_code, duration, metrics, size)
+            registry.flush()
+            if metrics.query_shapes is not None:
+                log_duplicates(url_name, metrics.query_shapes)
+
+        if settings.METRICS_SERVER_TIMING:
+            # Of streaming responses, only the time before the first chunk
+            response['Server-Timing'] = metrics.server_timing(time.perf_counter() - metrics.started_at)
+
+        if not response.streaming:
+            observe(len(response.content))
+        elif response.is_async:
+            response.streaming_content = self._aiter_measured(response.streaming_content, metrics, observe)
+        else:
+            response.streaming_content = self._iter_measured(response.streaming_content, metrics, observe)
+        return response
+
+    @staticmethod
+    def _iter_measured(content, metrics: RequestMetrics, observe):
+        size = 0
+        iterator = iter(content)
+        try:
+            while True:
+                token = _current.set(metrics)
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    _current.reset(token)
+                size += len(chunk)
+                yield chunk
+        finally:
+            observe(size)
+
+    @staticmethod
+    async def _aiter_measured(content, metrics: RequestMetrics, observe):
+        size = 0
+        iterator = aiter(content)
+        try:
+            while True:
+                token = _current.set(metrics)
+                try:
+                    chunk = await anext(iterator)
+                except StopAsyncIteration:
+                    break
+                finally:
+                    _current.reset(token)
+                size += len(chunk)
+                yield chunk
+        finally:
+            observe(size)
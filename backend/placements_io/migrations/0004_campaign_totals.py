@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:50
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_campaign_totals(apps, schema_editor):
+    """
+    Aggregate totals of existing LineItem, include the sample data seeded in 0003
+    """
+    LineItem = apps.get_model('placements_io', 'LineItem')
+    CampaignTotals = apps.get_model('placements_io', 'CampaignTotals')
+
+    rows = (
+        LineItem.objects.values('campaign_id')
+        .annotate(
+            booked_amount=Sum('booked_amount'),
+            actual_amount=Sum('actual_amount'),
+            adjustment_amount=Sum('adjustment_amount'),
+            line_items_count=Count('id'),
+        )
+        .order_by('campaign_id')
+    )
+    CampaignTotals.objects.bulk_create(
+        (CampaignTotals(**row) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+def reverse_populate_campaign_totals(apps, schema_editor):
+    CampaignTotals = apps.get_model('placements_io', 'CampaignTotals')
+    CampaignTotals.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements_io', '0003_seed_sample_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignTotals',
+            fields=[
+                ('campaign', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='totals', serialize=False, to='placements_io.campaign')),
+                ('booked_amount', models.DecimalField(decimal_places=20, default=Decimal('0'), max_digits=40)),
+                ('actual_amount', models.DecimalField(decimal_places=20, default=Decimal('0'), max_digits=40)),
+                ('adjustment_amount', models.DecimalField(decimal_places=20, default=Decimal('0'), max_digits=40)),
+                ('line_items_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_campaign_totals, reverse_code=reverse_populate_campaign_totals),
+    ]
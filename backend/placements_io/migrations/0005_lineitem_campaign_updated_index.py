@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements_io', '0004_campaign_totals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lineitem',
+            index=models.Index(fields=['campaign', '-updated_at', '-created_at', 'id'], name='lineitem_campaign_updated_idx'),
+        ),
+    ]
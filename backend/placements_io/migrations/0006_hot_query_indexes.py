@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements_io', '0005_lineitem_campaign_updated_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='campaign',
+            index=models.Index(fields=['created_at', 'id'], name='campaign_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lineitem',
+            index=models.Index(fields=['campaign', 'id'], include=('booked_amount', 'actual_amount', 'adjustment_amount'), name='lineitem_campaign_amounts_idx'),
+        ),
+        # Drop the index of foreign key after composite indexes are ready, campaign_id is never unindexed
+        migrations.AlterField(
+            model_name='lineitem',
+            name='campaign',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='placements_io.campaign'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:23
+
+import placements_io.fields
+from django.conf import settings
+from django.db import migrations
+
+
+def convert_to_setting_storage(apps, schema_editor):
+    """
+    Columns stay NUMERIC(30, 20) unless settings.AMOUNT_STORAGE is 'micro',
+        conversion is refused if any amount has more than 6 decimal places
+    """
+    LineItem = apps.get_model('placements_io', 'LineItem')
+    placements_io.fields.convert_amount_storage(schema_editor, LineItem, settings.AMOUNT_STORAGE)
+
+
+def convert_to_numeric_storage(apps, schema_editor):
+    LineItem = apps.get_model('placements_io', 'LineItem')
+    placements_io.fields.convert_amount_storage(schema_editor, LineItem, 'numeric')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements_io', '0006_hot_query_indexes'),
+    ]
+
+    operations = [
+        # AlterField would cast NUMERIC to BIGINT by itself and round amounts silently,
+        #   only state is altered here, columns are converted with a precision check below
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='lineitem',
+                    name='actual_amount',
+                    field=placements_io.fields.AmountField(decimal_places=20, max_digits=30),
+                ),
+                migrations.AlterField(
+                    model_name='lineitem',
+                    name='adjustment_amount',
+                    field=placements_io.fields.AmountField(decimal_places=20, max_digits=30),
+                ),
+                migrations.AlterField(
+                    model_name='lineitem',
+                    name='booked_amount',
+                    field=placements_io.fields.AmountField(decimal_places=20, max_digits=30),
+                ),
+            ],
+        ),
+        migrations.RunPython(convert_to_setting_storage, convert_to_numeric_storage),
+    ]
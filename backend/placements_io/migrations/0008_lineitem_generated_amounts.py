@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:26
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import placements_io.fields
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements_io', '0007_amount_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lineitem',
+            name='budget_fullfillment_rate',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(models.F('actual_amount'), '+', models.F('adjustment_amount')), models.DecimalField(decimal_places=20, max_digits=45)), '*', models.Value(100)), '/', django.db.models.functions.comparison.NullIf(django.db.models.functions.comparison.Cast(models.F('booked_amount'), models.DecimalField(decimal_places=20, max_digits=45)), models.Value(Decimal('0')))), function='TRUNC', output_field=models.DecimalField(decimal_places=20, max_digits=45)), output_field=models.DecimalField(decimal_places=0, max_digits=40)),
+        ),
+        migrations.AddField(
+            model_name='lineitem',
+            name='final_amount',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('actual_amount'), '+', models.F('adjustment_amount')), output_field=placements_io.fields.AmountField(decimal_places=20, max_digits=31)),
+        ),
+        migrations.AddIndex(
+            model_name='lineitem',
+            index=models.Index(fields=['campaign', 'final_amount'], name='lineitem_campaign_final_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lineitem',
+            index=models.Index(fields=['campaign', 'budget_fullfillment_rate'], name='lineitem_campaign_rate_idx'),
+        ),
+    ]
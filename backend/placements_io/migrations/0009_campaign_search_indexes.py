@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:31
+
+import django.contrib.postgres.indexes
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from decimal import Decimal
+from django.db import migrations, models
+
+
+TRIGRAM_INDEX = django.contrib.postgres.indexes.GinIndex(
+    django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'),
+    name='campaign_name_trgm_idx',
+)
+
+
+def has_pg_trgm(schema_editor) -> bool:
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def add_trigram_index(apps, schema_editor):
+    if not has_pg_trgm(schema_editor):
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.add_index(apps.get_model('placements_io', 'Campaign'), TRIGRAM_INDEX)
+
+
+def remove_trigram_index(apps, schema_editor):
+    schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(TRIGRAM_INDEX.name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements_io', '0008_lineitem_generated_amounts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaigntotals',
+            name='budget_fullfillment_rate',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(models.F('actual_amount'), '+', models.F('adjustment_amount')), models.DecimalField(decimal_places=20, max_digits=45)), '*', models.Value(100)), '/', django.db.models.functions.comparison.NullIf(django.db.models.functions.comparison.Cast(models.F('booked_amount'), models.DecimalField(decimal_places=20, max_digits=45)), models.Value(Decimal('0')))), function='TRUNC', output_field=models.DecimalField(decimal_places=20, max_digits=45)), output_field=models.DecimalField(decimal_places=0, max_digits=40)),
+        ),
+        # pg_trgm is a contrib extension, it's shipped by postgres docker images and Heroku Postgres,
+        #   but may be missing in a bare PostgreSQL. Name search still works without the index, by sequential scan.
+        # The index is kept out of model state, which can't tell whether it exists in DB
+        migrations.RunPython(add_trigram_index, remove_trigram_index),
+        migrations.AddIndex(
+            model_name='campaigntotals',
+            index=models.Index(fields=['budget_fullfillment_rate'], name='totals_rate_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements_io', '0010_export_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='format',
+            field=models.CharField(default='csv', max_length=16),
+        ),
+    ]
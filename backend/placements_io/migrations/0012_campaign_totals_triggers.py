@@ -0,0 +1,45 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+from placements_io.fields import is_micro_storage
+from placements_io.totals_triggers import drop_campaign_totals_triggers, install_campaign_totals_triggers
+
+
+def install_triggers(apps, schema_editor):
+    """
+    Install the triggers, then rebuild totals which writes before them may have left behind
+    """
+    install_campaign_totals_triggers(schema_editor, micro=is_micro_storage())
+
+    LineItem = apps.get_model('placements_io', 'LineItem')
+    CampaignTotals = apps.get_model('placements_io', 'CampaignTotals')
+    CampaignTotals.objects.all().delete()
+    rows = (
+        LineItem.objects.values('campaign_id')
+        .annotate(
+            booked_amount=Sum('booked_amount'),
+            actual_amount=Sum('actual_amount'),
+            adjustment_amount=Sum('adjustment_amount'),
+            line_items_count=Count('id'),
+        )
+        .order_by('campaign_id')
+    )
+    CampaignTotals.objects.bulk_create(
+        (CampaignTotals(**row) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+def drop_triggers(apps, schema_editor):
+    drop_campaign_totals_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements_io', '0011_export_job_format'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_triggers, reverse_code=drop_triggers),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+def fill_heartbeat(apps, schema_editor):
+    # Running jobs claimed before the field existed are judged by when they started
+    ExportJob = apps.get_model('placements_io', 'ExportJob')
+    ExportJob.objects.filter(started_at__isnull=False).update(heartbeat_at=models.F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placements_io', '0012_campaign_totals_triggers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_heartbeat, reverse_code=migrations.RunPython.noop),
+    ]
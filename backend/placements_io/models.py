@@ -1,5 +1,13 @@
+from collections.abc import Sequence
+from datetime import timedelta
 from decimal import Decimal
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, F, Func, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
+
+from placements_io.fields import AmountField
 
 """
 In this simplfied DEMO,
@@ -9,23 +17,174 @@ In this simplfied DEMO,
 """
 
 
+# Operands of budget fullfillment rate, wide enough for (Actual + Adjustment Amount) * 100 / Booked Amount
+RATE_OPERAND_FIELD = models.DecimalField(max_digits=45, decimal_places=20)
+
+
+def budget_fullfillment_rate_expression(final_amount, booked_amount) -> Func:
+    """
+    TRUNC(final_amount * 100 / booked_amount) in NUMERIC, truncated toward zero same as int(), NULL if booked is 0
+    Same result for both amount storages (see placements_io.fields), the scale of micro-units is cancelled out
+    """
+    return Func(
+        Cast(final_amount, RATE_OPERAND_FIELD) * Value(100)
+        / NullIf(Cast(booked_amount, RATE_OPERAND_FIELD), Value(Decimal(0))),
+        function='TRUNC',
+        output_field=RATE_OPERAND_FIELD,
+    )
+
+
+class CampaignQuerySet(models.QuerySet):
+
+    def with_totals(self, source: str | None = None) -> 'CampaignQuerySet':
+        """
+        Annotate LineItem totals of each campaign, so no LineItem row is loaded into Python.
+        source:
+            - aggregate: aggregation is done by DB in a single GROUP BY query
+            - materialized: read from CampaignTotals, O(campaigns) instead of O(line items)
+            - None: follow settings.CAMPAIGN_TOTALS_SOURCE
+        Campaign without any LineItem get 0 instead of NULL, same as sum() of empty list in Python.
+        total_budget_fullfillment_rate is for filtering in SQL (NULL if booked is 0),
+            it's indexed with materialized source, see CampaignTotals.budget_fullfillment_rate
+        """
+        source = source or settings.CAMPAIGN_TOTALS_SOURCE
+        zero = Value(Decimal(0))
+
+        if source == 'materialized':
+            return self.annotate(
+                total_booked_amount=Coalesce(F('totals__booked_amount'), zero),
+                total_actual_amount=Coalesce(F('totals__actual_amount'), zero),
+                total_adjustment_amount=Coalesce(F('totals__adjustment_amount'), zero),
+                line_items_count=Coalesce(F('totals__line_items_count'), 0),
+                total_budget_fullfillment_rate=F('totals__budget_fullfillment_rate'),
+            )
+
+        return self.annotate(
+            total_booked_amount=Coalesce(Sum('lineitem__booked_amount'), zero),
+            total_actual_amount=Coalesce(Sum('lineitem__actual_amount'), zero),
+            total_adjustment_amount=Coalesce(Sum('lineitem__adjustment_amount'), zero),
+            line_items_count=Count('lineitem'),
+            total_budget_fullfillment_rate=budget_fullfillment_rate_expression(
+                Sum('lineitem__actual_amount') + Sum('lineitem__adjustment_amount'),
+                Sum('lineitem__booked_amount'),
+            ),
+        )
+
+    def summary(self, bands: dict[str, tuple[int | None, int | None]], bucket_bounds: Sequence[int]) -> dict:
+        """
+        Portfolio-wide totals, campaigns per budget band and histogram of budget fullfillment rate,
+            by one aggregate query over with_totals() (the queryset must be annotated by it)
+        bands: inclusive (min, max) of rate, same as CampaignFilter.budget_bands
+        bucket_bounds: ascending, buckets are [bound, next bound), plus one below the first and one from the last
+        Campaigns without booked amount have no rate, they are counted as `unbooked` only.
+        """
+        rate = 'total_budget_fullfillment_rate'
+
+        def rate_range(low: int | None, high: int | None, high_lookup: str = 'lte') -> Q:
+            q = Q(**{f'{rate}__isnull': False})
+            if low is not None:
+                q &= Q(**{f'{rate}__gte': low})
+            if high is not None:
+                q &= Q(**{f'{rate}__{high_lookup}': high})
+            return q
+
+        edges = [None, *bucket_bounds, None]
+        buckets = list(zip(edges, edges[1:]))
+        # Names must differ from the annotations of with_totals() they aggregate
+        aggregates = {
+            'campaigns': Count('id'),
+            'line_items': Sum('line_items_count'),
+            'booked': Sum('total_booked_amount'),
+            'actual': Sum('total_actual_amount'),
+            'adjustment': Sum('total_adjustment_amount'),
+            'unbooked': Count('id', filter=Q(**{f'{rate}__isnull': True})),
+            **{f'band_{name}': Count('id', filter=rate_range(*band)) for name, band in bands.items()},
+            **{
+                f'bucket_{i}': Count('id', filter=rate_range(low, high, high_lookup='lt'))
+                for i, (low, high) in enumerate(buckets)
+            },
+        }
+        result = self.aggregate(**aggregates)
+
+        zero = Decimal(0)
+        total_booked_amount = result['booked'] or zero
+        total_actual_amount = result['actual'] or zero
+        total_adjustment_amount = result['adjustment'] or zero
+        potential_invoice_amount = total_actual_amount + total_adjustment_amount
+        return {
+            'campaigns_count': result['campaigns'],
+            'line_items_count': result['line_items'] or 0,
+            'total_booked_amount': total_booked_amount,
+            'total_actual_amount': total_actual_amount,
+            'total_adjustment_amount': total_adjustment_amount,
+            'potential_invoice_amount': potential_invoice_amount,
+            # Same truncation as Campaign.budget_fullfillment_rate
+            'budget_fullfillment_rate': (
+                int(potential_invoice_amount / total_booked_amount * 100) if total_booked_amount else None
+            ),
+            'budget_bands': {
+                **{name: result[f'band_{name}'] for name in bands},
+                'unbooked': result['unbooked'],
+            },
+            'budget_fullfillment_rate_histogram': [
+                {'min': low, 'max': high, 'count': result[f'bucket_{i}']}
+                for i, (low, high) in enumerate(buckets)
+            ],
+        }
+
+
 class Campaign(models.Model):
     id = models.AutoField(primary_key=True)  # Auto increment integer id
     name = models.CharField(max_length=255)  # max_length can be larger in real case
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CampaignQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset of cursor pagination and created_at range filter, see CampaignCursorPagination
+            models.Index(fields=['created_at', 'id'], name='campaign_created_idx'),
+            # campaign_name_trgm_idx serves name__icontains, it's created by 0009_campaign_search_indexes
+            #   only if pg_trgm is available, so it's not declared here
+        ]
+
     def __str__(self):
         return self.name
 
     @property
-    def budget_fullfillment_rate(self) -> int:
+    def has_totals(self) -> bool:
+        """
+        True if this instance is loaded by CampaignQuerySet.with_totals()
+        """
+        return hasattr(self, 'total_booked_amount')
+
+    @property
+    def potential_invoice_amount(self) -> Decimal:
+        """
+        Sum of LineItem.final_amount, which is the amount could be invoiced
+        """
+        if self.has_totals:
+            return self.total_actual_amount + self.total_adjustment_amount
+
+        # Fallback to Python, prefer prefetch_related('lineitem_set') to prevent N+1 queries
+        return sum(line_item.final_amount for line_item in self.lineitem_set.all())
+
+    @property
+    def budget_fullfillment_rate(self) -> int | None:
         """
         A percentage value indicate how much of the budget is fullfilled
         If LineItem.count is 10 and LineItem.budget_fullfillment_rate is 50, then Budget Fullfillment Rate is 50%
+        None if nothing is booked (no line item or booked amounts sum to 0), i.e. the campaign is unbooked
         """
-        line_items = self.lineitem_set.all()
-        total_booked_amount = sum(line_item.booked_amount for line_item in line_items)
-        total_final_amount = sum(line_item.final_amount for line_item in line_items)
+        if self.has_totals:
+            total_booked_amount = self.total_booked_amount
+            total_final_amount = self.total_actual_amount + self.total_adjustment_amount
+        else:
+            line_items = self.lineitem_set.all()
+            total_booked_amount = sum(line_item.booked_amount for line_item in line_items)
+            total_final_amount = sum(line_item.final_amount for line_item in line_items)
+        if not total_booked_amount:
+            return None
         return int(total_final_amount / total_booked_amount * 100)
 
 
@@ -34,29 +193,242 @@ class LineItem(models.Model):
     campaign = models.ForeignKey(
         Campaign,
         on_delete=models.CASCADE,  # LineItem not exist alone without Campaign
+        db_index=False,  # Composite indexes in Meta lead with campaign, a single column index is redundant
     )
     name = models.CharField(max_length=255)  # max_length can be larger in real case
     # decimal_places should be enough to store the given precision
-    booked_amount = models.DecimalField(max_digits=30, decimal_places=20)
-    actual_amount = models.DecimalField(max_digits=30, decimal_places=20)
+    booked_amount = AmountField(max_digits=30, decimal_places=20)
+    actual_amount = AmountField(max_digits=30, decimal_places=20)
     # Use "amount" postfix to adjustment to indicate it's same data type as booked_amount and actual_amount
-    adjustment_amount = models.DecimalField(max_digits=30, decimal_places=20)
+    adjustment_amount = AmountField(max_digits=30, decimal_places=20)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    @property  # This model attribute not stored in DB, instead, it's calculated on the fly
-    def final_amount(self) -> Decimal:
-        return self.actual_amount + self.adjustment_amount
+    class Meta:
+        indexes = [
+            # Covering the default ordering of line items in a campaign, see LineItem.DEFAULT_ORDERING
+            models.Index(
+                fields=['campaign', '-updated_at', '-created_at', 'id'],
+                name='lineitem_campaign_updated_idx',
+            ),
+            # Covering totals of a campaign (Campaign.objects.with_totals) and CSV export ordered by id,
+            #   amounts are stored in the index so totals are read by index-only scan.
+            #   CSV export also reads name from the table, it is left out as it would bloat the index.
+            models.Index(
+                fields=['campaign', 'id'],
+                include=['booked_amount', 'actual_amount', 'adjustment_amount'],
+                name='lineitem_campaign_amounts_idx',
+            ),
+            # Filtering and sorting line items of a campaign by generated columns
+            models.Index(fields=['campaign', 'final_amount'], name='lineitem_campaign_final_idx'),
+            models.Index(fields=['campaign', 'budget_fullfillment_rate'], name='lineitem_campaign_rate_idx'),
+        ]
 
-    @property
-    def budget_fullfillment_rate(self) -> int:
+    # Most recently updated first, id breaks the tie so the order is stable for pagination
+    DEFAULT_ORDERING = ('-updated_at', '-created_at', 'id')
+
+    # Computed and stored by DB (GENERATED ALWAYS AS ... STORED), so they can be filtered, sorted and indexed
+    # A GeneratedField is read only and stale after save(), call refresh_from_db() to read the new value
+    final_amount = models.GeneratedField(
+        expression=F('actual_amount') + F('adjustment_amount'),
+        # One more integer digit than amounts, sum of two amounts never overflows
+        output_field=AmountField(max_digits=31, decimal_places=20),
+        db_persist=True,
+    )
+    # A percentage value indicate how much of the budget is fullfilled
+    # If Booked Amount is 100 and Actual + Adjustment Amount is 50, then Budget Fullfillment Rate is 50%
+    # If Booked Amount is 100 and Actual + Adjustment Amount is 150, then Budget Fullfillment Rate is 150%
+    # If Booked Amount is 100 and Actual + Adjustment Amount is 0, then Budget Fullfillment Rate is 0%
+    budget_fullfillment_rate = models.GeneratedField(
+        expression=budget_fullfillment_rate_expression(F('actual_amount') + F('adjustment_amount'), F('booked_amount')),
+        output_field=models.DecimalField(max_digits=40, decimal_places=0),
+        db_persist=True,
+    )
+
+    def __str__(self):
+        return self.name
+
+
+class CampaignTotalsManager(models.Manager):
+
+    def rebuild(self, batch_size: int = 1000) -> int:
         """
-        A percentage value indicate how much of the budget is fullfilled
-        If Booked Amount is 100 and Actual + Adjustment Amount is 50, then Budget Fullfillment Rate is 50%
-        If Booked Amount is 100 and Actual + Adjustment Amount is 150, then Budget Fullfillment Rate is 150%
-        If Booked Amount is 100 and Actual + Adjustment Amount is 0, then Budget Fullfillment Rate is 0%
+        Drop and recompute every CampaignTotals from LineItem, return the number of rows created
+        """
+        campaigns = (
+            Campaign.objects.with_totals(source='aggregate')
+            .order_by('id')
+            .values_list(
+                'id', 'total_booked_amount', 'total_actual_amount', 'total_adjustment_amount', 'line_items_count',
+            )
+        )
+
+        self.all().delete()
+
+        created, batch = 0, []
+        for campaign_id, booked_amount, actual_amount, adjustment_amount, line_items_count in campaigns.iterator(
+            chunk_size=batch_size,
+        ):
+            batch.append(CampaignTotals(
+                campaign_id=campaign_id,
+                booked_amount=booked_amount,
+                actual_amount=actual_amount,
+                adjustment_amount=adjustment_amount,
+                line_items_count=line_items_count,
+            ))
+            if len(batch) >= batch_size:
+                created += len(self.bulk_create(batch))
+                batch = []
+        created += len(self.bulk_create(batch))
+        return created
+
+    def find_drift(self) -> list[int]:
+        """
+        Compare CampaignTotals with totals aggregated from LineItem, return id of campaigns which are not consistent
         """
-        return int((self.actual_amount + self.adjustment_amount) / self.booked_amount * 100)
+        materialized = {
+            campaign_id: totals
+            for campaign_id, *totals in Campaign.objects.with_totals(source='materialized').values_list(
+                'id', 'total_booked_amount', 'total_actual_amount', 'total_adjustment_amount', 'line_items_count',
+            )
+        }
+        aggregated = Campaign.objects.with_totals(source='aggregate').order_by('id').values_list(
+            'id', 'total_booked_amount', 'total_actual_amount', 'total_adjustment_amount', 'line_items_count',
+        )
+        return [
+            campaign_id
+            for campaign_id, *totals in aggregated
+            if materialized.get(campaign_id) != totals
+        ]
+
+
+class CampaignTotals(models.Model):
+    """
+    Denormalized LineItem totals of a campaign,
+        kept current by triggers on every LineItem write in DB (see placements_io.totals_triggers),
+        use `manage.py rebuild_campaign_totals` to rebuild or verify it from scratch.
+    """
+    campaign = models.OneToOneField(
+        Campaign,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='totals',
+    )
+    # Larger max_digits than LineItem, sum of many amounts needs more integer digits
+    booked_amount = models.DecimalField(max_digits=40, decimal_places=20, default=Decimal(0))
+    actual_amount = models.DecimalField(max_digits=40, decimal_places=20, default=Decimal(0))
+    adjustment_amount = models.DecimalField(max_digits=40, decimal_places=20, default=Decimal(0))
+    line_items_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Same as LineItem.budget_fullfillment_rate, indexed for filtering campaign list by budget band
+    budget_fullfillment_rate = models.GeneratedField(
+        expression=budget_fullfillment_rate_expression(F('actual_amount') + F('adjustment_amount'), F('booked_amount')),
+        output_field=models.DecimalField(max_digits=40, decimal_places=0),
+        db_persist=True,
+    )
+
+    objects = CampaignTotalsManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['budget_fullfillment_rate'], name='totals_rate_idx'),
+        ]
 
     def __str__(self):
-        return self.name
+        return f'Totals of campaign {self.campaign_id}'
+
+
+class ExportJobManager(models.Manager):
+
+    def claim(self, worker: str) -> 'ExportJob | None':
+        """
+        Take the oldest pending job and mark it running, the table itself is the queue so no broker is needed.
+        SELECT ... FOR UPDATE SKIP LOCKED lets concurrent workers pass over the row locked by each other,
+            so a job is claimed by exactly one worker.
+        """
+        with transaction.atomic():
+            job = (
+                self.select_for_update(skip_locked=True)
+                .filter(status=ExportJob.Status.PENDING)
+                .order_by('id')
+                .first()
+            )
+            if job is None:
+                return None
+            job.status = ExportJob.Status.RUNNING
+            job.worker = worker
+            job.attempts += 1
+            job.started_at = job.heartbeat_at = timezone.now()
+            job.save(update_fields=['status', 'worker', 'attempts', 'started_at', 'heartbeat_at'])
+        return job
+
+    def heartbeat(self, job: 'ExportJob') -> bool:
+        """
+        Tell requeue_stale() the worker is still alive, return False if the job has been requeued meanwhile
+        """
+        return bool(
+            self.filter(id=job.id, status=ExportJob.Status.RUNNING, attempts=job.attempts)
+            .update(heartbeat_at=timezone.now())
+        )
+
+    def requeue_stale(self, timeout: timedelta, max_attempts: int) -> int:
+        """
+        Jobs of a killed worker stay running forever, put them back to pending,
+            or fail them if they have been tried max_attempts times already.
+        A job is stale when its worker has not sent a heartbeat for timeout, however long the job has been running.
+        """
+        stale = self.filter(status=ExportJob.Status.RUNNING, heartbeat_at__lt=timezone.now() - timeout)
+        failed = stale.filter(attempts__gte=max_attempts).update(
+            status=ExportJob.Status.FAILED,
+            error='Worker stopped sending heartbeat',
+            finished_at=timezone.now(),
+        )
+        return failed + stale.update(status=ExportJob.Status.PENDING)
+
+
+class ExportJob(models.Model):
+    """
+    An export written to a file under settings.EXPORT_ROOT by `manage.py run_export_workers`,
+        see placements_io.export_jobs
+    """
+
+    class Kind(models.TextChoices):
+        CAMPAIGNS = 'campaigns'
+        LINE_ITEMS = 'line_items'
+
+    class Status(models.TextChoices):
+        PENDING = 'pending'
+        RUNNING = 'running'
+        DONE = 'done'
+        FAILED = 'failed'
+
+    id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    # Only for line items export
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, null=True, blank=True)
+    # One of placements_io.exports.EXPORT_FORMATS
+    format = models.CharField(max_length=16, default='csv')
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    # Relative to settings.EXPORT_ROOT, set when the file is completely written
+    file_name = models.CharField(max_length=255, blank=True)
+    file_size = models.BigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=255, blank=True)
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Touched by the worker once per chunk written, see ExportJobManager.requeue_stale
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ExportJobManager()
+
+    class Meta:
+        indexes = [
+            # Workers poll pending jobs in id order, the index stays as small as the queue
+            models.Index(fields=['id'], condition=models.Q(status='pending'), name='exportjob_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'Export {self.kind} #{self.id} ({self.status})'
@@ -0,0 +1,86 @@
+"""
+N+1 query detection by the shape of SQL, i.e. the SQL before parameters are bound
+
+A shape executed settings.N_PLUS_ONE_THRESHOLD times or more within a request is logged by MetricsMiddleware
+    with the stack which executed it, usually a related manager / property used in a loop over rows.
+Queries repeated by design, e.g. chunks of an export, are wrapped by placements_io.metrics.allow_duplicate_queries().
+
+Tests use the same counter, see assert_no_duplicate_queries() in placements_io/tests/base.py.
+"""
+
+import logging
+import re
+import traceback
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# IN (%s, %s, ...) of any length has the same shape, e.g. prefetch_related() of pages of different sizes
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+# Slices of QuerySet are inlined into SQL instead of parameters
+LIMIT_RE = re.compile(r'\b(LIMIT|OFFSET) \d+')
+# Transaction control of atomic(), repeated by any loop of writes
+IGNORED_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+STACK_LIMIT = 8
+
+
+def query_shape(sql: str) -> str:
+    return LIMIT_RE.sub(r'\1 %s', IN_LIST_RE.sub('IN (...)', sql))
+
+
+def _project_stack() -> list[str]:
+    """
+    Frames of this project only, innermost last, Django / DRF and this module skipped
+    """
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+        and 'site-packages' not in frame.filename
+        and Path(frame.filename).name not in ('query_guard.py', 'metrics.py')
+    ]
+    return traceback.format_list(frames[-STACK_LIMIT:])
+
+
+@dataclass
+class DuplicateQuery:
+    shape: str
+    count: int
+    stack: list[str]
+
+    def __str__(self):
+        return f'{self.count} x {self.shape}\n' + ''.join(self.stack)
+
+
+class QueryShapeCounter:
+    """
+    Count queries by shape, the stack is taken once per shape when it reaches the threshold
+    """
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.counts: Counter[str] = Counter()
+        self.stacks: dict[str, list[str]] = {}
+        # > 0 inside allow_duplicate_queries()
+        self.paused = 0
+
+    def record(self, sql: str):
+        if self.paused or sql.startswith(IGNORED_PREFIXES):
+            return
+        shape = query_shape(sql)
+        self.counts[shape] += 1
+        if self.counts[shape] == self.threshold:
+            self.stacks[shape] = _project_stack()
+
+    def duplicates(self) -> list[DuplicateQuery]:
+        return [DuplicateQuery(shape, self.counts[shape], stack) for shape, stack in self.stacks.items()]
+
+
+def log_duplicates(url_name: str, counter: QueryShapeCounter):
+    for duplicate in counter.duplicates():
+        logger.warning('Possible N+1 queries in %s: %s', url_name, duplicate)
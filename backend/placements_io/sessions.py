@@ -0,0 +1,42 @@
+"""
+Session engine of cached_db with a per-process LRU in front, SESSION_ENGINE = 'placements_io.sessions'
+
+A session is read from memory of this process, then from settings.SESSION_CACHE_ALIAS, then from DB.
+Writes go to all of them, so the DB copy survives eviction and restarts of the cache.
+Logout (delete) is seen by other processes within settings.SESSION_LOCAL_CACHE_TTL,
+    SESSION_CACHE_ALIAS must be a cache shared by all processes (Redis), see settings.CACHES.
+"""
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+from placements_io.caching import LocalTTLCache
+
+
+local_cache = LocalTTLCache(settings.SESSION_LOCAL_CACHE_SIZE, settings.SESSION_LOCAL_CACHE_TTL)
+
+
+class SessionStore(CachedDBStore):
+
+    def load(self):
+        data = local_cache.get(self.session_key)
+        if data is not None:
+            return dict(data)  # Session data is mutated in place by request
+        data = super().load()
+        # Key is reset by load() if the session doesn't exist or expired
+        if self.session_key is not None:
+            local_cache.set(self.session_key, dict(data))
+        return data
+
+    def save(self, must_create=False):
+        super().save(must_create)
+        local_cache.pop(self.session_key)
+
+    def delete(self, session_key=None):
+        local_cache.pop(session_key or self.session_key)
+        super().delete(session_key)
+
+    @classmethod
+    def clear_expired(cls):
+        super().clear_expired()
+        local_cache.clear()
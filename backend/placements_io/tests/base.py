@@ -1,11 +1,24 @@
+from collections.abc import Callable
+from contextlib import contextmanager
+
 from rest_framework.test import APITestCase
 
 from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connections
+
+from placements_io import auth, sessions
+from placements_io.query_guard import QueryShapeCounter
 
 
 class LoginViewTestCaseBase(APITestCase):
     def setUp(self):
         super().setUp()
+        # DB is rolled back after each test but cache is not
+        for cache in caches.all():
+            cache.clear()
+        auth.user_cache.clear()
+        sessions.local_cache.clear()
         self.user = User.objects.create_user(
             username='testuser',
             password='password'
@@ -13,3 +26,52 @@ class LoginViewTestCaseBase(APITestCase):
 
     def login(self):
         self.client.login(username='testuser', password='password')
+
+
+@contextmanager
+def count_query_shapes(threshold: int = 2, using: str = 'default'):
+    """
+    Count queries of the block by shape (see placements_io.query_guard), by raw SQL before parameters are bound
+    """
+    counter = QueryShapeCounter(threshold)
+
+    def record(execute, sql, params, many, context):
+        counter.record(sql)
+        return execute(sql, params, many, context)
+
+    with connections[using].execute_wrapper(record):
+        yield counter
+
+
+@contextmanager
+def assert_no_duplicate_queries(threshold: int = 2, using: str = 'default'):
+    """
+    Fail if any query of the block is repeated threshold times or more
+
+        with assert_no_duplicate_queries():
+            self.client.get(url)
+    """
+    with count_query_shapes(threshold, using) as counter:
+        yield counter
+    duplicates = counter.duplicates()
+    assert not duplicates, 'Duplicate queries:\n' + '\n'.join(map(str, duplicates))
+
+
+def assert_queries_do_not_grow(request: Callable[[], object], add_rows: Callable[[], object], using: str = 'default'):
+    """
+    Run request() before and after add_rows(), fail if it runs more queries with more rows (N+1)
+    request() must not be answered from cache, e.g. add ?_=<nonce>
+    """
+    with count_query_shapes(using=using) as before:
+        request()
+    add_rows()
+    with count_query_shapes(using=using) as after:
+        request()
+
+    grown = {
+        shape: (before.counts[shape], count)
+        for shape, count in after.counts.items() if count > before.counts[shape]
+    }
+    assert not grown, 'Queries grow with rows:\n' + '\n'.join(
+        f'{before_count} -> {after_count} x {shape}' for shape, (before_count, after_count) in grown.items()
+    )
@@ -0,0 +1,40 @@
+import logging
+
+import pytest
+
+from django.test import override_settings
+
+from placements_io.query_guard import logger as query_guard_logger
+
+
+# Repeats of the same query within a request which fail a test, lists of the seed data have 10 rows per page
+N_PLUS_ONE_THRESHOLD = 5
+
+
+class _RecordHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture(autouse=True)
+def n_plus_one_guard(request):
+    """
+    Fail any test which sends a request with N+1 queries, opt out by @pytest.mark.allow_n_plus_one
+    """
+    if request.node.get_closest_marker('allow_n_plus_one'):
+        yield None
+        return
+
+    handler = _RecordHandler()
+    query_guard_logger.addHandler(handler)
+    try:
+        with override_settings(N_PLUS_ONE_THRESHOLD=N_PLUS_ONE_THRESHOLD):
+            yield handler
+    finally:
+        query_guard_logger.removeHandler(handler)
+    if handler.messages:
+        pytest.fail('\n\n'.join(handler.messages), pytrace=False)
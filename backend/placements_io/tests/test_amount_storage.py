@@ -0,0 +1,126 @@
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Round
+from django.test import override_settings
+from django.urls import reverse
+
+from placements_io.tests.base import LoginViewTestCaseBase
+
+from placements_io.fields import check_amount_storage, to_micro_units
+from placements_io.models import Campaign, CampaignTotals, LineItem
+
+
+AMOUNT_FIELDS = ('id', 'booked_amount', 'actual_amount', 'adjustment_amount')
+
+
+class MicroUnitsTestCase(LoginViewTestCaseBase):
+
+    def test_to_micro_units(self):
+        assert to_micro_units(Decimal('1.5')) == 1_500_000
+        assert to_micro_units(Decimal('-0.000001')) == -1
+        assert to_micro_units(Decimal('12.34000000000000000000')) == 12_340_000
+        with self.assertRaises(ValueError):
+            to_micro_units(Decimal('0.0000001'))
+
+    def test_check_amount_storage(self):
+        assert check_amount_storage(databases=['default']) == []
+        with override_settings(AMOUNT_STORAGE='micro'):
+            [error] = check_amount_storage(databases=['default'])
+        assert error.id == 'placements_io.E001'
+        assert 'booked_amount' in error.msg
+
+    def test_refuse_lossy_conversion(self):
+        # Seed data has amounts with more than 6 decimal places
+        before = list(LineItem.objects.order_by('id').values_list(*AMOUNT_FIELDS))
+
+        with self.assertRaises(CommandError):
+            call_command('convert_amount_storage', 'micro')
+
+        assert list(LineItem.objects.order_by('id').values_list(*AMOUNT_FIELDS)) == before
+
+
+class MicroAmountStorageTestCase(LoginViewTestCaseBase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+        LineItem.objects.update(
+            booked_amount=Round(F('booked_amount'), 6),
+            actual_amount=Round(F('actual_amount'), 6),
+            adjustment_amount=Round(F('adjustment_amount'), 6),
+        )
+        self.line_items = list(LineItem.objects.order_by('id').values_list(*AMOUNT_FIELDS))
+        self.totals = list(Campaign.objects.with_totals('aggregate').order_by('id').values_list(
+            'id', 'total_booked_amount', 'total_actual_amount', 'total_adjustment_amount',
+        ))
+
+        campaign_id = 1
+        self.detail_url = reverse('detail_campaign', args=[campaign_id])
+        self.detail = self.client.get(self.detail_url).content
+
+        call_command('convert_amount_storage', 'micro')
+
+    def tearDown(self):
+        # Fire deferred foreign key checks of the test transaction, ALTER TABLE refuses pending trigger events
+        connection.check_constraints()
+        call_command('convert_amount_storage', 'numeric')
+        assert list(LineItem.objects.order_by('id').values_list(*AMOUNT_FIELDS)) == self.line_items
+        super().tearDown()
+
+    def test_check_amount_storage(self):
+        assert check_amount_storage(databases=['default'])[0].id == 'placements_io.E001'
+        with override_settings(AMOUNT_STORAGE='micro'):
+            assert check_amount_storage(databases=['default']) == []
+
+    @override_settings(AMOUNT_STORAGE='micro')
+    def test_same_values_in_micro_storage(self):
+        assert list(LineItem.objects.order_by('id').values_list(*AMOUNT_FIELDS)) == self.line_items
+        assert list(Campaign.objects.with_totals('aggregate').order_by('id').values_list(
+            'id', 'total_booked_amount', 'total_actual_amount', 'total_adjustment_amount',
+        )) == self.totals
+
+        caches['api'].clear()
+        assert self.client.get(self.detail_url).content == self.detail
+
+    @override_settings(AMOUNT_STORAGE='micro')
+    def test_filter_by_too_precise_final_amount(self):
+        line_item = LineItem.objects.order_by('id').first()
+        url = reverse('list_line_item', args=[line_item.campaign_id])
+        tiny = Decimal('0.0000001')
+
+        def ids(params):
+            response = self.client.get(url, params)
+            assert response.status_code == 200, response.content
+            return {row['id'] for row in response.json()['results']}
+
+        final_amount = line_item.final_amount
+        # Bounds are rounded toward the inclusive side
+        assert line_item.id in ids({'min_final_amount': final_amount - tiny, 'max_final_amount': final_amount + tiny})
+        assert line_item.id not in ids({'min_final_amount': final_amount + tiny, 'max_final_amount': final_amount + 1})
+        assert line_item.id not in ids({'min_final_amount': final_amount - 1, 'max_final_amount': final_amount - tiny})
+
+        assert self.client.get(url, {'min_final_amount': '1e20'}).status_code == 400
+
+    @override_settings(AMOUNT_STORAGE='micro')
+    def test_patch_line_item_in_micro_storage(self):
+        line_item_id = self.line_items[0][0]
+        url = reverse('patch_line_item', args=[line_item_id])
+
+        response = self.client.patch(url, {'adjustment_amount': '-1.000001'})
+        assert response.status_code == 200
+        assert LineItem.objects.get(id=line_item_id).adjustment_amount == Decimal('-1.000001')
+        assert LineItem.objects.filter(adjustment_amount=Decimal('-1.000001')).exists()
+        # Triggers of CampaignTotals are installed for micro-units by convert_amount_storage
+        assert CampaignTotals.objects.find_drift() == []
+
+        # Can not be stored without loss
+        response = self.client.patch(url, {'adjustment_amount': '0.0000001'})
+        assert response.status_code == 400
+
+        LineItem.objects.filter(id=line_item_id).update(adjustment_amount=self.line_items[0][3])
@@ -0,0 +1,94 @@
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+
+from django.core.cache import caches
+from django.urls import reverse
+
+from placements_io.tests.base import LoginViewTestCaseBase
+
+from placements_io.models import CampaignTotals, LineItem
+
+
+class AsyncViewsTestCase(LoginViewTestCaseBase):
+    """
+    Async views must respond the same as sync views
+    """
+
+    async def alogin(self):
+        await self.async_client.alogin(username='testuser', password='password')
+
+    async def test_anonymous_user_is_forbidden(self):
+        response = await self.async_client.get(reverse('async_list_campaign'))
+        assert response.status_code == 403
+
+    async def test_list_campaign(self):
+        await self.alogin()
+        response = await self.async_client.get(reverse('async_list_campaign'), {'page': 2, 'page_size': 100})
+        assert response.status_code == 200
+
+        caches['api'].clear()
+        expected = (await self.async_client.get(reverse('list_campaign'), {'page': 2, 'page_size': 100})).json()
+
+        data = response.json()
+        assert data['count'] == expected['count']
+        assert data['results'] == expected['results']
+        assert data['next'].endswith('/api/async/campaign/?page=3&page_size=100')
+        assert data['previous'].endswith('/api/async/campaign/?page_size=100')
+
+    async def test_list_campaign_with_invalid_page(self):
+        await self.alogin()
+        response = await self.async_client.get(reverse('async_list_campaign'), {'page': 999})
+        assert response.status_code == 404
+
+    async def test_detail_campaign(self):
+        await self.alogin()
+        campaign_id = 1
+        response = await self.async_client.get(reverse('async_detail_campaign', args=[campaign_id]))
+        assert response.status_code == 200
+
+        caches['api'].clear()
+        expected = await self.async_client.get(reverse('detail_campaign', args=[campaign_id]))
+        assert response.content == expected.content
+
+        not_exist_campaign_id = 999999
+        response = await self.async_client.get(reverse('async_detail_campaign', args=[not_exist_campaign_id]))
+        assert response.status_code == 404
+
+    async def test_patch_line_item(self):
+        await self.alogin()
+        line_item = await LineItem.objects.afirst()
+
+        response = await self.async_client.patch(
+            reverse('async_patch_line_item', args=[line_item.id]),
+            {'adjustment_amount': '12.5'},
+            content_type='application/json',
+        )
+        assert response.status_code == 200
+        assert Decimal(response.json()['adjustment_amount']) == Decimal('12.5')
+
+        await line_item.arefresh_from_db()
+        assert line_item.adjustment_amount == Decimal('12.5')
+        assert await sync_to_async(CampaignTotals.objects.find_drift)() == []
+
+        response = await self.async_client.patch(
+            reverse('async_patch_line_item', args=[line_item.id]),
+            {'adjustment_amount': 'abc'},
+            content_type='application/json',
+        )
+        assert response.status_code == 400
+
+    async def test_csv_download_campaign(self):
+        await self.alogin()
+        response = await self.async_client.get(reverse('async_csv_download_campaign'))
+        assert response.status_code == 200
+        assert response.is_async
+
+        streamed = b''.join([chunk async for chunk in response.streaming_content])
+        assert len(streamed.decode('utf-8').splitlines()) == 420  # 1 header + 419 campaign rows
+
+    async def test_csv_download_line_item(self):
+        await self.alogin()
+        not_exist_campaign_id = 999999
+        response = await self.async_client.get(reverse('async_csv_download_line_item', args=[not_exist_campaign_id]))
+        assert response.status_code == 400
@@ -0,0 +1,95 @@
+import uuid
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from placements_io import auth
+from placements_io.tests.base import LoginViewTestCaseBase
+
+
+AUTH_TABLES = ('"django_session"', '"auth_user"')
+
+
+class AuthHotPathTests:
+    """
+    Run by each session engine below
+    """
+
+    def setUp(self):
+        super().setUp()
+        response = self.client.post(reverse('login'), {'username': 'testuser', 'password': 'password'}, format='json')
+        assert response.status_code == 200
+
+    def get(self):
+        return self.client.get(reverse('list_campaign'), {'_': uuid.uuid4().hex})
+
+    def auth_queries(self) -> list[str]:
+        with CaptureQueriesContext(connection) as context:
+            response = self.get()
+        assert response.status_code == 200
+        return [
+            query['sql'] for query in context.captured_queries
+            if any(table in query['sql'] for table in AUTH_TABLES)
+        ]
+
+    def test_no_auth_queries_in_steady_state(self):
+        self.get()  # Warm up caches
+        assert self.auth_queries() == []
+
+    def test_logout(self):
+        self.get()
+        session_cookie = self.client.cookies['sessionid'].value
+        assert self.client.post(reverse('logout')).status_code == 200
+
+        # A copy of the cookie is not valid any more
+        self.client.cookies['sessionid'] = session_cookie
+        assert self.get().status_code == 403
+
+    def test_deactivated_user(self):
+        self.get()
+        self.user.is_active = False
+        self.user.save()
+        assert self.get().status_code == 403
+
+    def test_session_of_model_backend(self):
+        # Logged in before CachedModelBackend was deployed
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        assert self.get().status_code == 200
+
+
+@override_settings(SESSION_ENGINE='placements_io.sessions')
+class CachedSessionTestCase(AuthHotPathTests, LoginViewTestCaseBase):
+    pass
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+class SignedCookieSessionTestCase(AuthHotPathTests, LoginViewTestCaseBase):
+
+    def test_logout(self):
+        self.get()
+        session_cookie = self.client.cookies['sessionid'].value
+        assert self.client.post(reverse('logout')).status_code == 200
+        assert self.get().status_code == 403
+
+        # Nothing is stored on server to revoke, a copy of the cookie stays valid until it expires
+        self.client.cookies['sessionid'] = session_cookie
+        assert self.get().status_code == 200
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+class DBSessionTestCase(AuthHotPathTests, LoginViewTestCaseBase):
+
+    def test_no_auth_queries_in_steady_state(self):
+        self.get()
+        [query] = self.auth_queries()
+        assert '"django_session"' in query  # auth_user is still cached
+
+    def test_user_cache_disabled(self):
+        # As AUTH_USER_CACHE_TTL=0, the cache is created at import
+        self.addCleanup(setattr, auth.user_cache, 'ttl', auth.user_cache.ttl)
+        auth.user_cache.ttl = 0
+
+        self.get()
+        assert len(self.auth_queries()) == 2
@@ -0,0 +1,145 @@
+from django.urls import reverse
+
+from placements_io.tests.base import LoginViewTestCaseBase
+
+from placements_io.models import Campaign, LineItem
+
+
+class CachedResponseTestCase(LoginViewTestCaseBase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+        self.campaign = Campaign.objects.create(name='Test Campaign')
+        self.line_item = LineItem.objects.create(
+            campaign=self.campaign,
+            name='Test Line Item',
+            booked_amount='100',
+            actual_amount='100',
+            adjustment_amount='10',
+        )
+
+    def test_detail_campaign_served_from_cache(self):
+        url = reverse('detail_campaign', args=[self.campaign.id])
+        response = self.client.get(url)
+        assert response.status_code == 200
+        assert response.headers['ETag']
+        assert response.headers['Last-Modified']
+
+        # Session and the aggregate query of validators, user of authentication is cached (placements_io.auth)
+        with self.assertNumQueries(2):
+            cached_response = self.client.get(url)
+        assert cached_response.json() == response.json()
+
+    def test_cache_keyed_by_query_params(self):
+        first_page = self.client.get(reverse('list_campaign'), {'page': 1}).json()
+        second_page = self.client.get(reverse('list_campaign'), {'page': 2}).json()
+        assert first_page['results'] != second_page['results']
+
+    def test_patch_line_item_invalidates_cache(self):
+        url = reverse('detail_campaign', args=[self.campaign.id])
+        etag = self.client.get(url).headers['ETag']
+
+        response = self.client.patch(reverse('patch_line_item', args=[self.line_item.id]), {'adjustment_amount': '20'})
+        assert response.status_code == 200
+
+        response = self.client.get(url)
+        assert response.headers['ETag'] != etag
+        assert response.json()['potential_invoice_amount'] == 120.0
+
+    def test_bulk_patch_line_item_invalidates_cache(self):
+        url = reverse('detail_campaign', args=[self.campaign.id])
+        etag = self.client.get(url).headers['ETag']
+
+        response = self.client.patch(
+            reverse('bulk_patch_line_item'),
+            [{'id': self.line_item.id, 'adjustment_amount': '30'}],
+            format='json',
+        )
+        assert response.status_code == 200
+
+        response = self.client.get(url)
+        assert response.headers['ETag'] != etag
+        assert response.json()['potential_invoice_amount'] == 130.0
+
+
+class ConditionalGetTestCase(LoginViewTestCaseBase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+        self.campaign = Campaign.objects.create(name='Test Campaign')
+        self.line_item = LineItem.objects.create(
+            campaign=self.campaign,
+            name='Test Line Item',
+            booked_amount='100',
+            actual_amount='100',
+            adjustment_amount='10',
+        )
+
+    def test_not_modified(self):
+        # Session and the aggregate query of a campaign, user of authentication is cached
+        # Validators of all campaigns come from data version, no query
+        urls = [
+            (reverse('detail_campaign', args=[self.campaign.id]), 2),
+            (reverse('list_line_item', args=[self.campaign.id]), 2),
+            (reverse('list_campaign'), 1),
+            (reverse('csv_download_campaign'), 1),
+            (reverse('csv_download_line_item', args=[self.campaign.id]), 2),
+        ]
+        for url, num_queries in urls:
+            response = self.client.get(url)
+            assert response.status_code == 200
+            etag = response.headers['ETag']
+
+            with self.assertNumQueries(num_queries):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304
+            assert response.content == b''
+
+    def test_etag_changed_by_campaign_rename(self):
+        list_url, csv_url = reverse('list_campaign'), reverse('csv_download_campaign')
+        list_etag = self.client.get(list_url).headers['ETag']
+        csv_etag = self.client.get(csv_url).headers['ETag']
+
+        self.campaign.name = 'Renamed Campaign'
+        self.campaign.save()
+
+        response = self.client.get(list_url, {'search': 'Renamed'}, HTTP_IF_NONE_MATCH=list_etag)
+        assert response.status_code == 200
+        assert [row['name'] for row in response.json()['results']] == ['Renamed Campaign']
+
+        response = self.client.get(csv_url, HTTP_IF_NONE_MATCH=csv_etag)
+        assert response.status_code == 200
+        assert b'Renamed Campaign' in response.getvalue()
+
+    def test_etag_changed_by_line_item_write(self):
+        detail_url = reverse('detail_campaign', args=[self.campaign.id])
+        list_url = reverse('list_campaign')
+        detail_etag = self.client.get(detail_url).headers['ETag']
+        list_etag = self.client.get(list_url).headers['ETag']
+
+        response = self.client.patch(reverse('patch_line_item', args=[self.line_item.id]), {'adjustment_amount': '20'})
+        assert response.status_code == 200
+
+        assert self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code == 200
+        assert self.client.get(list_url, HTTP_IF_NONE_MATCH=list_etag).status_code == 200
+
+    def test_etag_changed_by_line_item_in_other_campaign(self):
+        detail_url = reverse('detail_campaign', args=[self.campaign.id])
+        detail_etag = self.client.get(detail_url).headers['ETag']
+
+        LineItem.objects.filter(campaign_id=1).update(adjustment_amount='0')
+        assert self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code == 304
+
+        # updated_at is not changed by update(), but count is changed when a line item is moved in
+        LineItem.objects.filter(id=1).update(campaign=self.campaign)
+        assert self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code == 200
+
+    def test_not_exist_campaign(self):
+        not_exist_campaign_id = 999999
+        response = self.client.get(reverse('detail_campaign', args=[not_exist_campaign_id]))
+        assert response.status_code == 404
+        assert 'ETag' not in response.headers
@@ -1,10 +1,16 @@
 from decimal import Decimal
 
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import override_settings
 from django.urls import reverse
 
 from placements_io.tests.base import LoginViewTestCaseBase
 
-from placements_io.models import Campaign, LineItem
+from placements_io.interfaces import CampaignFilter
+
+from placements_io.models import Campaign, CampaignTotals, LineItem
 
 
 class ListCampaignTestCase(LoginViewTestCaseBase):
@@ -29,6 +35,49 @@ class ListCampaignTestCase(LoginViewTestCaseBase):
         assert response.status_code == 404
         assert 'Invalid page' in response.json()['detail']
 
+    def test_list_campaign_totals_match_python_path(self):
+        response = self.client.get(reverse('list_campaign'))
+        assert response.status_code == 200
+
+        results = response.json()['results']
+        campaigns = Campaign.objects.prefetch_related('lineitem_set').in_bulk([row['id'] for row in results])
+        for row in results:
+            campaign = campaigns[row['id']]
+            assert not campaign.has_totals
+            assert row['potential_invoice_amount'] == float(campaign.potential_invoice_amount)
+            assert row['budget_fullfillment_rate'] == campaign.budget_fullfillment_rate
+
+    def test_campaign_with_totals(self):
+        campaign = Campaign.objects.with_totals().get(id=1)
+        expected = Campaign.objects.prefetch_related('lineitem_set').get(id=1)
+        line_items = expected.lineitem_set.all()
+
+        assert campaign.has_totals
+        assert campaign.line_items_count == len(line_items)
+        assert campaign.total_booked_amount == sum(line_item.booked_amount for line_item in line_items)
+        assert campaign.potential_invoice_amount == expected.potential_invoice_amount
+        assert campaign.budget_fullfillment_rate == expected.budget_fullfillment_rate
+
+    def test_unbooked_campaign_has_no_rate(self):
+        empty = Campaign.objects.create(name='Unbooked Empty Campaign')
+        zero_booked = Campaign.objects.create(name='Unbooked Zero Campaign')
+        LineItem.objects.create(
+            campaign=zero_booked, name='Zero Booked', booked_amount='0', actual_amount='10', adjustment_amount='0',
+        )
+        assert Campaign.objects.get(id=empty.id).budget_fullfillment_rate is None
+        assert Campaign.objects.with_totals().get(id=zero_booked.id).budget_fullfillment_rate is None
+
+        for fast in (False, True):
+            # The last page of the plain list has the campaigns created last
+            for params in ({'search': 'unbooked'}, {'search': 'unbooked', 'pagination': 'cursor'}, {'page': 22}):
+                caches['api'].clear()
+                with override_settings(FAST_READ_SERIALIZERS=fast):
+                    response = self.client.get(reverse('list_campaign'), params)
+                assert response.status_code == 200
+                rates = {row['id']: row['budget_fullfillment_rate'] for row in response.json()['results']}
+                assert rates[zero_booked.id] is None
+                assert rates.get(empty.id) is None
+
     def test_csv_download_campaign(self):
         response = self.client.post(reverse('csv_download_campaign'))
         assert response.status_code == 200
@@ -97,6 +146,59 @@ class DetailCampaignTestCase(LoginViewTestCaseBase):
             Decimal(self.line_items[0].actual_amount) + Decimal(self.line_items[0].adjustment_amount)
         )
 
+    def test_detail_campaign_query_line_items_once(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('detail_campaign', args=[self.campaign.id]))
+        assert response.status_code == 200
+
+        line_item_queries = [
+            query for query in context.captured_queries if 'FROM "placements_io_lineitem"' in query['sql']
+        ]
+        assert len(line_item_queries) == 1
+
+    def test_list_line_item_in_campaign(self):
+        response = self.client.get(reverse('list_line_item', args=[self.campaign.id]))
+        assert response.status_code == 200
+
+        resp_data = response.json()
+        assert resp_data['count'] == 2
+        # Same default ordering as detail
+        assert [row['id'] for row in resp_data['results']] == [self.line_items[1].id, self.line_items[0].id]
+
+    def test_list_line_item_in_campaign_with_ordering_and_page_size(self):
+        url = reverse('list_line_item', args=[self.campaign.id])
+
+        first_page = self.client.get(url, {'ordering': 'booked_amount', 'page_size': 1}).json()
+        assert [row['id'] for row in first_page['results']] == [self.line_items[0].id]
+
+        second_page = self.client.get(first_page['next']).json()
+        assert [row['id'] for row in second_page['results']] == [self.line_items[1].id]
+
+    def test_list_line_item_filter_by_generated_columns(self):
+        url = reverse('list_line_item', args=[self.campaign.id])
+
+        # Line item 1 is 110%, line item 2 is 95%
+        over_delivered = self.client.get(url, {'over_delivered': 'true'}).json()
+        assert [row['id'] for row in over_delivered['results']] == [self.line_items[0].id]
+        assert over_delivered['results'][0]['budget_fullfillment_rate'] == 110
+
+        under_delivered = self.client.get(url, {'over_delivered': 'false'}).json()
+        assert [row['id'] for row in under_delivered['results']] == [self.line_items[1].id]
+
+        final_amount_range = self.client.get(url, {'min_final_amount': '150', 'max_final_amount': '190'}).json()
+        assert [row['id'] for row in final_amount_range['results']] == [self.line_items[1].id]
+
+        by_final_amount = self.client.get(url, {'ordering': '-final_amount'}).json()
+        assert [row['final_amount'] for row in by_final_amount['results']] == [190, 110]
+
+        response = self.client.get(url, {'min_budget_fullfillment_rate': 'abc'})
+        assert response.status_code == 400
+
+    def test_list_line_item_with_invalid_campaign_id(self):
+        not_exist_campaign_id = 999999
+        response = self.client.get(reverse('list_line_item', args=[not_exist_campaign_id]))
+        assert response.status_code == 404
+
     def test_download_line_item_in_campaign(self):
         response = self.client.post(reverse('csv_download_line_item', args=[self.campaign.id]))
         assert response.status_code == 200
@@ -112,6 +214,23 @@ class DetailCampaignTestCase(LoginViewTestCaseBase):
         assert response.status_code == 400
 
 
+class GeneratedColumnsTestCase(LoginViewTestCaseBase):
+
+    def test_generated_columns_are_same_as_python_computation(self):
+        for booked_amount, actual_amount, adjustment_amount, final_amount, rate in LineItem.objects.values_list(
+            'booked_amount', 'actual_amount', 'adjustment_amount', 'final_amount', 'budget_fullfillment_rate',
+        ):
+            assert final_amount == actual_amount + adjustment_amount
+            assert rate == int((actual_amount + adjustment_amount) / booked_amount * 100)
+
+    def test_generated_columns_are_updated_on_save(self):
+        line_item = LineItem.objects.first()
+        line_item.adjustment_amount = line_item.adjustment_amount + 1
+        line_item.save()
+        line_item.refresh_from_db()
+        assert line_item.final_amount == line_item.actual_amount + line_item.adjustment_amount
+
+
 class PatchLineItemTestCase(LoginViewTestCaseBase):
 
     def setUp(self):
@@ -135,3 +254,273 @@ class PatchLineItemTestCase(LoginViewTestCaseBase):
 
         line_item.refresh_from_db()
         assert Decimal(line_item.adjustment_amount) == Decimal('20')
+
+
+class CursorPaginationCampaignTestCase(LoginViewTestCaseBase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def test_list_campaign_by_cursor(self):
+        campaign_ids = []
+        url, params = reverse('list_campaign'), {'pagination': 'cursor', 'page_size': 100}
+        while url:
+            response = self.client.get(url, params)
+            assert response.status_code == 200
+            resp_data = response.json()
+            assert 'count' not in resp_data
+
+            campaign_ids.extend(row['id'] for row in resp_data['results'])
+            url, params = resp_data['next'], None
+
+        expected_ids = list(Campaign.objects.order_by('created_at', 'id').values_list('id', flat=True))
+        assert campaign_ids == expected_ids
+
+    def test_list_campaign_by_cursor_previous(self):
+        first_page = self.client.get(reverse('list_campaign'), {'pagination': 'cursor'}).json()
+        assert first_page['previous'] is None
+
+        second_page = self.client.get(first_page['next']).json()
+        assert second_page['previous'] is not None
+
+        previous_page = self.client.get(second_page['previous']).json()
+        assert previous_page['results'] == first_page['results']
+        assert previous_page['next'] == first_page['next']
+
+    def test_list_campaign_by_invalid_cursor(self):
+        response = self.client.get(reverse('list_campaign'), {'pagination': 'cursor', 'cursor': 'invalid'})
+        assert response.status_code == 404
+
+    @override_settings(CAMPAIGN_LIST_COUNT_CACHE_TIMEOUT=60)
+    def test_list_campaign_count_cached(self):
+        count = self.client.get(reverse('list_campaign')).json()['count']
+        Campaign.objects.create(name='New Campaign')
+
+        assert self.client.get(reverse('list_campaign')).json()['count'] == count
+        for cache in caches.all():
+            cache.clear()
+        assert self.client.get(reverse('list_campaign')).json()['count'] == count + 1
+
+
+class FilterCampaignTestCase(LoginViewTestCaseBase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+        self.campaign = Campaign.objects.create(name='Zebra Crossing Campaign')
+        Campaign.objects.filter(id=self.campaign.id).update(created_at='2001-01-01T12:00:00Z')
+        LineItem.objects.create(
+            campaign=self.campaign,
+            name='Zebra Line Item',
+            booked_amount='100',
+            actual_amount='80',
+            adjustment_amount='0',
+        )
+
+    def get_ids(self, params: dict) -> list[int]:
+        caches['api'].clear()
+        response = self.client.get(reverse('list_campaign'), {'page_size': 100, **params})
+        assert response.status_code == 200
+        data = response.json()
+        ids = [row['id'] for row in data['results']]
+        while data.get('next'):
+            data = self.client.get(data['next']).json()
+            ids += [row['id'] for row in data['results']]
+        return ids
+
+    def test_search_by_name(self):
+        assert self.get_ids({'search': 'zebra CROSSING'}) == [self.campaign.id]
+        assert self.get_ids({'search': 'zebra', 'pagination': 'cursor'}) == [self.campaign.id]
+
+    def test_filter_by_created_at(self):
+        assert self.get_ids({'created_before': '2001-01-01'}) == [self.campaign.id]
+        assert self.get_ids({'created_after': '2001-01-01', 'created_before': '2001-01-01T12:00:00Z'}) == [
+            self.campaign.id,
+        ]
+        assert self.campaign.id not in self.get_ids({'created_after': '2001-01-02'})
+
+    def test_filter_by_budget_band(self):
+        campaigns = Campaign.objects.prefetch_related('lineitem_set').filter(lineitem__isnull=False).distinct()
+        expected = {band: [] for band in CampaignFilter.budget_bands}
+        for campaign in campaigns.order_by('id'):
+            rate = campaign.budget_fullfillment_rate
+            band = next(
+                band for band, (min_rate, max_rate) in CampaignFilter.budget_bands.items()
+                if (min_rate is None or rate >= min_rate) and (max_rate is None or rate <= max_rate)
+            )
+            expected[band].append(campaign.id)
+
+        for source in ('aggregate', 'materialized'):
+            with override_settings(CAMPAIGN_TOTALS_SOURCE=source):
+                for band, ids in expected.items():
+                    assert self.get_ids({'budget_band': band}) == ids, (source, band)
+
+    def test_filter_with_invalid_params(self):
+        for params in ({'budget_band': 'unknown'}, {'created_after': 'yesterday'}, {'created_before': '2001-13-01'}):
+            response = self.client.get(reverse('list_campaign'), params)
+            assert response.status_code == 400, params
+
+
+class BulkPatchLineItemTestCase(LoginViewTestCaseBase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+        self.campaign = Campaign.objects.create(name='Test Campaign')
+        self.line_items = LineItem.objects.bulk_create([
+            LineItem(
+                campaign=self.campaign,
+                name=f'Test Line Item {i}',
+                booked_amount='100',
+                actual_amount='100',
+                adjustment_amount='10',
+            )
+            for i in range(3)
+        ])
+
+    def test_bulk_patch_line_item(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                reverse('bulk_patch_line_item'),
+                [
+                    {'id': self.line_items[2].id, 'adjustment_amount': '-5'},
+                    {'id': self.line_items[0].id, 'adjustment_amount': '20'},
+                ],
+                format='json',
+            )
+
+        assert response.status_code == 200
+        assert [row['id'] for row in response.json()] == [self.line_items[2].id, self.line_items[0].id]
+        # Rows are locked in order of id whatever the order of body, concurrent bulk PATCH never deadlock
+        [lock_query] = [query['sql'] for query in context.captured_queries if 'FOR UPDATE' in query['sql']]
+        assert 'ORDER BY "placements_io_lineitem"."id" ASC' in lock_query
+
+        adjustment_amounts = dict(
+            LineItem.objects.filter(campaign=self.campaign).values_list('id', 'adjustment_amount')
+        )
+        assert adjustment_amounts == {
+            self.line_items[0].id: Decimal('20'),
+            self.line_items[1].id: Decimal('10'),
+            self.line_items[2].id: Decimal('-5'),
+        }
+        assert CampaignTotals.objects.get(campaign=self.campaign).adjustment_amount == Decimal('25')
+        assert CampaignTotals.objects.find_drift() == []
+
+    def test_bulk_patch_line_item_report_errors_per_item(self):
+        not_exist_line_item_id = 999999
+        response = self.client.patch(
+            reverse('bulk_patch_line_item'),
+            [
+                {'id': self.line_items[0].id, 'adjustment_amount': '20'},
+                {'id': self.line_items[1].id, 'adjustment_amount': 'not a number'},
+                {'id': not_exist_line_item_id, 'adjustment_amount': '20'},
+            ],
+            format='json',
+        )
+        assert response.status_code == 400
+
+        errors = response.json()['errors']
+        assert errors[0] == {}
+        assert 'adjustment_amount' in errors[1]
+        assert errors[2] == {}  # Line item existence is checked only after every item passes validation
+
+        response = self.client.patch(
+            reverse('bulk_patch_line_item'),
+            [
+                {'id': self.line_items[0].id, 'adjustment_amount': '20'},
+                {'id': not_exist_line_item_id, 'adjustment_amount': '20'},
+            ],
+            format='json',
+        )
+        assert response.status_code == 400
+        assert response.json()['errors'] == [{}, {'id': ['Line item not found']}]
+
+        # Nothing is updated
+        assert not LineItem.objects.filter(campaign=self.campaign).exclude(adjustment_amount='10').exists()
+
+    def test_bulk_patch_line_item_with_invalid_body(self):
+        response = self.client.patch(reverse('bulk_patch_line_item'), {'id': 1}, format='json')
+        assert response.status_code == 400
+
+
+class CampaignSummaryTestCase(LoginViewTestCaseBase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def get_summary(self, params: dict | None = None) -> dict:
+        response = self.client.get(reverse('summary_campaign'), params or {})
+        assert response.status_code == 200
+        return response.json()
+
+    def test_summary_matches_python_computation(self):
+        campaigns = Campaign.objects.prefetch_related('lineitem_set')
+        line_items = [line_item for campaign in campaigns for line_item in campaign.lineitem_set.all()]
+        rates = [
+            campaign.budget_fullfillment_rate for campaign in campaigns
+            if sum(line_item.booked_amount for line_item in campaign.lineitem_set.all())
+        ]
+
+        for source in ('aggregate', 'materialized'):
+            caches['api'].clear()
+            with override_settings(CAMPAIGN_TOTALS_SOURCE=source):
+                summary = self.get_summary()
+
+            assert summary['campaigns_count'] == len(campaigns)
+            assert summary['line_items_count'] == len(line_items)
+            booked = sum(Decimal(line_item.booked_amount) for line_item in line_items)
+            final = sum(Decimal(line_item.final_amount) for line_item in line_items)
+            assert Decimal(summary['total_booked_amount']) == booked
+            assert Decimal(summary['potential_invoice_amount']) == final
+            assert summary['budget_fullfillment_rate'] == int(final / booked * 100)
+
+            bands = summary['budget_bands']
+            assert bands['unbooked'] == len(campaigns) - len(rates)
+            for band, (min_rate, max_rate) in CampaignFilter.budget_bands.items():
+                assert bands[band] == len([
+                    rate for rate in rates
+                    if (min_rate is None or rate >= min_rate) and (max_rate is None or rate <= max_rate)
+                ]), (source, band)
+
+            histogram = summary['budget_fullfillment_rate_histogram']
+            assert histogram[0] == {'min': None, 'max': 0, 'count': len([rate for rate in rates if rate < 0])}
+            assert histogram[-1]['min'] == 200 and histogram[-1]['max'] is None
+            assert sum(bucket['count'] for bucket in histogram) == len(rates)
+            for bucket in histogram[1:-1]:
+                assert bucket['count'] == len([rate for rate in rates if bucket['min'] <= rate < bucket['max']])
+
+    def test_summary_is_cached_until_write(self):
+        summary = self.get_summary()
+        with self.assertNumQueries(1):  # Session only
+            assert self.get_summary() == summary
+
+        line_item = LineItem.objects.filter(booked_amount__gt=0).first()
+        response = self.client.patch(
+            reverse('patch_line_item', args=[line_item.id]),
+            {'adjustment_amount': str(Decimal(line_item.adjustment_amount) + 1000)},
+        )
+        assert response.status_code == 200
+        assert Decimal(self.get_summary()['potential_invoice_amount']) == (
+            Decimal(summary['potential_invoice_amount']) + 1000
+        )
+
+    def test_summary_of_filtered_campaigns(self):
+        campaign = Campaign.objects.create(name='Zebra Crossing Campaign')
+        LineItem.objects.create(
+            campaign=campaign, name='Zebra', booked_amount='100', actual_amount='95', adjustment_amount='0',
+        )
+
+        summary = self.get_summary({'search': 'zebra crossing'})
+        assert summary['campaigns_count'] == 1
+        assert Decimal(summary['total_booked_amount']) == 100
+        assert summary['budget_fullfillment_rate'] == 95
+        assert summary['budget_bands'] == {'under': 0, 'normal': 1, 'over': 0, 'critical': 0, 'unbooked': 0}
+
+        summary = self.get_summary({'search': 'no such campaign'})
+        assert summary['campaigns_count'] == 0
+        assert summary['budget_fullfillment_rate'] is None
+        assert Decimal(summary['total_booked_amount']) == 0
@@ -0,0 +1,109 @@
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+from django.urls import reverse
+
+from placements_io.tests.base import LoginViewTestCaseBase
+
+from placements_io.models import Campaign, CampaignTotals, LineItem
+
+
+class CampaignTotalsTestCase(LoginViewTestCaseBase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+        self.campaign = Campaign.objects.create(name='Test Campaign')
+        self.line_item = LineItem.objects.create(
+            campaign=self.campaign,
+            name='Test Line Item',
+            booked_amount='100',
+            actual_amount='100',
+            adjustment_amount='10',
+        )
+
+    def totals(self) -> tuple:
+        return CampaignTotals.objects.filter(campaign=self.campaign).values_list(
+            'booked_amount', 'actual_amount', 'adjustment_amount', 'line_items_count',
+        ).get()
+
+    def test_seeded_totals_are_consistent(self):
+        assert CampaignTotals.objects.find_drift() == []
+
+    def test_create_line_item(self):
+        assert self.totals() == (Decimal('100'), Decimal('100'), Decimal('10'), 1)
+
+        LineItem.objects.bulk_create([
+            LineItem(campaign=self.campaign, name=f'Line Item {i}', booked_amount='1', actual_amount='2',
+                     adjustment_amount='-3')
+            for i in range(2)
+        ])
+        assert self.totals() == (Decimal('102'), Decimal('104'), Decimal('4'), 3)
+        assert CampaignTotals.objects.find_drift() == []
+
+    def test_save_and_update_line_item(self):
+        self.line_item.actual_amount = Decimal('70')
+        self.line_item.save()
+        assert self.totals() == (Decimal('100'), Decimal('70'), Decimal('10'), 1)
+
+        LineItem.objects.filter(id=self.line_item.id).update(booked_amount='200', adjustment_amount='-5')
+        assert self.totals() == (Decimal('200'), Decimal('70'), Decimal('-5'), 1)
+
+        # Only name, totals are not written
+        updated_at = CampaignTotals.objects.get(campaign=self.campaign).updated_at
+        LineItem.objects.filter(id=self.line_item.id).update(name='Renamed')
+        assert CampaignTotals.objects.get(campaign=self.campaign).updated_at == updated_at
+
+    def test_move_line_item_to_another_campaign(self):
+        other_campaign = Campaign.objects.create(name='Other Campaign')
+        LineItem.objects.filter(id=self.line_item.id).update(campaign=other_campaign)
+
+        assert self.totals() == (Decimal('0'), Decimal('0'), Decimal('0'), 0)
+        assert CampaignTotals.objects.get(campaign=other_campaign).line_items_count == 1
+        assert CampaignTotals.objects.find_drift() == []
+
+    def test_delete_line_item_and_campaign(self):
+        self.line_item.delete()
+        assert self.totals() == (Decimal('0'), Decimal('0'), Decimal('0'), 0)
+
+        LineItem.objects.create(
+            campaign=self.campaign, name='Line Item', booked_amount='1', actual_amount='1', adjustment_amount='1',
+        )
+        self.campaign.delete()  # Line items and totals are deleted by cascade in either order
+        assert not CampaignTotals.objects.filter(campaign_id=self.campaign.id).exists()
+        assert CampaignTotals.objects.find_drift() == []
+
+    def test_patch_line_item_applies_delta(self):
+        response = self.client.patch(reverse('patch_line_item', args=[self.line_item.id]), {'adjustment_amount': '-30'})
+        assert response.status_code == 200
+
+        totals = CampaignTotals.objects.get(campaign=self.campaign)
+        assert totals.adjustment_amount == Decimal('-30')
+        assert totals.booked_amount == Decimal('100')
+        assert totals.line_items_count == 1
+        assert CampaignTotals.objects.find_drift() == []
+
+    def test_verify_and_rebuild_command(self):
+        # Drift by a write bypassing the triggers
+        CampaignTotals.objects.filter(campaign=self.campaign).update(actual_amount='50')
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_campaign_totals', '--verify')
+
+        call_command('rebuild_campaign_totals')
+        call_command('rebuild_campaign_totals', '--verify')
+        assert CampaignTotals.objects.get(campaign=self.campaign).actual_amount == Decimal('100')
+
+    @override_settings(CAMPAIGN_TOTALS_SOURCE='materialized')
+    def test_list_campaign_read_materialized_totals(self):
+        materialized = self.client.get(reverse('list_campaign'), {'page_size': 100}).json()
+
+        caches['api'].clear()
+        with override_settings(CAMPAIGN_TOTALS_SOURCE='aggregate'):
+            aggregated = self.client.get(reverse('list_campaign'), {'page_size': 100}).json()
+
+        assert materialized == aggregated
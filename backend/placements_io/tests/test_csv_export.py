@@ -0,0 +1,178 @@
+import csv
+import gzip
+import io
+import json
+from decimal import Decimal
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+
+from placements_io.exports import CAMPAIGN_COLUMNS
+from placements_io.tests.base import LoginViewTestCaseBase
+
+
+@override_settings(CSV_EXPORT_STREAMING=True, CSV_EXPORT_CHUNK_SIZE=50)
+class StreamingCampaignCSVTestCase(LoginViewTestCaseBase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def test_streaming_csv_download_campaign(self):
+        response = self.client.post(reverse('csv_download_campaign'))
+        assert response.status_code == 200
+        assert response.streaming
+        assert response.headers['Content-Type'] == 'text/csv'
+        assert 'attachment' in response.headers['Content-Disposition']
+
+        streamed = b''.join(response.streaming_content)
+
+        with override_settings(CSV_EXPORT_STREAMING=False):
+            buffered = self.client.post(reverse('csv_download_campaign')).content
+
+        assert streamed == buffered
+        assert len(streamed.decode('utf-8').splitlines()) == 420  # 1 header + 419 campaign rows
+
+    async def test_streaming_csv_download_campaign_by_asgi(self):
+        await self.async_client.alogin(username='testuser', password='password')
+
+        response = await self.async_client.post(reverse('csv_download_campaign'))
+        assert response.status_code == 200
+        assert response.is_async
+
+        streamed = b''.join([chunk async for chunk in response.streaming_content])
+        assert len(streamed.decode('utf-8').splitlines()) == 420
+
+
+@override_settings(CSV_EXPORT_STREAMING=True, CSV_EXPORT_CHUNK_SIZE=7)
+class StreamingLineItemCSVTestCase(LoginViewTestCaseBase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def test_streaming_csv_download_line_item(self):
+        campaign_id = 1
+        response = self.client.post(reverse('csv_download_line_item', args=[campaign_id]))
+        assert response.status_code == 200
+        assert response.streaming
+        assert response.headers['Content-Type'] == 'text/csv'
+
+        streamed = b''.join(response.streaming_content).decode('utf-8').splitlines()
+
+        with override_settings(CSV_EXPORT_STREAMING=False):
+            buffered = self.client.post(reverse('csv_download_line_item', args=[campaign_id])).content
+        buffered = buffered.decode('utf-8').splitlines()
+
+        assert streamed[0] == buffered[0]
+        # Streaming rows are ordered by id
+        assert streamed[1:] == sorted(buffered[1:], key=lambda line: int(line.split(',')[0]))
+
+    async def test_streaming_csv_download_line_item_by_asgi(self):
+        await self.async_client.alogin(username='testuser', password='password')
+
+        campaign_id = 1
+        response = await self.async_client.post(reverse('csv_download_line_item', args=[campaign_id]))
+        assert response.status_code == 200
+        assert response.is_async
+
+        streamed = b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8').splitlines()
+        with override_settings(CSV_EXPORT_STREAMING=False):
+            buffered = (await self.async_client.post(reverse('csv_download_line_item', args=[campaign_id]))).content
+        assert len(streamed) == len(buffered.decode('utf-8').splitlines())
+
+    def test_streaming_csv_download_line_item_with_invalid_campaign_id(self):
+        not_exist_campaign_id = 999999
+        response = self.client.post(reverse('csv_download_line_item', args=[not_exist_campaign_id]))
+        assert response.status_code == 400
+
+
+def read_csv(content: bytes) -> list[list[str]]:
+    return list(csv.reader(io.StringIO(content.decode('utf-8'))))
+
+
+@override_settings(CSV_EXPORT_CHUNK_SIZE=50)
+class ExportFormatTestCase(LoginViewTestCaseBase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+        self.csv_rows = read_csv(self.client.post(reverse('csv_download_campaign')).content)
+
+    def export(self, export_format: str, url: str | None = None) -> bytes:
+        response = self.client.post(f'{url or reverse("csv_download_campaign")}?format={export_format}')
+        assert response.status_code == 200, response.content
+        assert response.streaming
+        return b''.join(response.streaming_content)
+
+    def test_gzip(self):
+        response = self.client.post(reverse('csv_download_campaign') + '?format=gzip')
+        assert response.headers['Content-Type'] == 'application/gzip'
+        assert response.headers['Content-Disposition'].endswith('.csv.gz"')
+
+        content = gzip.decompress(b''.join(response.streaming_content))
+        assert read_csv(content) == self.csv_rows
+
+    def test_ndjson(self):
+        lines = self.export('ndjson').splitlines()
+        assert len(lines) == len(self.csv_rows) - 1
+
+        records = [json.loads(line, parse_float=Decimal) for line in lines]
+        assert list(records[0]) == [column.name for column in CAMPAIGN_COLUMNS]
+        for record, row in zip(records, self.csv_rows[1:]):
+            assert record['id'] == int(row[0])
+            assert record['created_at'] == row[2]
+            # Amounts are numbers of the exact decimal value
+            assert record['potential_invoice_amount'] == Decimal(row[3])
+            assert record['total_adjustment_amount'] == Decimal(row[7])
+
+    def test_parquet(self):
+        pq = pytest.importorskip('pyarrow.parquet')
+        table = pq.read_table(io.BytesIO(self.export('parquet')))
+        assert table.column_names == [column.name for column in CAMPAIGN_COLUMNS]
+        assert str(table.schema.field('created_at').type) == 'timestamp[us, tz=UTC]'
+
+        records = table.to_pylist()
+        assert len(records) == len(self.csv_rows) - 1
+        for record, row in zip(records, self.csv_rows[1:]):
+            assert record['id'] == int(row[0])
+            assert record['created_at'].isoformat() == row[2]
+            assert record['potential_invoice_amount'] == Decimal(row[3])
+            assert record['total_booked_amount'] == Decimal(row[5])
+
+    def test_arrow_line_items(self):
+        pa = pytest.importorskip('pyarrow')
+        url = reverse('csv_download_line_item', args=[1])
+        csv_rows = read_csv(self.client.post(url).content)
+
+        table = pa.ipc.open_stream(self.export('arrow', url)).read_all()
+        records = sorted(table.to_pylist(), key=lambda record: record['id'])
+        csv_rows = sorted(csv_rows[1:], key=lambda row: int(row[0]))
+        assert len(records) == len(csv_rows)
+        for record, row in zip(records, csv_rows):
+            assert record['id'] == int(row[0])
+            assert record['final_amount'] == Decimal(row[5])
+            assert record['campaign_name'] == row[7]
+
+    def test_unknown_format(self):
+        response = self.client.post(reverse('csv_download_campaign') + '?format=xlsx')
+        assert response.status_code == 400
+        assert 'format' in response.json()
+
+    def test_etag_by_format(self):
+        csv_etag = self.client.get(reverse('csv_download_campaign')).headers['ETag']
+        gzip_etag = self.client.get(reverse('csv_download_campaign') + '?format=gzip').headers['ETag']
+        assert csv_etag != gzip_etag
+
+        response = self.client.get(reverse('csv_download_campaign') + '?format=gzip', HTTP_IF_NONE_MATCH=csv_etag)
+        assert response.status_code == 200
+
+    async def test_async_view(self):
+        await self.async_client.alogin(username='testuser', password='password')
+        response = await self.async_client.get(reverse('async_csv_download_campaign') + '?format=ndjson')
+        assert response.status_code == 200
+        assert response.headers['Content-Type'] == 'application/x-ndjson'
+
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        assert len(content.splitlines()) == len(self.csv_rows) - 1
@@ -0,0 +1,221 @@
+import gzip
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from placements_io.export_jobs import delete_expired_jobs, run_job, run_pending_jobs
+from placements_io.models import ExportJob
+from placements_io.tests.base import LoginViewTestCaseBase
+
+
+class ExportJobTestCase(LoginViewTestCaseBase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+        self.export_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_root)
+        settings_override = override_settings(
+            EXPORT_ROOT=self.export_root,
+            EXPORT_X_ACCEL_REDIRECT_PREFIX='',
+            CSV_EXPORT_CHUNK_SIZE=50,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def create_job(self, **data) -> dict:
+        response = self.client.post(reverse('create_export_job'), data, format='json')
+        assert response.status_code == 202, response.content
+        assert response.data['status'] == 'pending'
+        assert response.data['download_url'] is None
+        return response.data
+
+    def finish_job(self, **data) -> dict:
+        job = self.create_job(**data)
+        assert run_pending_jobs('test') == 1
+        response = self.client.get(reverse('detail_export_job', args=[job['id']]))
+        assert response.status_code == 200
+        assert response.data['status'] == 'done', response.data
+        return response.data
+
+    def test_export_campaigns(self):
+        job = self.finish_job(kind='campaigns')
+        assert job['download_url'].endswith(reverse('download_export_job', args=[job['id']]))
+
+        response = self.client.get(reverse('download_export_job', args=[job['id']]))
+        assert response.status_code == 200
+        assert response.headers['Accept-Ranges'] == 'bytes'
+        assert 'attachment' in response.headers['Content-Disposition']
+        content = b''.join(response.streaming_content)
+        assert len(content) == job['file_size']
+
+        # Same file as the synchronous export
+        with override_settings(CSV_EXPORT_STREAMING=True):
+            streamed = b''.join(self.client.post(reverse('csv_download_campaign')).streaming_content)
+        assert content == streamed
+
+    def test_export_line_items(self):
+        job = self.finish_job(kind='line_items', campaign_id=1)
+        assert job['campaign'] == 1
+
+        response = self.client.get(reverse('download_export_job', args=[job['id']]))
+        content = b''.join(response.streaming_content)
+        with override_settings(CSV_EXPORT_STREAMING=True):
+            streamed = self.client.post(reverse('csv_download_line_item', args=[1])).streaming_content
+        assert content == b''.join(streamed)
+
+    def test_export_format(self):
+        job = self.finish_job(kind='campaigns', format='gzip')
+        assert job['format'] == 'gzip'
+        assert job['file_name'].endswith('.csv.gz')
+
+        response = self.client.get(reverse('download_export_job', args=[job['id']]))
+        assert response.headers['Content-Type'] == 'application/gzip'
+        with override_settings(CSV_EXPORT_STREAMING=True):
+            streamed = b''.join(self.client.post(reverse('csv_download_campaign')).streaming_content)
+        assert gzip.decompress(b''.join(response.streaming_content)) == streamed
+
+        response = self.client.post(reverse('create_export_job'), {'kind': 'campaigns', 'format': 'xlsx'}, format='json')
+        assert response.status_code == 400
+
+    def test_export_line_items_requires_campaign(self):
+        url = reverse('create_export_job')
+        assert self.client.post(url, {'kind': 'line_items'}, format='json').status_code == 400
+        assert self.client.post(url, {'kind': 'line_items', 'campaign_id': 999999}, format='json').status_code == 400
+        assert self.client.post(url, {'kind': 'unknown'}, format='json').status_code == 400
+        assert not ExportJob.objects.exists()
+
+    def test_range_download(self):
+        job = self.finish_job(kind='campaigns')
+        url = reverse('download_export_job', args=[job['id']])
+        content = b''.join(self.client.get(url).streaming_content)
+        size = len(content)
+
+        response = self.client.get(url, HTTP_RANGE='bytes=10-19')
+        assert response.status_code == 206
+        assert response.headers['Content-Range'] == f'bytes 10-19/{size}'
+        assert response.headers['Content-Length'] == '10'
+        assert b''.join(response.streaming_content) == content[10:20]
+
+        # Resume from an offset
+        response = self.client.get(url, HTTP_RANGE='bytes=100-')
+        assert response.status_code == 206
+        assert b''.join(response.streaming_content) == content[100:]
+
+        # Suffix range
+        response = self.client.get(url, HTTP_RANGE='bytes=-5')
+        assert response.status_code == 206
+        assert b''.join(response.streaming_content) == content[-5:]
+
+        response = self.client.get(url, HTTP_RANGE=f'bytes={size}-')
+        assert response.status_code == 416
+        assert response.headers['Content-Range'] == f'bytes */{size}'
+
+        # Multiple ranges are not supported, the whole file is sent
+        response = self.client.get(url, HTTP_RANGE='bytes=0-1,5-6')
+        assert response.status_code == 200
+        assert b''.join(response.streaming_content) == content
+
+    def test_x_accel_redirect(self):
+        job = self.finish_job(kind='campaigns')
+        with override_settings(EXPORT_X_ACCEL_REDIRECT_PREFIX='/protected_exports/'):
+            response = self.client.get(reverse('download_export_job', args=[job['id']]))
+        assert response.status_code == 200
+        assert response.headers['X-Accel-Redirect'] == f'/protected_exports/{job["file_name"]}'
+        assert response.content == b''
+
+    def test_heartbeat(self):
+        ExportJob.objects.create(user=self.user, kind=ExportJob.Kind.CAMPAIGNS)
+        job = ExportJob.objects.claim('test')
+        run_job(job)
+
+        job.refresh_from_db()
+        assert job.status == ExportJob.Status.DONE
+        assert job.heartbeat_at > job.started_at
+
+    def test_requeued_job_is_left_to_other_worker(self):
+        ExportJob.objects.create(user=self.user, kind=ExportJob.Kind.CAMPAIGNS)
+        job = ExportJob.objects.claim('test')
+        # Requeued by requeue_stale() while the worker was paused
+        ExportJob.objects.filter(id=job.id).update(status=ExportJob.Status.PENDING)
+        run_job(job)
+
+        job.refresh_from_db()
+        assert job.status == ExportJob.Status.PENDING
+        assert job.file_name == ''
+        assert list(Path(self.export_root).iterdir()) == []
+
+    def test_delete_expired_jobs(self):
+        expired = self.finish_job(kind='campaigns')
+        kept = self.finish_job(kind='campaigns')
+        ExportJob.objects.filter(id=expired['id']).update(finished_at=timezone.now() - timedelta(days=2))
+        # Left by a killed worker
+        part_path = Path(self.export_root) / '.campaigns_export.csv.part'
+        part_path.touch()
+        two_days_ago = (timezone.now() - timedelta(days=2)).timestamp()
+        os.utime(part_path, (two_days_ago, two_days_ago))
+
+        assert delete_expired_jobs(timedelta(days=1)) == 1
+        assert list(ExportJob.objects.values_list('id', flat=True)) == [kept['id']]
+        assert [path.name for path in Path(self.export_root).iterdir()] == [kept['file_name']]
+
+    def test_download_before_done(self):
+        job = self.create_job(kind='campaigns')
+        response = self.client.get(reverse('download_export_job', args=[job['id']]))
+        assert response.status_code == 409
+
+    def test_job_of_other_user_is_not_found(self):
+        other = User.objects.create_user(username='other', password='password')
+        job = ExportJob.objects.create(user=other, kind=ExportJob.Kind.CAMPAIGNS)
+        assert self.client.get(reverse('detail_export_job', args=[job.id])).status_code == 404
+        assert self.client.get(reverse('download_export_job', args=[job.id])).status_code == 404
+
+    def test_not_logged_in(self):
+        self.client.logout()
+        assert self.client.post(reverse('create_export_job'), {'kind': 'campaigns'}, format='json').status_code == 403
+
+
+class ExportJobQueueTestCase(LoginViewTestCaseBase):
+
+    def test_claim_in_order_and_once(self):
+        first = ExportJob.objects.create(user=self.user, kind=ExportJob.Kind.CAMPAIGNS)
+        second = ExportJob.objects.create(user=self.user, kind=ExportJob.Kind.CAMPAIGNS)
+
+        assert ExportJob.objects.claim('a').id == first.id
+        assert ExportJob.objects.claim('b').id == second.id
+        assert ExportJob.objects.claim('c') is None
+
+        first.refresh_from_db()
+        assert first.status == ExportJob.Status.RUNNING
+        assert first.worker == 'a'
+        assert first.attempts == 1
+
+    def test_requeue_stale(self):
+        two_hours_ago = timezone.now() - timedelta(hours=2)
+        stale = ExportJob.objects.create(
+            user=self.user, kind=ExportJob.Kind.CAMPAIGNS, status=ExportJob.Status.RUNNING,
+            started_at=two_hours_ago, heartbeat_at=two_hours_ago, attempts=1,
+        )
+        exhausted = ExportJob.objects.create(
+            user=self.user, kind=ExportJob.Kind.CAMPAIGNS, status=ExportJob.Status.RUNNING,
+            started_at=two_hours_ago, heartbeat_at=two_hours_ago, attempts=3,
+        )
+        # Started long ago, still sending heartbeat
+        running = ExportJob.objects.create(
+            user=self.user, kind=ExportJob.Kind.CAMPAIGNS, status=ExportJob.Status.RUNNING,
+            started_at=two_hours_ago, heartbeat_at=timezone.now(), attempts=1,
+        )
+
+        assert ExportJob.objects.requeue_stale(timedelta(hours=1), max_attempts=3) == 2
+
+        statuses = dict(ExportJob.objects.values_list('id', 'status'))
+        assert statuses[stale.id] == ExportJob.Status.PENDING
+        assert statuses[exhausted.id] == ExportJob.Status.FAILED
+        assert statuses[running.id] == ExportJob.Status.RUNNING
@@ -0,0 +1,98 @@
+from decimal import Decimal
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from django.core.cache import caches
+from django.test import override_settings
+from django.urls import reverse
+
+from placements_io.tests.base import LoginViewTestCaseBase
+
+from placements_io.fast_serializers import FastJSONRenderer
+from placements_io.models import Campaign, LineItem
+
+
+class FastSerializersParityTestCase(LoginViewTestCaseBase):
+    """
+    Fast read path must produce byte-identical output to the DRF serializers
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+        # U+2028 / U+2029 are escaped by JSONRenderer
+        self.campaign = Campaign.objects.create(name='Test "Campaign"\n\u2028')
+        LineItem.objects.bulk_create([
+            LineItem(
+                campaign=self.campaign,
+                name='Test Line Item 1',
+                booked_amount='100.123456789',
+                actual_amount='120.00000000000000000001',
+                adjustment_amount='-0.5',
+            ),
+            LineItem(
+                campaign=self.campaign,
+                name='Test Line Item 2 ✓\u2029',
+                booked_amount='0.000001',
+                actual_amount='12345678.9',
+                adjustment_amount='0',
+            ),
+            # Budget fullfillment rate is null
+            LineItem(
+                campaign=self.campaign,
+                name='Test Line Item 3',
+                booked_amount='0',
+                actual_amount='10',
+                adjustment_amount='0',
+            ),
+        ])
+
+    def assert_parity(self, url, params=None):
+        responses = []
+        for fast in (False, True):
+            caches['api'].clear()
+            with override_settings(FAST_READ_SERIALIZERS=fast):
+                response = self.client.get(url, params)
+            assert response.status_code == 200
+            responses.append(response)
+
+        slow, fast = responses
+        assert fast.headers['Content-Type'] == slow.headers['Content-Type']
+        assert fast.content == slow.content
+
+    def test_list_campaign_parity(self):
+        self.assert_parity(reverse('list_campaign'))
+        self.assert_parity(reverse('list_campaign'), {'page': 5, 'page_size': 100})
+
+    def test_list_campaign_by_cursor_parity(self):
+        self.assert_parity(reverse('list_campaign'), {'pagination': 'cursor', 'page_size': 100})
+
+    def test_detail_campaign_parity(self):
+        self.assert_parity(reverse('detail_campaign', args=[1]))
+        self.assert_parity(reverse('detail_campaign', args=[self.campaign.id]))
+
+        empty_campaign = Campaign.objects.create(name='Empty Campaign 空')
+        self.assert_parity(reverse('detail_campaign', args=[empty_campaign.id]))
+
+    def test_list_line_item_parity(self):
+        self.assert_parity(reverse('list_line_item', args=[1]))
+        self.assert_parity(reverse('list_line_item', args=[self.campaign.id]), {'ordering': '-booked_amount'})
+
+    def test_json_renderer_without_fast_read_serializers(self):
+        response = self.client.get(reverse('detail_campaign', args=[self.campaign.id]))
+        assert response.content == JSONRenderer().render(response.data)
+        assert b'\\u2028' in response.content
+
+    def test_fast_json_renderer_fallback(self):
+        for data in [{'id': 2 ** 70}, {'name': '\u2028\u2029'}, [Decimal('1e16'), Decimal('0.1')]]:
+            assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+        with pytest.raises(ValueError):
+            FastJSONRenderer().render({'amount': Decimal('NaN')})
+
+    @override_settings(FAST_READ_SERIALIZERS=True)
+    def test_detail_campaign_not_found(self):
+        not_exist_campaign_id = 999999
+        response = self.client.get(reverse('detail_campaign', args=[not_exist_campaign_id]))
+        assert response.status_code == 404
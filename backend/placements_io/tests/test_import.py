@@ -0,0 +1,143 @@
+import io
+import json
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+
+from placements_io.tests.base import LoginViewTestCaseBase
+
+from placements_io.importers import import_rows, iter_json_rows
+from placements_io.models import Campaign, CampaignTotals, LineItem
+
+
+ROWS = [
+    {
+        # Update existing line item seeded by migration, and move it to another campaign
+        "id": 1,
+        "campaign_id": 2,
+        "campaign_name": "Renamed Campaign",
+        "line_item_name": "Updated Line Item",
+        "booked_amount": 100.5,
+        "actual_amount": 90.25,
+        "adjustments": 1.0000000001,
+    },
+    {
+        "id": 20001,
+        "campaign_id": 10001,
+        "campaign_name": "New Campaign",
+        "line_item_name": "New Line Item",
+        "booked_amount": 200,
+        "actual_amount": 210,
+        "adjustments": -10,
+    },
+]
+
+CSV_CONTENT = (
+    'id,campaign_id,campaign_name,line_item_name,booked_amount,actual_amount,adjustments\n'
+    '20002,10001,New Campaign,New Line Item 2,300.1,300.2,0.3\n'
+)
+
+
+class ImportRowsTestCase(LoginViewTestCaseBase):
+
+    def test_iter_json_rows(self):
+        content = json.dumps(ROWS, indent=2)
+        for buffer_size in (1, 7, 64 * 1024):
+            assert list(iter_json_rows(io.StringIO(content), buffer_size=buffer_size))[1]['id'] == 20001
+
+        assert list(iter_json_rows(io.StringIO('[]'))) == []
+        with self.assertRaises(ValueError):
+            list(iter_json_rows(io.StringIO('[{"id": 1},')))
+
+    def test_import_rows(self):
+        result = import_rows(ROWS, batch_size=1)
+        assert result.rows == 2
+        assert result.line_items_created == 1
+        assert result.line_items_updated == 1
+
+        line_item = LineItem.objects.get(id=1)
+        assert line_item.campaign_id == 2
+        assert line_item.adjustment_amount == Decimal('1.0000000001')
+        assert Campaign.objects.get(id=2).name == 'Renamed Campaign'
+        assert LineItem.objects.get(id=20001).final_amount == Decimal('200')
+        assert CampaignTotals.objects.find_drift() == []
+
+        # Re-run is safe
+        import_rows(ROWS)
+        assert LineItem.objects.filter(id__in=[1, 20001]).count() == 2
+        assert CampaignTotals.objects.find_drift() == []
+
+        # Sequence is reset after rows are inserted with id
+        assert Campaign.objects.create(name='Another Campaign').id > 10001
+
+    def test_import_invalid_amount(self):
+        for amount in ('abc', 'NaN', 'Infinity'):
+            invalid_row = {**ROWS[1], 'id': 20003, 'booked_amount': amount}
+            with self.assertRaisesRegex(ValueError, 'booked_amount'):
+                import_rows([*ROWS, invalid_row], batch_size=2)
+
+        # Batch before the invalid row is committed, sequence is still reset
+        assert LineItem.objects.filter(id=20001).exists()
+        assert not LineItem.objects.filter(id=20003).exists()
+        assert Campaign.objects.create(name='Another Campaign').id > 10001
+
+    def test_import_rows_too_large_for_columns(self):
+        invalid_values = [
+            ('booked_amount', '1e10', 'booked_amount'),
+            ('line_item_name', 'x' * 256, 'line_item_name longer than 255'),
+            ('campaign_name', 'x' * 256, 'campaign_name longer than 255'),
+            ('campaign_id', 2 ** 31, 'campaign_id 2147483648 out of range'),
+            # Rounded to 20 decimal places by DB, then it overflows, reported by the batch
+            ('actual_amount', '9999999999.999999999999999999999', 'line items 20003 - 20003'),
+        ]
+        for key, value, message in invalid_values:
+            with self.assertRaisesRegex(ValueError, message):
+                import_rows([{**ROWS[1], 'id': 20003, key: value}])
+
+        assert import_rows([{**ROWS[1], 'id': 20003, 'booked_amount': '9999999999.99'}]).rows == 1
+
+    def test_import_placements_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as file:
+            file.write(CSV_CONTENT)
+            file.flush()
+            call_command('import_placements', file.name, stdout=io.StringIO())
+
+        assert LineItem.objects.get(id=20002).booked_amount == Decimal('300.1')
+        assert CampaignTotals.objects.find_drift() == []
+
+        with tempfile.NamedTemporaryFile('w', suffix='.xml') as file:
+            with self.assertRaises(CommandError):
+                call_command('import_placements', file.name, stdout=io.StringIO())
+
+
+class ImportPlacementsViewTestCase(LoginViewTestCaseBase):
+
+    def test_import_placements_by_admin(self):
+        User.objects.create_superuser(username='admin_user', password='password')
+        self.client.login(username='admin_user', password='password')
+
+        upload = SimpleUploadedFile('placements.json', json.dumps(ROWS).encode())
+        response = self.client.post(reverse('import_placements'), {'file': upload}, format='multipart')
+        assert response.status_code == 200
+        assert response.json()['rows'] == 2
+        assert LineItem.objects.filter(id=20001).exists()
+
+        upload = SimpleUploadedFile('placements.csv', b'not,a,valid\ncsv,file,!\n')
+        response = self.client.post(reverse('import_placements'), {'file': upload}, format='multipart')
+        assert response.status_code == 400
+
+        upload = SimpleUploadedFile('placements.csv', CSV_CONTENT.replace('300.1', '300.1.1').encode())
+        response = self.client.post(reverse('import_placements'), {'file': upload}, format='multipart')
+        assert response.status_code == 400
+        assert 'booked_amount' in response.json()['message']
+
+    def test_import_placements_by_non_admin(self):
+        self.login()
+        upload = SimpleUploadedFile('placements.json', json.dumps(ROWS).encode())
+        response = self.client.post(reverse('import_placements'), {'file': upload}, format='multipart')
+        assert response.status_code == 403
@@ -0,0 +1,79 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase
+
+from placements_io.exports import _line_item_rows
+from placements_io.models import Campaign, LineItem
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN output and INCLUDE indexes of PostgreSQL')
+class HotQueryIndexTestCase(TestCase):
+    """
+    Hot queries must be served by indexes
+    Test data is small so planner prefers sequential scan anyway, turn it off to see if an index is usable,
+        if the index is dropped or the query changes, the plan falls back to Seq Scan (with a disabled cost)
+    """
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            # Reset when the test transaction is rolled back
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            # Bitmap scan is preferred to index-only scan before VACUUM sets visibility map of new rows
+            cursor.execute('SET LOCAL enable_bitmapscan = off')
+
+    def assert_index_scan(self, queryset, index_name: str, index_only: bool = False):
+        plan = queryset.explain()
+        assert 'Seq Scan' not in plan, plan
+        assert index_name in plan, plan
+        if index_only:
+            assert 'Index Only Scan' in plan, plan
+
+    def test_detail_line_items_ordering(self):
+        queryset = LineItem.objects.filter(campaign_id=1).order_by(*LineItem.DEFAULT_ORDERING)
+        self.assert_index_scan(queryset, 'lineitem_campaign_updated_idx')
+        assert 'Sort' not in queryset.explain()
+
+    def test_line_item_totals_of_campaign(self):
+        queryset = LineItem.objects.filter(campaign_id=1).values('campaign_id').annotate(
+            total_booked_amount=Sum('booked_amount'),
+            total_actual_amount=Sum('actual_amount'),
+            total_adjustment_amount=Sum('adjustment_amount'),
+        )
+        self.assert_index_scan(queryset, 'lineitem_campaign_amounts_idx', index_only=True)
+
+    def test_csv_line_items_ordered_by_id(self):
+        # Name is not in the index, rows are read from the table in the order of the index
+        queryset = _line_item_rows(1)
+        self.assert_index_scan(queryset, 'lineitem_campaign_amounts_idx')
+        assert 'Sort' not in queryset.explain()
+
+    def test_campaign_cursor_page(self):
+        first = Campaign.objects.order_by('created_at', 'id').first()
+        queryset = Campaign.objects.filter(created_at__gte=first.created_at).order_by('created_at', 'id')[:20]
+        self.assert_index_scan(queryset, 'campaign_created_idx')
+
+    def test_over_delivered_line_items(self):
+        queryset = LineItem.objects.filter(campaign_id=1, budget_fullfillment_rate__gt=100)
+        self.assert_index_scan(queryset, 'lineitem_campaign_rate_idx')
+
+    def test_line_items_ordered_by_final_amount(self):
+        queryset = LineItem.objects.filter(campaign_id=1).order_by('final_amount')
+        self.assert_index_scan(queryset, 'lineitem_campaign_final_idx')
+
+    def test_campaign_created_at_range(self):
+        queryset = Campaign.objects.filter(created_at__lt='2001-01-01T00:00:00Z').order_by('id')
+        self.assert_index_scan(queryset, 'campaign_created_idx')
+
+    def test_campaign_budget_band_of_materialized_totals(self):
+        queryset = Campaign.objects.with_totals('materialized').filter(total_budget_fullfillment_rate__gte=120)
+        self.assert_index_scan(queryset, 'totals_rate_idx')
+
+    def test_campaign_name_search(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                self.skipTest('pg_trgm extension is not installed, see 0009_campaign_search_indexes')
+        queryset = Campaign.objects.filter(name__icontains='zebra')
+        self.assert_index_scan(queryset, 'campaign_name_trgm_idx')
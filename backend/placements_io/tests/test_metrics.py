@@ -0,0 +1,133 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from placements_io.metrics import registry
+from placements_io.tests.base import LoginViewTestCaseBase
+
+
+def server_timing(response) -> dict[str, str]:
+    return dict(entry.split(';', 1) for entry in response.headers['Server-Timing'].split(', '))
+
+
+def metric_value(text: str, line_prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(' ', 1)[1])
+    raise AssertionError(f'{line_prefix} not found')
+
+
+class MetricsTestCase(LoginViewTestCaseBase):
+
+    def setUp(self):
+        super().setUp()
+        registry.clear()
+        self.login()
+
+    def scrape(self) -> str:
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('metrics'))
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        return response.content.decode()
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('list_campaign'))
+        assert response.status_code == 200
+
+        timing = server_timing(response)
+        assert timing['db'].endswith(f'desc="{len(context.captured_queries)} queries"')
+        assert re.fullmatch(r'dur=\d+\.\d\d', timing['serialize'])
+        assert re.fullmatch(r'dur=\d+\.\d\d', timing['total'])
+
+    @override_settings(FAST_READ_SERIALIZERS=True)
+    def test_server_timing_of_fast_serializers(self):
+        response = self.client.get(reverse('detail_campaign', args=[1]))
+        assert response.status_code == 200
+        assert 'serialize' in server_timing(response)
+
+    def test_histograms_per_url_name(self):
+        for _ in range(2):
+            self.client.get(reverse('list_campaign'))
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('detail_campaign', args=[1]), {'_': 'no-cache'})
+        queries = len(context.captured_queries)  # Query log is reset by the next request
+
+        text = self.scrape()
+        labels = 'url_name="list_campaign",method="GET"'
+        assert metric_value(text, f'placements_io_request_duration_seconds_count{{{labels}}}') == 2
+        assert metric_value(text, f'placements_io_request_duration_seconds_bucket{{{labels},le="+Inf"}}') == 2
+        assert metric_value(
+            text, 'placements_io_requests_total{url_name="list_campaign",method="GET",status="200"}'
+        ) == 2
+
+        labels = 'url_name="detail_campaign",method="GET"'
+        assert metric_value(text, f'placements_io_db_queries_sum{{{labels}}}') == queries
+        assert metric_value(text, f'placements_io_response_size_bytes_sum{{{labels}}}') == len(response.content)
+
+    def test_streaming_response_is_measured_at_the_end(self):
+        with override_settings(CSV_EXPORT_STREAMING=True):
+            response = self.client.post(reverse('csv_download_campaign'))
+        labels = 'url_name="csv_download_campaign",method="POST"'
+        assert f'placements_io_request_duration_seconds_count{{{labels}}}' not in self.scrape()
+
+        content = b''.join(response.streaming_content)
+        text = self.scrape()
+        assert metric_value(text, f'placements_io_response_size_bytes_sum{{{labels}}}') == len(content)
+        # Rows are queried while streaming
+        assert metric_value(text, f'placements_io_db_queries_sum{{{labels}}}') > 0
+
+    async def test_async_view(self):
+        await self.async_client.alogin(username='testuser', password='password')
+        response = await self.async_client.get(reverse('async_detail_campaign', args=[1]))
+        assert response.status_code == 200
+
+        timing = server_timing(response)
+        # Session, user, campaign and its line items
+        assert timing['db'].endswith('desc="4 queries"')
+        assert 'serialize' in timing
+        assert 'render' in timing
+
+    def test_merge_metrics_of_other_processes(self):
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir)
+        with override_settings(METRICS_DIR=metrics_dir):
+            self.client.get(reverse('list_campaign'))
+            registry.flush(force=True)
+            # As if written by another worker
+            [own_file] = os.listdir(metrics_dir)
+            shutil.copy(os.path.join(metrics_dir, own_file), os.path.join(metrics_dir, 'metrics-0.json'))
+            with open(os.path.join(metrics_dir, 'metrics-1.json'), 'w') as file:
+                json.dump({'histograms': [], 'requests': []}, file)
+
+            text = self.scrape()
+        labels = 'url_name="list_campaign",method="GET"'
+        assert metric_value(text, f'placements_io_request_duration_seconds_count{{{labels}}}') == 2
+
+    def test_metrics_permission(self):
+        assert self.client.get(reverse('metrics')).status_code == 403
+        self.client.logout()
+        assert self.client.get(reverse('metrics')).status_code == 403
+
+        with override_settings(METRICS_TOKEN='secret'):
+            assert self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code == 403
+            assert self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret').status_code == 200
+
+        User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.client.login(username='staff', password='password')
+        assert self.client.get(reverse('metrics')).status_code == 200
+
+    @override_settings(METRICS_SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        response = self.client.get(reverse('list_campaign'))
+        assert 'Server-Timing' not in response.headers
@@ -0,0 +1,145 @@
+import uuid
+from unittest import mock
+
+import pytest
+
+from django.test import override_settings
+from django.urls import reverse
+
+from placements_io.models import Campaign, LineItem
+from placements_io.query_guard import QueryShapeCounter, query_shape
+from placements_io.tests.base import (
+    LoginViewTestCaseBase, assert_no_duplicate_queries, assert_queries_do_not_grow,
+)
+from placements_io.views import CampaignListView
+
+
+def add_line_items(campaign_ids, count: int = 3):
+    LineItem.objects.bulk_create(
+        LineItem(campaign_id=campaign_id, name=f'N+1 {i}', booked_amount=1, actual_amount=1, adjustment_amount=0)
+        for campaign_id in campaign_ids
+        for i in range(count)
+    )
+
+
+def add_campaigns(count: int = 3):
+    campaigns = [Campaign.objects.create(name=f'N+1 {i}') for i in range(count)]
+    add_line_items([campaign.id for campaign in campaigns])
+
+
+class QueryShapeTestCase(LoginViewTestCaseBase):
+
+    def test_in_list_of_any_length_has_same_shape(self):
+        assert query_shape('SELECT 1 WHERE id IN (%s)') == query_shape('SELECT 1 WHERE id IN (%s, %s, %s)')
+        assert query_shape('SELECT 1 WHERE id = %s') != query_shape('SELECT 1 WHERE id IN (%s)')
+        assert query_shape('SELECT 1 LIMIT 21 OFFSET 40') == 'SELECT 1 LIMIT %s OFFSET %s'
+
+    def test_counter(self):
+        counter = QueryShapeCounter(threshold=3)
+        for _ in range(3):
+            counter.record('SELECT 1 FROM a WHERE id = %s')
+            counter.record('SAVEPOINT "s1"')
+        counter.record('SELECT 1 FROM b WHERE id = %s')
+
+        [duplicate] = counter.duplicates()
+        assert duplicate.shape == 'SELECT 1 FROM a WHERE id = %s'
+        assert duplicate.count == 3
+        assert any('test_query_guard.py' in frame for frame in duplicate.stack)
+
+
+class ReadEndpointsTestCase(LoginViewTestCaseBase):
+    """
+    Queries of read endpoints must not grow with the number of rows
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def get(self, name: str, *args, **params):
+        def request():
+            response = self.client.get(reverse(name, args=args), {**params, '_': uuid.uuid4().hex})
+            assert response.status_code == 200
+        return request
+
+    def post(self, name: str, *args):
+        def request():
+            response = self.client.post(reverse(name, args=args))
+            assert response.status_code == 200
+        return request
+
+    def test_list_campaign(self):
+        first_page = Campaign.objects.order_by('id').values_list('id', flat=True)[:20]
+        assert_queries_do_not_grow(self.get('list_campaign'), lambda: add_line_items(first_page))
+
+    @override_settings(FAST_READ_SERIALIZERS=True)
+    def test_list_campaign_fast(self):
+        first_page = Campaign.objects.order_by('id').values_list('id', flat=True)[:20]
+        assert_queries_do_not_grow(self.get('list_campaign'), lambda: add_line_items(first_page))
+
+    def test_detail_campaign(self):
+        assert_queries_do_not_grow(self.get('detail_campaign', 1), lambda: add_line_items([1]))
+
+    def test_list_line_item(self):
+        assert_queries_do_not_grow(self.get('list_line_item', 1, page_size=100), lambda: add_line_items([1]))
+
+    def test_csv_download_campaign(self):
+        assert_queries_do_not_grow(self.post('csv_download_campaign'), add_campaigns)
+
+    def test_csv_download_line_item(self):
+        assert_queries_do_not_grow(self.post('csv_download_line_item', 1), lambda: add_line_items([1]))
+
+    @override_settings(N_PLUS_ONE_THRESHOLD=2, CSV_EXPORT_STREAMING=True, CSV_EXPORT_CHUNK_SIZE=5)
+    def test_chunks_of_streaming_export_are_allowed(self):
+        # One query per chunk, wrapped by allow_duplicate_queries()
+        with self.assertNoLogs('placements_io.query_guard', 'WARNING'):
+            response = self.client.post(reverse('csv_download_campaign'))
+            b''.join(response.streaming_content)
+
+    def test_no_duplicate_queries(self):
+        with assert_no_duplicate_queries():
+            self.get('detail_campaign', 1)()
+        with assert_no_duplicate_queries():
+            self.get('list_campaign')()
+
+
+@pytest.mark.allow_n_plus_one
+class NPlusOneDetectionTestCase(LoginViewTestCaseBase):
+    """
+    Without with_totals(), CampaignSerializer sums up line items of each campaign by its own query
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+        patcher = mock.patch.object(CampaignListView, 'queryset', Campaign.objects.order_by('id'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, **params):
+        response = self.client.get(reverse('list_campaign'), {**params, '_': uuid.uuid4().hex})
+        assert response.status_code == 200
+
+    def test_assertions_fail(self):
+        # Campaigns created by add_campaigns() only
+        request = lambda: self.request(search='N+1')  # noqa: E731
+        with pytest.raises(AssertionError, match='Queries grow with rows'):
+            assert_queries_do_not_grow(request, add_campaigns)
+        with pytest.raises(AssertionError, match='Duplicate queries'):
+            with assert_no_duplicate_queries():
+                self.request()
+
+    @override_settings(N_PLUS_ONE_THRESHOLD=5)
+    def test_runtime_detector_logs_stack(self):
+        with self.assertLogs('placements_io.query_guard', 'WARNING') as logs:
+            self.request()
+        [message] = logs.output
+        # Twice per campaign of the page, by potential_invoice_amount and budget_fullfillment_rate
+        assert 'Possible N+1 queries in list_campaign: 40 x SELECT' in message
+        assert 'FROM "placements_io_lineitem"' in message
+        assert 'potential_invoice_amount' in message  # Stack of the query
+
+    @override_settings(N_PLUS_ONE_THRESHOLD=0)
+    def test_runtime_detector_is_opt_in(self):
+        with self.assertNoLogs('placements_io.query_guard', 'WARNING'):
+            self.request()
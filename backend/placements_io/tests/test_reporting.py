@@ -0,0 +1,99 @@
+import csv
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+
+from placements_io.models import Campaign, LineItem
+from placements_io.reporting import build_campaign_report, truncated_rates, verify_campaign_report
+from placements_io.tests.base import LoginViewTestCaseBase
+
+
+class CampaignReportTestCase(LoginViewTestCaseBase):
+
+    def setUp(self):
+        super().setUp()
+        # Amounts of the seed data have more than 6 decimal places, these are exact micro-units
+        self.campaign = Campaign.objects.create(name='Report Campaign')
+        for booked, actual, adjustment in [('100', '90.5', '-0.25'), ('0', '10', '0'), ('50.000001', '60', '1')]:
+            LineItem.objects.create(
+                campaign=self.campaign,
+                name='Report Line Item',
+                booked_amount=booked,
+                actual_amount=actual,
+                adjustment_amount=adjustment,
+            )
+        self.empty_campaign = Campaign.objects.create(name='Empty Campaign')
+
+    def rows(self, report) -> dict[int, tuple]:
+        return {row[0]: row for rows in report.iter_rows(100) for row in rows}
+
+    def test_truncated_rates(self):
+        final = np.array([50, -50, 1, 0, 7, 10], dtype=np.int64)
+        booked = np.array([3, 3, -3, 0, 0, 10], dtype=np.int64)
+        rates, has_rate = truncated_rates(final, booked)
+
+        assert has_rate.tolist() == [True, True, True, False, False, True]
+        expected = [int(Decimal(f) / Decimal(b) * 100) for f, b in zip(final.tolist(), booked.tolist()) if b]
+        assert rates[has_rate].tolist() == expected == [1666, -1666, -33, 100]
+
+    def test_report(self):
+        rows = self.rows(build_campaign_report(chunk_size=2))
+
+        assert rows[self.campaign.id] == (
+            self.campaign.id,
+            3,
+            Decimal('150.000001'),
+            Decimal('160.5'),
+            Decimal('0.75'),
+            Decimal('161.25'),
+            107,
+            'over',
+            # 90% (under) and 122% (critical), the unbooked line item has no rate
+            2,
+        )
+        assert rows[self.empty_campaign.id] == (
+            self.empty_campaign.id, 0, Decimal(0), Decimal(0), Decimal(0), Decimal(0), None, 'unbooked', 0,
+        )
+        assert len(rows) == Campaign.objects.count()
+
+    def test_verify(self):
+        report = build_campaign_report()
+        assert verify_campaign_report(report) == []
+
+        LineItem.objects.filter(campaign=self.campaign, booked_amount=100).update(actual_amount='100.01')
+        assert verify_campaign_report(report) == [self.campaign.id]
+
+    def test_verify_allows_rounding_within_a_cent(self):
+        LineItem.objects.filter(campaign=self.campaign, booked_amount=100).update(actual_amount='90.5000004')
+        report = build_campaign_report()
+        assert report.rounded_line_items >= 1
+        assert self.rows(report)[self.campaign.id][3] == Decimal('160.5')
+        assert verify_campaign_report(report) == []
+
+    def test_totals_too_large_for_int64(self):
+        for _ in range(5):
+            LineItem.objects.create(
+                campaign=self.empty_campaign,
+                name='Large Line Item',
+                booked_amount='9999999999',
+                actual_amount='9999999999',
+                adjustment_amount='0',
+            )
+        with pytest.raises(ValueError, match=str(self.empty_campaign.id)):
+            build_campaign_report()
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'report.csv'
+            call_command('campaign_report', str(path), '--verify')
+
+            with path.open(newline='') as file:
+                rows = {row['Campaign ID']: row for row in csv.DictReader(file)}
+        row = rows[str(self.campaign.id)]
+        assert row['Potential Invoice Amount'] == '161.250000'
+        assert row['Budget Band'] == 'over'
+        assert rows[str(self.empty_campaign.id)]['Budget Fullfillment Rate'] == ''
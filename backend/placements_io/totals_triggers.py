@@ -0,0 +1,92 @@
+"""
+PostgreSQL triggers which keep CampaignTotals current on every write of LineItem
+
+Every INSERT / UPDATE / DELETE of placements_io_lineitem, by save(), delete(), QuerySet.update(), bulk_create(),
+    admin or raw SQL, applies the sum of its changes per campaign in the same statement and transaction.
+Triggers are per statement with transition tables, a bulk write updates each campaign once.
+Amounts of LineItem may be micro-units (see placements_io.fields), the triggers are installed for one storage,
+    `manage.py convert_amount_storage` installs them again after the columns are converted.
+"""
+
+from placements_io.fields import MICRO_DECIMAL_PLACES
+
+LINE_ITEM_TABLE = 'placements_io_lineitem'
+TOTALS_TABLE = 'placements_io_campaigntotals'
+AMOUNTS = ('booked_amount', 'actual_amount', 'adjustment_amount')
+COLUMNS = (*AMOUNTS, 'line_items_count')
+OPERATIONS = ('insert', 'update', 'delete')
+
+
+def _changes(operation: str) -> str:
+    """
+    Rows added to (new_rows) and removed from (old_rows) the totals of their campaigns
+    """
+    added = f'SELECT campaign_id, {", ".join(AMOUNTS)}, 1 AS line_items_count FROM new_rows'
+    removed = (
+        f'SELECT campaign_id, {", ".join(f"-{amount} AS {amount}" for amount in AMOUNTS)}, -1 AS line_items_count '
+        f'FROM old_rows'
+    )
+    return {'insert': added, 'update': f'{added} UNION ALL {removed}', 'delete': removed}[operation]
+
+
+def _function_sql(operation: str, micro: bool) -> str:
+    scale = f' * 1e-{MICRO_DECIMAL_PLACES}' if micro else ''
+    sums = ', '.join(f'SUM({amount}){scale} AS {amount}' for amount in AMOUNTS)
+    deltas = (
+        f'SELECT campaign_id, {sums}, SUM(line_items_count) AS line_items_count '
+        f'FROM ({_changes(operation)}) changes GROUP BY campaign_id '
+        f'HAVING {" OR ".join(f"SUM({column}) <> 0" for column in COLUMNS)}'
+    )
+    if operation == 'delete':
+        # No insert, totals of a campaign being deleted may be deleted before its line items
+        body = (
+            # Lock in the order of campaign, same as the upsert below, concurrent writers never deadlock
+            f'PERFORM 1 FROM {TOTALS_TABLE} WHERE campaign_id IN (SELECT campaign_id FROM old_rows) '
+            f'ORDER BY campaign_id FOR UPDATE; '
+            f'UPDATE {TOTALS_TABLE} AS totals SET '
+            f'{", ".join(f"{column} = totals.{column} + deltas.{column}" for column in COLUMNS)}, '
+            f'updated_at = NOW() '
+            f'FROM ({deltas}) deltas WHERE totals.campaign_id = deltas.campaign_id;'
+        )
+    else:
+        columns = ', '.join(COLUMNS)
+        body = (
+            f'INSERT INTO {TOTALS_TABLE} AS totals (campaign_id, {columns}, updated_at) '
+            f'SELECT campaign_id, {columns}, NOW() FROM ({deltas}) deltas ORDER BY campaign_id '
+            f'ON CONFLICT (campaign_id) DO UPDATE SET '
+            f'{", ".join(f"{column} = totals.{column} + EXCLUDED.{column}" for column in COLUMNS)}, '
+            f'updated_at = EXCLUDED.updated_at;'
+        )
+    return (
+        f'CREATE OR REPLACE FUNCTION {LINE_ITEM_TABLE}_totals_{operation}() RETURNS trigger '
+        f'LANGUAGE plpgsql AS $$ BEGIN {body} RETURN NULL; END; $$'
+    )
+
+
+def _trigger_sql(operation: str) -> str:
+    transition_tables = {
+        'insert': 'NEW TABLE AS new_rows',
+        'update': 'OLD TABLE AS old_rows NEW TABLE AS new_rows',
+        'delete': 'OLD TABLE AS old_rows',
+    }[operation]
+    return (
+        f'CREATE TRIGGER {LINE_ITEM_TABLE}_totals_{operation} AFTER {operation.upper()} ON {LINE_ITEM_TABLE} '
+        f'REFERENCING {transition_tables} FOR EACH STATEMENT '
+        f'EXECUTE FUNCTION {LINE_ITEM_TABLE}_totals_{operation}()'
+    )
+
+
+def install_campaign_totals_triggers(schema_editor, micro: bool):
+    """
+    Create or replace the triggers, micro must match the storage of LineItem amounts in DB
+    """
+    for operation in OPERATIONS:
+        schema_editor.execute(_function_sql(operation, micro))
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {LINE_ITEM_TABLE}_totals_{operation} ON {LINE_ITEM_TABLE}')
+        schema_editor.execute(_trigger_sql(operation))
+
+
+def drop_campaign_totals_triggers(schema_editor):
+    for operation in OPERATIONS:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {LINE_ITEM_TABLE}_totals_{operation} ON {LINE_ITEM_TABLE}')
+        schema_editor.execute(f'DROP FUNCTION IF EXISTS {LINE_ITEM_TABLE}_totals_{operation}()')
@@ -1,13 +1,32 @@
-from placements_io import views
+from placements_io import async_views, metrics, views
 from django.urls import path
 
 urlpatterns = [
     path('login/', views.LoginView.as_view(), name='login'),
     path('logout/', views.LogoutView.as_view(), name='logout'),
     path('ping_pong/', views.PingPongView.as_view(), name='ping_pong'),
+    path('metrics/', metrics.metrics_view, name='metrics'),
     path('campaign/', views.CampaignListView.as_view(), name='list_campaign'),
+    path('campaign/summary/', views.CampaignSummaryView.as_view(), name='summary_campaign'),
     path('campaign/<int:pk>/', views.CampaignDetailView.as_view(), name='detail_campaign'),
+    path('campaign/<int:pk>/line_item/', views.CampaignLineItemListView.as_view(), name='list_line_item'),
     path('campaign/<int:pk>/line_item/csv/', views.LineItemListCSVDownloadView.as_view(), name='csv_download_line_item'),
     path('campaign/csv/', views.CampaignListCSVDownloadView.as_view(), name='csv_download_campaign'),
+    path('export/', views.ExportJobCreateView.as_view(), name='create_export_job'),
+    path('export/<int:pk>/', views.ExportJobDetailView.as_view(), name='detail_export_job'),
+    path('export/<int:pk>/download/', views.ExportJobDownloadView.as_view(), name='download_export_job'),
+    path('import/', views.ImportPlacementsView.as_view(), name='import_placements'),
+    path('line_item/bulk/', views.LineItemBulkPatchView.as_view(), name='bulk_patch_line_item'),
     path('line_item/<int:pk>/', views.LineItemPatchView.as_view(), name='patch_line_item'),
+
+    # Native async views, see placements_io/async_views.py
+    path('async/campaign/', async_views.AsyncCampaignListView.as_view(), name='async_list_campaign'),
+    path('async/campaign/<int:pk>/', async_views.AsyncCampaignDetailView.as_view(), name='async_detail_campaign'),
+    path(
+        'async/campaign/<int:pk>/line_item/csv/',
+        async_views.AsyncLineItemListCSVDownloadView.as_view(),
+        name='async_csv_download_line_item',
+    ),
+    path('async/campaign/csv/', async_views.AsyncCampaignListCSVDownloadView.as_view(), name='async_csv_download_campaign'),
+    path('async/line_item/<int:pk>/', async_views.AsyncLineItemPatchView.as_view(), name='async_patch_line_item'),
 ]
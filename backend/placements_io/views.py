@@ -1,10 +1,12 @@
 from zoneinfo import ZoneInfo
 from datetime import datetime
 from rest_framework.authentication import SessionAuthentication
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.exceptions import NotFound
 from rest_framework.generics import ListAPIView, RetrieveAPIView, UpdateAPIView
 
 from drf_yasg.utils import swagger_auto_schema
@@ -15,18 +17,68 @@ from django.contrib.auth import (
     login as django_login,
     logout as django_logout,
 )
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import Http404, HttpResponse
+from django.utils import timezone
 from decimal import Decimal
 import csv
+import io
 
-from placements_io.models import Campaign, LineItem
+from placements_io.models import Campaign, ExportJob, LineItem
+from placements_io.fast_serializers import (
+    CAMPAIGN_FIELDS, LINE_ITEM_FIELDS, FastRendererMixin,
+    campaign_data, campaign_detail_data, line_item_data,
+)
+from placements_io.importers import import_rows, iter_rows
+from placements_io.metrics import timed
+from placements_io.caching import (
+    CachedResponseMixin, ConditionalGetMixin,
+    bump_data_version, campaign_validators, data_version_validators,
+)
+from placements_io.exports import (
+    CAMPAIGN_CSV_HEADER, EXPORT_FORMATS, LINE_ITEM_CSV_HEADER, ExportFormatMixin,
+    aiter_campaign_export, iter_campaign_export,
+    aiter_line_item_export, iter_line_item_export,
+    streaming_export_response,
+)
+from placements_io.export_jobs import download_response
 from placements_io.interfaces import (
-    CampaignPagination, CampaignSerializer,
-    CampaignDetailSerializer, LineItemPatchSerializer,
+    CampaignFilter, CampaignPagination, CampaignCursorPagination, CampaignSerializer,
+    CampaignDetailSerializer, CampaignSummarySerializer, LineItemPatchSerializer, LineItemBulkPatchSerializer,
+    ExportJobCreateSerializer, ExportJobSerializer,
+    LineItemAmountFilter, LineItemPagination, LineItemSerializer, StableOrderingFilter,
     get_drf_pagination_schema_serializer,
 )
 
 
+export_format_parameter = openapi.Parameter(
+    'format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=[*EXPORT_FORMATS], default='csv',
+    description='gzip is compressed CSV, parquet and arrow need pyarrow installed on server',
+)
+
+# Query params of CampaignFilter
+campaign_filter_parameters = [
+    openapi.Parameter(
+        'search', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description='Campaign name contains, case insensitive',
+    ),
+    openapi.Parameter(
+        'created_after', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description='ISO 8601 date or datetime, inclusive',
+    ),
+    openapi.Parameter(
+        'created_before', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description='ISO 8601 date or datetime, inclusive',
+    ),
+    openapi.Parameter(
+        'budget_band', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=[*CampaignFilter.budget_bands],
+        description='under: <= 90%, normal: 91% - 104%, over: 105% - 119%, critical: >= 120%',
+    ),
+]
+
+
 class LoginView(APIView):
     permission_classes = [AllowAny]
     authentication_classes = []
@@ -106,7 +158,7 @@ class PingPongView(APIView):
         return Response({"message": "pong"}, status=status.HTTP_200_OK)
 
 
-class CampaignListView(ListAPIView):
+class CampaignListView(FastRendererMixin, ConditionalGetMixin, CachedResponseMixin, ListAPIView):
     """
     List all campaigns with pagination
     """
@@ -116,12 +168,49 @@ class CampaignListView(ListAPIView):
     pagination_class = CampaignPagination
     serializer_class = CampaignSerializer
 
-    # Prefetch to prevent N+1 queries happens in CampaignSerializer
-    #   All related LineItem "will" be selected while querying Campaign
-    queryset = Campaign.objects.all().prefetch_related('lineitem_set')  # not evaluated yet
+    # Totals of LineItem are aggregated by DB (GROUP BY campaign),
+    #   so CampaignSerializer never loads LineItem rows and no N+1 queries happens
+    # Order by id to keep pagination stable, GROUP BY result has no guaranteed order
+    queryset = Campaign.objects.with_totals().order_by('id')  # not evaluated yet
+    filter_backends = [CampaignFilter]
+    # Validators come from data version (ConditionalGetMixin), no aggregate over all campaigns and line items
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_READ_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+
+        # Named rows instead of model instances, cursor pagination reads created_at and id of them
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*CAMPAIGN_FIELDS, named=True)
+        page = self.paginate_queryset(queryset)
+        with timed('serialize'):
+            data = campaign_data(page)
+        return self.get_paginated_response(data)
+
+    @property
+    def paginator(self):
+        """
+        Opt-in cursor pagination by ?pagination=cursor, otherwise page number pagination
+        """
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('pagination') == 'cursor':
+                self._paginator = CampaignCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     @swagger_auto_schema(
         operation_description="Retrieve a paginated list of all campaigns",
+        manual_parameters=[
+            openapi.Parameter(
+                'pagination', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['page', 'cursor'],
+                description='"cursor" to paginate by (created_at, id) keyset, no count is returned',
+            ),
+            openapi.Parameter(
+                'cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                description='Opaque cursor from next / previous link of cursor pagination',
+            ),
+            *campaign_filter_parameters,
+        ],
         responses={
             200: get_drf_pagination_schema_serializer(
                 'CampaignPaginationSchema',
@@ -135,14 +224,72 @@ class CampaignListView(ListAPIView):
         return super().get(request, *args, **kwargs)
 
 
-class CampaignDetailView(RetrieveAPIView):
+class CampaignSummaryView(FastRendererMixin, ConditionalGetMixin, CachedResponseMixin, RetrieveAPIView):
+    """
+    Portfolio-wide totals and distribution of budget fullfillment rate, of campaigns matching CampaignFilter
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    # One aggregate query over all campaigns, cached by data version (see placements_io.caching),
+    #   so it runs once per write, and reads CampaignTotals instead of line items with materialized totals source
+    queryset = Campaign.objects.with_totals()
+    serializer_class = CampaignSummarySerializer
+    filter_backends = [CampaignFilter]
+    # Buckets of 10% from 0% to 200%, plus below 0% and from 200%
+    rate_bucket_bounds = range(0, 201, 10)
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        summary = queryset.summary(CampaignFilter.budget_bands, self.rate_bucket_bounds)
+        return Response(self.get_serializer(summary).data)
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Totals of all campaigns, campaigns per budget band and histogram of budget fullfillment rate"
+        ),
+        manual_parameters=campaign_filter_parameters,
+        responses={
+            200: CampaignSummarySerializer,
+            401: openapi.Response(description="Authentication credentials were not provided"),
+            403: openapi.Response(description="Permission denied"),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class CampaignDetailView(FastRendererMixin, ConditionalGetMixin, CachedResponseMixin, RetrieveAPIView):
     """
     Retrieve a campaign by id
     """
     authentication_classes = [SessionAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = CampaignDetailSerializer
-    queryset = Campaign.objects.all().prefetch_related('lineitem_set')
+    # Prefetch in the order CampaignDetailSerializer.get_line_items needs, so no extra query happens there
+    queryset = Campaign.objects.all().prefetch_related(
+        Prefetch('lineitem_set', queryset=LineItem.objects.order_by(*LineItem.DEFAULT_ORDERING)),
+    )
+
+    def get_validators(self, request):
+        return campaign_validators(self.kwargs['pk']) or (None, None)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.FAST_READ_SERIALIZERS:
+            return super().retrieve(request, *args, **kwargs)
+
+        campaign_id = self.kwargs['pk']
+        campaign_row = Campaign.objects.filter(pk=campaign_id).values_list('id', 'name', 'created_at').first()
+        if campaign_row is None:
+            raise Http404
+        line_item_rows = (
+            LineItem.objects.filter(campaign_id=campaign_id)
+            .order_by(*LineItem.DEFAULT_ORDERING)
+            .values_list(*LINE_ITEM_FIELDS)
+        )
+        with timed('serialize'):
+            data = campaign_detail_data(campaign_row, line_item_rows)
+        return Response(data)
 
     @swagger_auto_schema(
         operation_description="Retrieve a campaign by id",
@@ -156,15 +303,108 @@ class CampaignDetailView(RetrieveAPIView):
         return super().get(request, *args, **kwargs)
 
 
-class CampaignListCSVDownloadView(APIView):
+class CampaignLineItemListView(FastRendererMixin, ConditionalGetMixin, CachedResponseMixin, ListAPIView):
+    """
+    List line items of a campaign with pagination, sorted by ?ordering=
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    pagination_class = LineItemPagination
+    serializer_class = LineItemSerializer
+
+    filter_backends = [LineItemAmountFilter, StableOrderingFilter]
+    ordering_fields = [
+        'id',
+        'name',
+        'booked_amount',
+        'actual_amount',
+        'adjustment_amount',
+        'final_amount',
+        'budget_fullfillment_rate',
+        'created_at',
+        'updated_at',
+    ]
+    ordering = list(LineItem.DEFAULT_ORDERING)  # Served by index lineitem_campaign_updated_idx
+
+    def get_validators(self, request):
+        return campaign_validators(self.kwargs['pk']) or (None, None)
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_READ_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*LINE_ITEM_FIELDS)
+        page = self.paginate_queryset(queryset)
+        with timed('serialize'):
+            data = line_item_data(page)
+        return self.get_paginated_response(data)
+
+    def get_queryset(self):
+        campaign_id = self.kwargs['pk']
+        if not Campaign.objects.filter(id=campaign_id).exists():
+            raise NotFound('Campaign not found')
+        return LineItem.objects.filter(campaign_id=campaign_id)
+
+    @swagger_auto_schema(
+        operation_description="Retrieve a paginated list of line items in a campaign",
+        manual_parameters=[
+            openapi.Parameter(
+                'over_delivered', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN,
+                description='true: only line items with budget fullfillment rate > 100, false: <= 100',
+            ),
+            *(
+                openapi.Parameter(param, openapi.IN_QUERY, type=openapi.TYPE_NUMBER)
+                for param in LineItemAmountFilter.range_params
+            ),
+        ],
+        responses={
+            200: get_drf_pagination_schema_serializer(
+                'LineItemPaginationSchema',
+                LineItemSerializer,
+            ),
+            401: openapi.Response(description="Authentication credentials were not provided"),
+            403: openapi.Response(description="Permission denied"),
+            404: openapi.Response(description="Campaign not found"),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class CampaignListCSVDownloadView(ExportFormatMixin, ConditionalGetMixin, APIView):
     """
-    Download a CSV file of all campaigns
+    Download a CSV (or ?format=) file of all campaigns
     """
     authentication_classes = [SessionAuthentication]
     permission_classes = [IsAuthenticated]
+
+    def get_validators(self, request):
+        return self.export_validators(request, data_version_validators())
+
+    @swagger_auto_schema(
+        operation_description="Same as POST, and respond 304 if campaigns are not modified (If-None-Match)",
+        manual_parameters=[export_format_parameter],
+        responses={
+            200: openapi.Response(
+                description="CSV file download",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_STRING,
+                    format=openapi.FORMAT_BINARY
+                )
+            ),
+            304: openapi.Response(description="Not modified since the copy of client"),
+            400: openapi.Response(description="Unknown or unavailable export format"),
+            401: openapi.Response(description="Authentication credentials were not provided"),
+            403: openapi.Response(description="Permission denied"),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        return self.conditional_response(request, self.post, *args, **kwargs)
     
     @swagger_auto_schema(
         operation_description="Download CSV file containing all campaigns with their details",
+        manual_parameters=[export_format_parameter],
         responses={
             200: openapi.Response(
                 description="CSV file download",
@@ -173,28 +413,33 @@ class CampaignListCSVDownloadView(APIView):
                     format=openapi.FORMAT_BINARY
                 )
             ),
+            400: openapi.Response(description="Unknown or unavailable export format"),
             401: openapi.Response(description="Authentication credentials were not provided"),
             403: openapi.Response(description="Permission denied"),
         }
     )
     def post(self, request, *args, **kwargs):
+        export_format = self.get_export_format(request)
         timestamp = datetime.now(tz=ZoneInfo('UTC')).strftime('%Y-%m-%d_%H-%M-%S')
         filename = f'campaigns_export_{timestamp}.csv'  # File name with timestamp to avoid file name conflict
+
+        if settings.CSV_EXPORT_STREAMING or export_format != 'csv':
+            # Campaigns are read chunk by chunk with DB side totals, memory usage doesn't grow with campaigns
+            chunk_size = settings.CSV_EXPORT_CHUNK_SIZE
+            return streaming_export_response(
+                request._request,
+                f'campaigns_export_{timestamp}',
+                export_format,
+                iter_campaign_export(export_format, chunk_size),
+                aiter_campaign_export(export_format, chunk_size),
+            )
+
         response = HttpResponse(content_type='text/csv')
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         
         writer = csv.writer(response)
 
-        writer.writerow([
-            'ID',
-            'Name', 
-            'Created At',
-            'Potential Invoice Amount',
-            'Line Items Count',
-            'Total Booked Amount',
-            'Total Actual Amount',
-            'Total Adjustment Amount'
-        ])
+        writer.writerow(CAMPAIGN_CSV_HEADER)
         
         campaigns = Campaign.objects.all().prefetch_related('lineitem_set').order_by('id')
         
@@ -240,15 +485,111 @@ class LineItemPatchView(UpdateAPIView):
         return super().patch(request, *args, **kwargs)
 
 
-class LineItemListCSVDownloadView(APIView):
+class LineItemBulkPatchView(APIView):
     """
-    Given a campaign id, download a CSV file of all line items in the campaign
+    Patch adjustment_amount of many line items in one request and one transaction
+    All or nothing, if any item is invalid, nothing is updated and errors are reported per item
     """
     authentication_classes = [SessionAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @swagger_auto_schema(
+        operation_description="Patch adjustment_amount of line items in bulk",
+        request_body=LineItemBulkPatchSerializer(many=True),
+        responses={
+            200: LineItemBulkPatchSerializer(many=True),
+            400: openapi.Response(description="Errors of each item, in the same order as request body"),
+            401: openapi.Response(description="Authentication credentials were not provided"),
+            403: openapi.Response(description="Permission denied"),
+        }
+    )
+    def patch(self, request, *args, **kwargs):
+        max_size = settings.LINE_ITEM_BULK_PATCH_MAX_SIZE
+        if not isinstance(request.data, list) or len(request.data) > max_size:
+            return Response(
+                {"message": f"Expect a list of at most {max_size} {{id, adjustment_amount}}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = LineItemBulkPatchSerializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            return Response(
+                {"message": "Invalid line items", "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with transaction.atomic():
+            ids = [item['id'] for item in serializer.validated_data]
+            # Lock rows in order of id, concurrent PATCH of same line items wait here instead of deadlock
+            line_items = (
+                LineItem.objects.select_for_update()
+                .only('id', 'campaign_id', 'adjustment_amount', 'updated_at')
+                .order_by('id')
+                .in_bulk(ids)
+            )
+
+            errors = [
+                {} if item['id'] in line_items else {'id': ['Line item not found']}
+                for item in serializer.validated_data
+            ]
+            if any(errors):
+                return Response(
+                    {"message": "Invalid line items", "errors": errors},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            now = timezone.now()  # bulk_update() doesn't handle auto_now
+            for item in serializer.validated_data:
+                line_item = line_items[item['id']]
+                line_item.adjustment_amount = item['adjustment_amount']
+                line_item.updated_at = now
+
+            LineItem.objects.bulk_update(
+                line_items.values(),
+                ['adjustment_amount', 'updated_at'],
+                batch_size=1000,
+            )
+            bump_data_version()  # bulk_update() doesn't send post_save
+
+        return Response(
+            LineItemBulkPatchSerializer([line_items[pk] for pk in dict.fromkeys(ids)], many=True).data,
+            status=status.HTTP_200_OK,
+        )
+
+
+class LineItemListCSVDownloadView(ExportFormatMixin, ConditionalGetMixin, APIView):
+    """
+    Given a campaign id, download a CSV (or ?format=) file of all line items in the campaign
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_validators(self, request):
+        return self.export_validators(request, campaign_validators(self.kwargs['pk']) or (None, None))
+
+    @swagger_auto_schema(
+        operation_description="Same as POST, and respond 304 if line items are not modified (If-None-Match)",
+        manual_parameters=[export_format_parameter],
+        responses={
+            200: openapi.Response(
+                description="CSV file download",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_STRING,
+                    format=openapi.FORMAT_BINARY
+                )
+            ),
+            304: openapi.Response(description="Not modified since the copy of client"),
+            400: openapi.Response(description="Invalid campaign ID or export format is provided"),
+            401: openapi.Response(description="Authentication credentials were not provided"),
+            403: openapi.Response(description="Permission denied"),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        return self.conditional_response(request, self.post, *args, **kwargs)
+
     @swagger_auto_schema(
         operation_description="Download CSV file containing all line items in a campaign",
+        manual_parameters=[export_format_parameter],
         responses={
             200: openapi.Response(
                 description="CSV file download",
@@ -257,13 +598,17 @@ class LineItemListCSVDownloadView(APIView):
                     format=openapi.FORMAT_BINARY
                 )
             ),
-            400: openapi.Response(description="Invalid campaign ID is provided"),
+            400: openapi.Response(description="Invalid campaign ID or export format is provided"),
             401: openapi.Response(description="Authentication credentials were not provided"),
             403: openapi.Response(description="Permission denied"),
         }
     )
     def post(self, request, *args, **kwargs):
         campaign_id = kwargs.get('pk')
+        export_format = self.get_export_format(request)
+
+        if settings.CSV_EXPORT_STREAMING or export_format != 'csv':
+            return self.streaming_post(request, campaign_id, export_format)
         
         try:
             campaign = Campaign.objects.prefetch_related('lineitem_set').get(id=campaign_id)
@@ -280,16 +625,7 @@ class LineItemListCSVDownloadView(APIView):
 
         writer = csv.writer(response)
 
-        writer.writerow([
-            'ID',
-            'Name',
-            'Booked Amount',
-            'Actual Amount',
-            'Adjustment Amount',
-            'Final Amount',
-            'Campaign ID',
-            'Campaign Name',
-        ])
+        writer.writerow(LINE_ITEM_CSV_HEADER)
 
         for line_item in campaign.lineitem_set.all():
             writer.writerow([
@@ -304,3 +640,171 @@ class LineItemListCSVDownloadView(APIView):
             ])
 
         return response
+
+    def streaming_post(self, request, campaign_id: int, export_format: str = 'csv'):
+        """
+        Stream line items by server-side cursor, the campaign is not loaded with its line items
+        """
+        try:
+            campaign_name = Campaign.objects.values_list('name', flat=True).get(id=campaign_id)
+        except Campaign.DoesNotExist:
+            return Response(
+                {"message": "Campaign not found"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        timestamp = datetime.now(tz=ZoneInfo('UTC')).strftime('%Y-%m-%d_%H-%M-%S')
+        chunk_size = settings.CSV_EXPORT_CHUNK_SIZE
+        return streaming_export_response(
+            request._request,
+            f'line_items_export_{campaign_id}_{timestamp}',
+            export_format,
+            iter_line_item_export(export_format, campaign_id, campaign_name, chunk_size),
+            aiter_line_item_export(export_format, campaign_id, campaign_name, chunk_size),
+        )
+
+
+class ExportJobCreateView(APIView):
+    """
+    Start a background export, the file is written by `manage.py run_export_workers`
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Queue an export of all campaigns or line items of a campaign, poll the job until done",
+        request_body=ExportJobCreateSerializer,
+        responses={
+            202: ExportJobSerializer,
+            400: openapi.Response(description="Invalid kind or campaign ID is provided"),
+            401: openapi.Response(description="Authentication credentials were not provided"),
+            403: openapi.Response(description="Permission denied"),
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = ExportJobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = ExportJob.objects.create(user=request.user, **serializer.validated_data)
+        return Response(
+            ExportJobSerializer(job, context={'request': request}).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class ExportJobDetailView(RetrieveAPIView):
+    """
+    Status of an export job, download_url is set when the file is ready
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = ExportJobSerializer
+
+    def get_queryset(self):
+        # Jobs of other users are 404, not 403, so their ids are not revealed
+        return ExportJob.objects.filter(user=self.request.user)
+
+    @swagger_auto_schema(
+        operation_description="Get status of an export job",
+        responses={
+            200: ExportJobSerializer,
+            401: openapi.Response(description="Authentication credentials were not provided"),
+            403: openapi.Response(description="Permission denied"),
+            404: openapi.Response(description="Export job not found"),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class ExportJobDownloadView(APIView):
+    """
+    Download the file of a finished export job, resumable by Range header
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Download the CSV file of a finished export job, a single byte range is supported",
+        manual_parameters=[
+            openapi.Parameter(
+                'Range', openapi.IN_HEADER, type=openapi.TYPE_STRING, description='e.g. bytes=1024-',
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="CSV file download",
+                schema=openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_BINARY),
+            ),
+            206: openapi.Response(description="Requested range of the CSV file"),
+            401: openapi.Response(description="Authentication credentials were not provided"),
+            403: openapi.Response(description="Permission denied"),
+            404: openapi.Response(description="Export job not found"),
+            409: openapi.Response(description="Export job is not done"),
+            416: openapi.Response(description="Range not satisfiable"),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        try:
+            job = ExportJob.objects.get(pk=kwargs['pk'], user=request.user)
+        except ExportJob.DoesNotExist:
+            raise NotFound("Export job not found")
+        if job.status != ExportJob.Status.DONE:
+            return Response(
+                {"message": f"Export job is {job.status}"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return download_response(request._request, job)
+
+
+class ImportPlacementsView(APIView):
+    """
+    Upload a JSON or CSV file to import campaigns and line items, same as `manage.py import_placements`
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAdminUser]  # Import overwrites any data, only admin is allowed
+    parser_classes = [MultiPartParser]
+
+    @swagger_auto_schema(
+        operation_description="Import campaigns and line items from a JSON or CSV file",
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True),
+            openapi.Parameter(
+                'format', openapi.IN_FORM, type=openapi.TYPE_STRING, enum=['json', 'csv'],
+                description='Format of the file, default to the file extension',
+            ),
+        ],
+        responses={
+            200: openapi.Response(description="Import result with rows/sec"),
+            400: openapi.Response(description="Invalid file"),
+            401: openapi.Response(description="Authentication credentials were not provided"),
+            403: openapi.Response(description="Permission denied"),
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"message": "File is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_format = request.data.get('format') or upload.name.rsplit('.', 1)[-1].lower()
+        batch_size = settings.IMPORT_BATCH_SIZE
+
+        # Large upload is stored in temporary file by Django, read it as text stream instead of loading it
+        file = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+        try:
+            result = import_rows(iter_rows(file, file_format), batch_size=batch_size)
+        except (ValueError, KeyError) as e:
+            return Response(
+                {"message": f"Invalid file: {e!r}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(
+            {
+                "rows": result.rows,
+                "line_items_created": result.line_items_created,
+                "line_items_updated": result.line_items_updated,
+                "seconds": result.seconds,
+                "rows_per_second": result.rows_per_second,
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -13,7 +13,7 @@ interface LineItem {
   actual_amount: string
   adjustment_amount: string
   final_amount: string
-  budget_fullfillment_rate: number
+  budget_fullfillment_rate: number | null
   created_at: string
   updated_at: string
 }
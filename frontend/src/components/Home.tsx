@@ -10,7 +10,7 @@ interface Campaign {
   name: string
   created_at: string
   potential_invoice_amount: string
-  budget_fullfillment_rate: number
+  budget_fullfillment_rate: number | null
 }
 
 interface CampaignListResponse {
@@ -9,11 +9,17 @@ export interface BudgetRateStyle {
 
 /**
  * Get styling for budget fulfillment rate based on percentage
- * @param rate - Budget fulfillment rate as a number (e.g., 85, 110, 125)
+ * @param rate - Budget fulfillment rate as a number (e.g., 85, 110, 125), null if nothing is booked
  * @returns Style object with color and fontWeight
  */
-export const getBudgetRateStyle = (rate: number): BudgetRateStyle => {
-  if (rate <= 90) {
+export const getBudgetRateStyle = (rate: number | null): BudgetRateStyle => {
+  if (rate === null) {
+    // Unbooked, no rate to highlight
+    return {
+      color: '#fff',
+      fontWeight: 'normal'
+    }
+  } else if (rate <= 90) {
     return {
       color: '#2196F3', // Blue
       fontWeight: 'bold'
@@ -39,9 +45,9 @@ export const getBudgetRateStyle = (rate: number): BudgetRateStyle => {
 
 /**
  * Format budget rate with percentage sign and appropriate styling
- * @param rate - Budget fulfillment rate as a number
+ * @param rate - Budget fulfillment rate as a number, null if nothing is booked
  * @returns Formatted string with percentage
  */
-export const formatBudgetRate = (rate: number): string => {
-  return `${rate}%`
+export const formatBudgetRate = (rate: number | null): string => {
+  return rate === null ? '-' : `${rate}%`
 }
\ No newline at end of file